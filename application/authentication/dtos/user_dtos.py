@@ -1,4 +1,9 @@
+from pydantic import Field
+from typing import List
+
 from application.base.base_dto import BaseDto
+from domain.authentication.entities.user import User
+from domain.authentication.entities.user_profile import UserProfile
 
 
 class BaseUserDto(BaseDto):
@@ -13,8 +18,34 @@ class UserCreateDto(BaseUserDto):
 class UserDto(BaseUserDto):
     id: int
     email: str
+    # row version, only used to build etags and never serialized
+    version: int | None = Field(default=None, exclude=True)
+
+    @staticmethod
+    def from_entity(user: User | UserProfile) -> "UserDto":
+        # entities are read back from the database already valid, so validation is skipped on the hot read paths
+        return UserDto.model_construct(id=user.id, username=user.username, email=user.email, version=user.version)
 
 
 class UserUpdateDto(BaseUserDto):
     pass
 
+
+class UserPageDto(BaseDto):
+    items: List[UserDto]
+    next_cursor: str | None
+
+
+class UserBulkCreateDto(BaseDto):
+    users: List[UserCreateDto] = Field(min_length=1, max_length=1000)
+
+
+class UserBulkCreateErrorDto(BaseDto):
+    index: int
+    username: str
+    detail: str
+
+
+class UserBulkCreateResultDto(BaseDto):
+    created: List[UserDto]
+    errors: List[UserBulkCreateErrorDto]
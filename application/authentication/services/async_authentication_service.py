@@ -0,0 +1,86 @@
+import time
+
+from application.authentication.dtos.authentication_dtos import TokenData, TokenPairResponseDto
+from application.authentication.services.authentication_service import AuthenticationService
+from domain.authentication.repositories.async_user_repository import AsyncUserRepository
+from infrastructure.cache.async_base_cache_service import AsyncBaseCacheService
+from infrastructure.cache.revocation_filter import RevocationFilter
+from infrastructure.cache.verified_token_cache import VerifiedTokenCache
+from infrastructure.security.jwt_keyring import JwtKeyring, jwt_keyring
+
+
+class AsyncAuthenticationService(AuthenticationService):
+    """Awaitable counterpart of AuthenticationService.
+
+    Token encoding is inherited as is, only methods touching the repository or the cache are overridden.
+    """
+
+    def __init__(
+            self,
+            user_repository: AsyncUserRepository,
+            cache_service: AsyncBaseCacheService,
+            revocation_filter: RevocationFilter | None = None,
+            verified_token_cache: VerifiedTokenCache | None = None,
+            keyring: JwtKeyring = jwt_keyring
+        ):
+        self._user_repository = user_repository
+        self._cache_service = cache_service
+        self._revocation_filter = revocation_filter
+        self._verified_token_cache = verified_token_cache
+        self._keyring = keyring
+
+    async def refresh_token_pair(self, token_data: TokenData, used_refresh_token: str) -> TokenPairResponseDto:
+        tokens, access_token_id, refresh_token_id = self._create_token_pair(token_data)
+        used_refresh_token_id = self._get_token_id(used_refresh_token)
+        saved, token_pair_in_cache = await self._cache_service.save_expirable_dict_if_absent(
+            self._refresh_token_rotation_key(used_refresh_token_id),
+            {"access_token_id": access_token_id, "refresh_token_id": refresh_token_id},
+            self.REFRESH_TOKEN_EXPIRE_MINUTES,
+            blocking_keys=self._refresh_token_blocking_keys(used_refresh_token, used_refresh_token_id)
+        )
+        if saved:
+            return tokens
+        if not token_pair_in_cache and self.LEGACY_TOKEN_KEYS_ENABLED:
+            token_pair_in_cache = await self._cache_service.get_complete_dict_from_cache(used_refresh_token)
+        if token_pair_in_cache:
+            await self._invalidate_token_pair(*self._get_rotated_token_ids(token_pair_in_cache))
+            raise Exception("Token already used.")
+        raise Exception("Revoked token")
+
+    async def decode_access_token(self, access_token: str) -> TokenData:
+        verified_token = self._get_verified_token(access_token)
+        payload = verified_token[0] if verified_token else self._keyring.decode(access_token)
+        access_token_id = self._get_token_id(access_token, payload)
+        if self._access_token_might_be_revoked(payload) and not await self._check_access_token_is_valid(access_token, access_token_id):
+            self._forget_verified_token(access_token_id)
+            raise Exception("Revoked token")
+        if verified_token and verified_token[2]:
+            return verified_token[1]
+        username = self._get_username_from_payload(payload)
+        user = await self._user_repository.get_profile_by_username(username)
+        if not user:
+            raise Exception("User not found.")
+        token_data = TokenData(username=username, email=user.email)
+        self._remember_verified_token(access_token, access_token_id, payload, token_data)
+        return token_data
+
+    async def decode_refresh_token(self, refresh_token: str) -> TokenData:
+        payload = self._keyring.decode(refresh_token)
+        username = self._get_username_from_payload(payload)
+        user = await self._user_repository.get_profile_by_username(username)
+        if not user:
+            raise Exception("User not found.")
+        return TokenData(username=username, email=user.email)
+
+    async def _invalidate_token_pair(self, access_token_id: str, refresh_token_id: str) -> None:
+        await self._cache_service.save_many_expirable_values_and_publish(
+            self._revocation_items(access_token_id, refresh_token_id),
+            self.REVOKED_ACCESS_TOKENS_KEY,
+            [access_token_id],
+            time.time() + self.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+        self._forget_revoked_token(access_token_id)
+
+    async def _check_access_token_is_valid(self, access_token: str, access_token_id: str) -> bool:
+        revocations = await self._cache_service.get_many_values_from_cache(self._access_token_revocation_keys(access_token, access_token_id))
+        return not any(revocations)
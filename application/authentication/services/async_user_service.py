@@ -0,0 +1,91 @@
+from typing import AsyncIterator, List, Tuple
+
+from application.authentication.dtos.user_dtos import UserBulkCreateResultDto, UserCreateDto, UserDto, UserPageDto, UserUpdateDto
+from application.authentication.services.user_service import UserService
+from domain.authentication.entities.user import User
+from domain.authentication.repositories.async_user_repository import AsyncUserRepository
+from infrastructure.security.password_hashing_executor import PasswordHashingExecutor, password_hashing_executor
+
+
+class AsyncUserService(UserService):
+    """Awaitable counterpart of UserService.
+
+    Password hashing and verification are cpu bound, so they are awaited from the hashing pool instead of blocking the
+    event loop.
+    """
+
+    def __init__(self, user_repository: AsyncUserRepository, password_hasher: PasswordHashingExecutor = password_hashing_executor):
+        self._user_repository = user_repository
+        self._password_hasher = password_hasher
+
+    async def create_user(self, user_create_dto: UserCreateDto) -> UserDto:
+        password_hash = await self._password_hasher.hash_async(user_create_dto.password)
+        user = User(id=None, username=user_create_dto.username, email=user_create_dto.email, password=password_hash)
+        new_user = await self._user_repository.save(user)
+        return UserDto.from_entity(new_user)
+
+    async def create_users(self, user_create_dtos: List[UserCreateDto]) -> UserBulkCreateResultDto:
+        password_hashes = await self._password_hasher.hash_many_async([user.password for user in user_create_dtos])
+        users = [User(id=None, username=dto.username, email=dto.email, password=password_hash) for dto, password_hash in zip(user_create_dtos, password_hashes)]
+        return self._build_bulk_create_result(users, await self._user_repository.save_many(users))
+
+    async def get_user_by_id(self, id: int) -> UserDto | None:
+        user = await self._user_repository.get_profile_by_id(id)
+        if not user:
+            return None
+        return UserDto.from_entity(user)
+
+    async def get_user_by_username(self, username: str) -> UserDto | None:
+        user = await self._user_repository.get_profile_by_username(username)
+        if not user:
+            return None
+        return UserDto.from_entity(user)
+
+    async def get_user_by_login(self, login: str) -> UserDto | None:
+        user = await self._user_repository.get_by_login(login)
+        if not user:
+            return None
+        return UserDto.from_entity(user)
+
+    async def get_all_users(self, items_per_page: int = 1000, page: int = 0) -> List[UserDto]:
+        limit = items_per_page
+        offset = items_per_page * page
+        users = await self._user_repository.get_all(limit, offset)
+        return [UserDto.from_entity(u) for u in users]
+
+    async def get_all_user_rows(self, items_per_page: int = 1000, page: int = 0) -> List[Tuple[int, str, str, int]]:
+        return await self._user_repository.get_all_rows(items_per_page, items_per_page * page)
+
+    async def get_users_page(self, limit: int = 100, cursor: str | None = None, after_id: int | None = None) -> UserPageDto:
+        if cursor is not None:
+            after_id = self._decode_after_id(cursor)
+        users = await self._user_repository.get_page_after(after_id, limit + 1)
+        return self._build_users_page(users, limit)
+
+    async def stream_all_users(self, batch_size: int = 1000) -> AsyncIterator[UserDto]:
+        async for user in self._user_repository.stream_all(batch_size):
+            yield UserDto.from_entity(user)
+
+    async def update_user(self, id: int, user_dto: UserUpdateDto) -> UserDto | None:
+        updated_user = await self._user_repository.update(id, username=user_dto.username)
+        if not updated_user:
+            return None
+        return UserDto.from_entity(updated_user)
+
+    async def delete_user_by_id(self, id) -> bool:
+        return await self._user_repository.delete(id)
+
+    async def authenticate(self, login: str, password: str) -> UserDto | None:
+        user = await self._user_repository.get_by_login(login)
+        if not user:
+            await self._password_hasher.dummy_verify_async()
+            return None
+        is_valid, updated_hash = await self._password_hasher.verify_and_update_async(password, user.password)
+        if not is_valid:
+            return None
+        if updated_hash:
+            await self._user_repository.update_password_hash(user.id, user.password, updated_hash)
+        return UserDto.from_entity(user)
+
+    async def check_password_is_valid(self, login: str, password: str):
+        return await self.authenticate(login, password) is not None
@@ -1,6 +1,10 @@
+import hashlib
 import os
+import time
+import uuid
 
 from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
 
 import jwt
 
@@ -9,109 +13,208 @@ from dotenv import load_dotenv
 from application.authentication.dtos.authentication_dtos import TokenData, TokenPairResponseDto
 from domain.authentication.repositories.user_repository import UserRepository
 from infrastructure.cache.base_cache_service import BaseCacheService
+from infrastructure.cache.revocation_filter import RevocationFilter
+from infrastructure.cache.verified_token_cache import VerifiedTokenCache
+from infrastructure.security.jwt_keyring import JwtKeyring, jwt_keyring
 
 
 load_dotenv()
 
 
 class AuthenticationService:
-    def __init__(self, user_repository: UserRepository, cache_service: BaseCacheService):
+    def __init__(
+            self,
+            user_repository: UserRepository,
+            cache_service: BaseCacheService,
+            revocation_filter: RevocationFilter | None = None,
+            verified_token_cache: VerifiedTokenCache | None = None,
+            keyring: JwtKeyring = jwt_keyring
+        ):
         self._user_repository = user_repository
         self._cache_service = cache_service
+        self._revocation_filter = revocation_filter
+        self._verified_token_cache = verified_token_cache
+        self._keyring = keyring
 
-    SECRET_KEY = os.getenv("PASSWORD_HASHING_SECRET_KEY")
-    ALGORITHM = "HS256"
     OTP_EXPIRE_MINUTES = 5
     ACCESS_TOKEN_EXPIRE_MINUTES = 15
     REFRESH_TOKEN_EXPIRE_MINUTES = 360
+    # also honours revocation and rotation state keyed by the full token, as written before tokens carried a jti.
+    # Can be turned off once every token issued before the jti rollout has expired
+    LEGACY_TOKEN_KEYS_ENABLED = os.getenv("AUTH_LEGACY_TOKEN_KEYS_ENABLED", "true").lower() == "true"
+    # sorted set and channel the revocation filters of every process are synchronized from
+    REVOKED_ACCESS_TOKENS_KEY = "revoked_access_tokens"
 
     def create_token_pair(self, token_data: TokenData) -> TokenPairResponseDto:
-        access_token = self._create_access_token(token_data)
-        refresh_token = self._create_refresh_token(token_data)
-        return TokenPairResponseDto(
-            access_token=access_token,
-            token_duration_minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES,
-            refresh_token=refresh_token,
-            refresh_token_duration_minutes=self.REFRESH_TOKEN_EXPIRE_MINUTES,
-            token_type="bearer"
-        )
+        tokens, _, _ = self._create_token_pair(token_data)
+        return tokens
 
     def refresh_token_pair(self, token_data: TokenData, used_refresh_token: str) -> TokenPairResponseDto:
-        tokens = self.create_token_pair(token_data)
-        self._add_tokens_to_rotation(tokens.access_token,tokens.refresh_token, used_refresh_token)
-        return tokens
+        """Rotates used_refresh_token into a new token pair.
+
+        Claiming the used token is atomic and takes one round trip, so concurrent refreshes with the same token can not
+        both succeed. Presenting an already rotated token revokes the pair that was issued for it.
+        """
+        tokens, access_token_id, refresh_token_id = self._create_token_pair(token_data)
+        used_refresh_token_id = self._get_token_id(used_refresh_token)
+        saved, token_pair_in_cache = self._cache_service.save_expirable_dict_if_absent(
+            self._refresh_token_rotation_key(used_refresh_token_id),
+            {"access_token_id": access_token_id, "refresh_token_id": refresh_token_id},
+            self.REFRESH_TOKEN_EXPIRE_MINUTES,
+            blocking_keys=self._refresh_token_blocking_keys(used_refresh_token, used_refresh_token_id)
+        )
+        if saved:
+            return tokens
+        if not token_pair_in_cache and self.LEGACY_TOKEN_KEYS_ENABLED:
+            token_pair_in_cache = self._cache_service.get_complete_dict_from_cache(used_refresh_token)
+        if token_pair_in_cache:
+            self._invalidate_token_pair(*self._get_rotated_token_ids(token_pair_in_cache))
+            raise Exception("Token already used.")
+        raise Exception("Revoked token")
 
     def decode_access_token(self, access_token: str) -> TokenData:
-        if not self._check_access_token_is_valid(access_token):
+        verified_token = self._get_verified_token(access_token)
+        payload = verified_token[0] if verified_token else self._keyring.decode(access_token)
+        access_token_id = self._get_token_id(access_token, payload)
+        if self._access_token_might_be_revoked(payload) and not self._check_access_token_is_valid(access_token, access_token_id):
+            self._forget_verified_token(access_token_id)
             raise Exception("Revoked token")
-        payload = jwt.decode(access_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-        username = payload.get("username")
-        if username is None:
-            raise Exception("Username not contained in token.")
-        user = self._user_repository.get_by_username(username)
+        if verified_token and verified_token[2]:
+            return verified_token[1]
+        username = self._get_username_from_payload(payload)
+        user = self._user_repository.get_profile_by_username(username)
         if not user:
             raise Exception("User not found.")
-        return TokenData(username=username, email=user.email)
+        token_data = TokenData(username=username, email=user.email)
+        self._remember_verified_token(access_token, access_token_id, payload, token_data)
+        return token_data
 
     def decode_refresh_token(self, refresh_token: str) -> TokenData:
-        if not self._check_refresh_token_was_never_used(refresh_token):
-            raise Exception("Token already used.")
-        if not self._check_refresh_token_is_valid(refresh_token):
-            raise Exception("Revoked token")
-        payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-        username = payload.get("username")
-        if username is None:
-            raise Exception("Username not contained in token.")
-        user = self._user_repository.get_by_username(username)
+        """Verifies the refresh token signature and its user, rotation state is checked by refresh_token_pair."""
+        payload = self._keyring.decode(refresh_token)
+        username = self._get_username_from_payload(payload)
+        user = self._user_repository.get_profile_by_username(username)
         if not user:
             raise Exception("User not found.")
         return TokenData(username=username, email=user.email)
 
-    def _create_access_token(self, token_data: TokenData) -> str:
+    def _create_token_pair(self, token_data: TokenData) -> Tuple[TokenPairResponseDto, str, str]:
+        access_token_id = uuid.uuid4().hex
+        refresh_token_id = uuid.uuid4().hex
+        tokens = TokenPairResponseDto(
+            access_token=self._create_access_token(token_data, access_token_id),
+            token_duration_minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES,
+            refresh_token=self._create_refresh_token(token_data, refresh_token_id),
+            refresh_token_duration_minutes=self.REFRESH_TOKEN_EXPIRE_MINUTES,
+            token_type="bearer"
+        )
+        return tokens, access_token_id, refresh_token_id
+
+    def _create_access_token(self, token_data: TokenData, token_id: str) -> str:
         token_data_to_be_encoded = token_data.model_dump()
         expire = datetime.now(timezone.utc) + timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES)
-        token_data_to_be_encoded.update({"exp": expire})  # required format to be used from jwt library
-        encoded_jwt = jwt.encode(token_data_to_be_encoded, self.SECRET_KEY, algorithm=self.ALGORITHM)
-        return encoded_jwt
+        token_data_to_be_encoded.update({"exp": expire, "jti": token_id})
+        return self._keyring.encode(token_data_to_be_encoded)
 
-    def _create_refresh_token(self, token_data: TokenData) -> str:
+    def _create_refresh_token(self, token_data: TokenData, token_id: str) -> str:
         token_data_to_be_encoded = token_data.model_dump()
         expire = datetime.now(timezone.utc) + timedelta(minutes=self.REFRESH_TOKEN_EXPIRE_MINUTES)
-        token_data_to_be_encoded.update({"exp": expire})  # required format to be used from jwt library
-        encoded_jwt = jwt.encode(token_data_to_be_encoded, self.SECRET_KEY, algorithm=self.ALGORITHM)
-        return encoded_jwt
+        token_data_to_be_encoded.update({"exp": expire, "jti": token_id})
+        return self._keyring.encode(token_data_to_be_encoded)
 
-    def _check_refresh_token_was_never_used(self, refresh_token):
-        token_pair_in_cache = self._cache_service.get_complete_dict_from_cache(refresh_token)
-        if token_pair_in_cache:
-            self._invalidate_access_token(token_pair_in_cache['access_token'])
-            self._invalidate_refresh_token(token_pair_in_cache['refresh_token'])
-            return False
-        return True
-
-    def _add_tokens_to_rotation(self, access_token, refresh_token, used_refresh_token):
-        mapping = {
-            "access_token": access_token,
-            "refresh_token": refresh_token
-        }
-        self._cache_service.save_expirable_dict(used_refresh_token, mapping, self.REFRESH_TOKEN_EXPIRE_MINUTES * 60)
-
-    def _invalidate_access_token(self, access_token):
-        key = f"violated_access_token_{access_token}"
-        self._cache_service.save_expirable_value(key, "value", self.ACCESS_TOKEN_EXPIRE_MINUTES)
-
-    def _invalidate_refresh_token(self, refresh_token):
-        key = f"violated_refresh_token_{refresh_token}"
-        self._cache_service.save_expirable_value(key, "value", self.REFRESH_TOKEN_EXPIRE_MINUTES)
-
-    def _check_access_token_is_valid(self, access_token: str) -> bool:
-        key = f"violated_access_token_{access_token}"
-        if self._cache_service.get_value_from_cache(key):
-            return False
-        return True
-
-    def _check_refresh_token_is_valid(self, refresh_token: str) -> bool:
-        key = f"violated_refresh_token_{refresh_token}"
-        if self._cache_service.get_value_from_cache(key):
-            return False
-        return True
+    @staticmethod
+    def _get_username_from_payload(payload: dict) -> str:
+        username = payload.get("username")
+        if username is None:
+            raise Exception("Username not contained in token.")
+        return username
+
+    @staticmethod
+    def _get_token_id(token: str, payload: dict | None = None) -> str:
+        """The jti claim, or a fixed size digest of the whole token for tokens issued before jti was added."""
+        if payload is None:
+            payload = jwt.decode(token, options={"verify_signature": False})
+        token_id = payload.get("jti")
+        if token_id:
+            return token_id
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _get_rotated_token_ids(self, token_pair_in_cache: dict) -> Tuple[str, str]:
+        if "access_token_id" in token_pair_in_cache:
+            return token_pair_in_cache["access_token_id"], token_pair_in_cache["refresh_token_id"]
+        # legacy rotation state holds the full tokens
+        return self._get_token_id(token_pair_in_cache["access_token"]), self._get_token_id(token_pair_in_cache["refresh_token"])
+
+    @staticmethod
+    def _refresh_token_rotation_key(refresh_token_id: str) -> str:
+        return f"refresh_token_rotation_{refresh_token_id}"
+
+    @staticmethod
+    def _revoked_access_token_key(access_token_id: str) -> str:
+        return f"revoked_access_token_{access_token_id}"
+
+    @staticmethod
+    def _revoked_refresh_token_key(refresh_token_id: str) -> str:
+        return f"revoked_refresh_token_{refresh_token_id}"
+
+    def _refresh_token_blocking_keys(self, refresh_token: str, refresh_token_id: str) -> List[str]:
+        keys = [self._revoked_refresh_token_key(refresh_token_id)]
+        if self.LEGACY_TOKEN_KEYS_ENABLED:
+            keys += [f"violated_refresh_token_{refresh_token}", refresh_token]
+        return keys
+
+    def _access_token_revocation_keys(self, access_token: str, access_token_id: str) -> List[str]:
+        keys = [self._revoked_access_token_key(access_token_id)]
+        if self.LEGACY_TOKEN_KEYS_ENABLED:
+            keys.append(f"violated_access_token_{access_token}")
+        return keys
+
+    def _revocation_items(self, access_token_id: str, refresh_token_id: str) -> list:
+        return [
+            (self._revoked_access_token_key(access_token_id), "1", self.ACCESS_TOKEN_EXPIRE_MINUTES),
+            (self._revoked_refresh_token_key(refresh_token_id), "1", self.REFRESH_TOKEN_EXPIRE_MINUTES)
+        ]
+
+    def _get_verified_token(self, access_token: str) -> Tuple[dict, TokenData, bool] | None:
+        """Payload and token data of a verified token, and whether its user was checked recently enough to skip it."""
+        if self._verified_token_cache is None:
+            return None
+        cached = self._verified_token_cache.get(access_token)
+        if cached is None:
+            return None
+        (payload, token_data), user_is_checked = cached
+        return payload, token_data, user_is_checked
+
+    def _remember_verified_token(self, access_token: str, access_token_id: str, payload: dict, token_data: TokenData) -> None:
+        if self._verified_token_cache is not None:
+            self._verified_token_cache.set(access_token, access_token_id, token_data.username, (payload, token_data), payload["exp"])
+
+    def _forget_verified_token(self, access_token_id: str) -> None:
+        if self._verified_token_cache is not None:
+            self._verified_token_cache.invalidate_token_id(access_token_id)
+
+    def _access_token_might_be_revoked(self, payload: dict) -> bool:
+        """Asks the local revocation filter, only tokens it can not rule out are checked against the cache."""
+        if self._revocation_filter is None or not payload.get("jti"):
+            return True
+        return self._revocation_filter.might_be_revoked(payload["jti"])
+
+    def _invalidate_token_pair(self, access_token_id: str, refresh_token_id: str) -> None:
+        # announced to the other processes along with the revocation itself, so it can not be lost if this one dies
+        self._cache_service.save_many_expirable_values_and_publish(
+            self._revocation_items(access_token_id, refresh_token_id),
+            self.REVOKED_ACCESS_TOKENS_KEY,
+            [access_token_id],
+            time.time() + self.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+        self._forget_revoked_token(access_token_id)
+
+    def _forget_revoked_token(self, access_token_id: str) -> None:
+        self._forget_verified_token(access_token_id)
+        if self._revocation_filter is not None:
+            # the announcement comes back through the synchronizer as well, this only spares the wait
+            self._revocation_filter.add(access_token_id)
+
+    def _check_access_token_is_valid(self, access_token: str, access_token_id: str) -> bool:
+        revocations = self._cache_service.get_many_values_from_cache(self._access_token_revocation_keys(access_token, access_token_id))
+        return not any(revocations)
@@ -1,69 +1,138 @@
 import os
 
 from dotenv import load_dotenv
-from passlib.context import CryptContext
-from typing import List
-
-from application.authentication.dtos.user_dtos import UserCreateDto, UserDto, UserUpdateDto
+from typing import Iterator, List, Tuple
+
+from application.authentication.dtos.user_dtos import (
+    UserBulkCreateErrorDto,
+    UserBulkCreateResultDto,
+    UserCreateDto,
+    UserDto,
+    UserPageDto,
+    UserUpdateDto
+)
+from application.base.cursor import InvalidCursorError, decode_cursor, encode_cursor
 from domain.authentication.entities.user import User
+from domain.authentication.repositories.exceptions import DatabaseIntegrityError
 from domain.authentication.repositories.user_repository import UserRepository
+from infrastructure.security.password_hashing_executor import PasswordHashingExecutor, password_hashing_executor
 
 
 load_dotenv()
 
 
 class UserService:
-    def __init__(self, user_repository: UserRepository):
+    def __init__(self, user_repository: UserRepository, password_hasher: PasswordHashingExecutor = password_hashing_executor):
         self._user_repository = user_repository
+        self._password_hasher = password_hasher
 
     SECRET_KEY = os.getenv("PASSWORD_HASHING_SECRET_KEY")
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
     def create_user(self, user_create_dto: UserCreateDto) -> UserDto:
         user = User(id=None, username=user_create_dto.username, email=user_create_dto.email, password=self.get_password_hash(user_create_dto.password))
         new_user = self._user_repository.save(user)
-        return UserDto(id=new_user.id, username=new_user.username, email=new_user.email, password=new_user.password)
+        return UserDto.from_entity(new_user)
+
+    def create_users(self, user_create_dtos: List[UserCreateDto]) -> UserBulkCreateResultDto:
+        password_hashes = self._password_hasher.hash_many([user.password for user in user_create_dtos])
+        users = [User(id=None, username=dto.username, email=dto.email, password=password_hash) for dto, password_hash in zip(user_create_dtos, password_hashes)]
+        return self._build_bulk_create_result(users, self._user_repository.save_many(users))
 
     def get_user_by_id(self, id: int) -> UserDto | None:
-        user = self._user_repository.get_by_id(id)
+        user = self._user_repository.get_profile_by_id(id)
         if not user:
             return None
-        return UserDto(id=user.id, username=user.username, email=user.email, password=user.password)
+        return UserDto.from_entity(user)
     
     def get_user_by_username(self, username: str) -> UserDto | None:
-        user = self._user_repository.get_by_username(username)
+        user = self._user_repository.get_profile_by_username(username)
+        if not user:
+            return None
+        return UserDto.from_entity(user)
+
+    def get_user_by_login(self, login: str) -> UserDto | None:
+        user = self._user_repository.get_by_login(login)
         if not user:
             return None
-        return UserDto(id=user.id, username=user.username, email=user.email)
+        return UserDto.from_entity(user)
 
     def get_all_users(self, items_per_page: int = 1000, page: int = 0) -> List[UserDto]:
         limit = items_per_page
         offset = items_per_page * page
         users = self._user_repository.get_all(limit, offset)
-        return [UserDto(id=u.id, username=u.username, email=u.email, password=u.password) for u in users]
-
-    def update_user(self, id:int, user_dto: UserUpdateDto):
-        user = self._user_repository.get_by_id(id)
-        user.username = user_dto.username
-        updated_user = self._user_repository.save(user)
-        return UserDto(id=updated_user.id, username=updated_user.username, email=updated_user.email, password=updated_user.password)
+        return [UserDto.from_entity(u) for u in users]
+
+    def get_all_user_rows(self, items_per_page: int = 1000, page: int = 0) -> List[Tuple[int, str, str, int]]:
+        """Same page as get_all_users as (id, username, email, version) tuples, skipping entities and dtos."""
+        return self._user_repository.get_all_rows(items_per_page, items_per_page * page)
+
+    def get_users_page(self, limit: int = 100, cursor: str | None = None, after_id: int | None = None) -> UserPageDto:
+        if cursor is not None:
+            after_id = self._decode_after_id(cursor)
+        # one extra row tells whether there is a next page without issuing another query
+        users = self._user_repository.get_page_after(after_id, limit + 1)
+        return self._build_users_page(users, limit)
+
+    def stream_all_users(self, batch_size: int = 1000) -> Iterator[UserDto]:
+        for user in self._user_repository.stream_all(batch_size):
+            yield UserDto.from_entity(user)
+
+    def update_user(self, id:int, user_dto: UserUpdateDto) -> UserDto | None:
+        updated_user = self._user_repository.update(id, username=user_dto.username)
+        if not updated_user:
+            return None
+        return UserDto.from_entity(updated_user)
 
-    def delete_user_by_id(self, id) -> None:
+    def delete_user_by_id(self, id) -> bool:
         return self._user_repository.delete(id)
 
+    @staticmethod
+    def _decode_after_id(cursor: str) -> int:
+        try:
+            return int(decode_cursor(cursor)["after_id"])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidCursorError("Malformed pagination cursor.")
+
+    @staticmethod
+    def _build_users_page(users: List[User], limit: int) -> UserPageDto:
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = encode_cursor({"after_id": users[-1].id})
+        return UserPageDto(items=[UserDto.from_entity(u) for u in users], next_cursor=next_cursor)
+
+    @staticmethod
+    def _build_bulk_create_result(users: List[User], results: List[User | DatabaseIntegrityError]) -> UserBulkCreateResultDto:
+        created, errors = [], []
+        for index, (user, result) in enumerate(zip(users, results)):
+            if isinstance(result, DatabaseIntegrityError):
+                errors.append(UserBulkCreateErrorDto(index=index, username=user.username, detail=str(result)))
+            else:
+                created.append(UserDto.from_entity(result))
+        return UserBulkCreateResultDto(created=created, errors=errors)
+
     def _verify_password(self, plain: str, hashed: str):
-        return self.pwd_context.verify(plain, hashed)
+        return self._password_hasher.verify(plain, hashed)
 
     def get_password_hash(self, password: str):
-        return self.pwd_context.hash(password)
+        return self._password_hasher.hash(password)
 
-    def check_password_is_valid(self, username: str, password: str):
-        user = self._user_repository.get_by_username(username)
+    def authenticate(self, login: str, password: str) -> UserDto | None:
+        """The user whose password this is, fetched once. login is a username or an email, matched case insensitively."""
+        user = self._user_repository.get_by_login(login)
         if not user:
-            return False
-        if not self._verify_password(password, user.password):
-            return False
-        return True
+            # unknown logins cost a verify too, otherwise response times tell which logins exist
+            self._password_hasher.dummy_verify()
+            return None
+        is_valid, updated_hash = self._password_hasher.verify_and_update(password, user.password)
+        if not is_valid:
+            return None
+        if updated_hash:
+            # the hash predates the current policy, replacing it now spares a migration that would need the passwords
+            self._user_repository.update_password_hash(user.id, user.password, updated_hash)
+        return UserDto.from_entity(user)
+
+    def check_password_is_valid(self, login: str, password: str):
+        return self.authenticate(login, password) is not None
@@ -0,0 +1,22 @@
+import base64
+import json
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+def encode_cursor(position: dict) -> str:
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Malformed pagination cursor.")
+    if not isinstance(position, dict):
+        raise InvalidCursorError("Malformed pagination cursor.")
+    return position
@@ -0,0 +1,6 @@
+import hashlib
+
+
+def strong_etag(*parts) -> str:
+    """Quoted digest of parts that change whenever the representation does, e.g. ids and row versions."""
+    return '"' + hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest() + '"'
@@ -0,0 +1,50 @@
+"""Compares two results files of the same suite, case by case.
+
+Exits with status 1 when a case got slower than the threshold, so it can gate a pipeline.
+"""
+import argparse
+import json
+
+
+def load(path: str) -> dict:
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def change(baseline: float, candidate: float) -> float:
+    return (candidate - baseline) / baseline * 100 if baseline else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p95_ms", help="latency metric compared, lower is better")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent")
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    if baseline["suite"] != candidate["suite"]:
+        raise SystemExit(f"Can not compare a {baseline['suite']} run with a {candidate['suite']} run.")
+
+    print(f"{baseline['revision']} -> {candidate['revision']} ({args.metric})")
+    print(f"{'case':<40}{'baseline':>12}{'candidate':>12}{'change':>10}{'ops/s change':>14}")
+    regressions = []
+    for case, candidate_summary in candidate["results"].items():
+        baseline_summary = baseline["results"].get(case)
+        if baseline_summary is None:
+            print(f"{case:<40}{'-':>12}{candidate_summary[args.metric]:>12.3f}{'new':>10}")
+            continue
+        latency_change = change(baseline_summary[args.metric], candidate_summary[args.metric])
+        throughput_change = change(baseline_summary["ops_per_second"], candidate_summary["ops_per_second"])
+        print(f"{case:<40}{baseline_summary[args.metric]:>12.3f}{candidate_summary[args.metric]:>12.3f}{latency_change:>9.1f}%{throughput_change:>13.1f}%")
+        if latency_change > args.threshold:
+            regressions.append(case)
+
+    if regressions:
+        print(f"slower than {args.threshold}%: {', '.join(regressions)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
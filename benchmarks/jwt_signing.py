@@ -0,0 +1,51 @@
+"""Sign and verify throughput of each supported token signing algorithm, with keys generated on the fly."""
+import argparse
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from infrastructure.security.jwt_keyring import JwtKeyring, SigningKey
+
+
+def build_keyrings() -> dict[str, JwtKeyring]:
+    secret = secrets.token_hex(32)
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ed25519_key = ed25519.Ed25519PrivateKey.generate()
+    keys = [
+        SigningKey("hs256", "HS256", secret, secret),
+        SigningKey("rs256", "RS256", rsa_key.public_key(), rsa_key),
+        SigningKey("eddsa", "EdDSA", ed25519_key.public_key(), ed25519_key),
+    ]
+    return {key.algorithm: JwtKeyring(keys, key.kid) for key in keys}
+
+
+def operations_per_second(operation, iterations: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    return iterations / (time.perf_counter() - started_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    payload = {
+        "username": "benchmark",
+        "email": "benchmark@example.com",
+        "exp": datetime.now(timezone.utc) + timedelta(minutes=15),
+        "jti": secrets.token_hex(16)
+    }
+    print(f"{'algorithm':<10}{'sign/s':>12}{'verify/s':>12}{'token bytes':>14}")
+    for algorithm, keyring in build_keyrings().items():
+        token = keyring.encode(payload)
+        sign_rate = operations_per_second(lambda: keyring.encode(payload), args.iterations)
+        verify_rate = operations_per_second(lambda: keyring.decode(token), args.iterations)
+        print(f"{algorithm:<10}{sign_rate:>12.0f}{verify_rate:>12.0f}{len(token):>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Load scenario against a running api: every virtual user logs in, calls /auth/me repeatedly and refreshes its tokens.
+
+Start the api first (see the README), the benchmark users are created through /users/bulk.
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.reporting import print_table, save_results, summarize
+
+
+PASSWORD = "benchmark-password"
+
+
+async def create_users(client: httpx.AsyncClient, usernames: list) -> None:
+    payload = {"users": [{"username": username, "email": f"{username}@example.com", "password": PASSWORD} for username in usernames]}
+    response = await client.post("/users/bulk", json=payload)
+    # users left by a previous run are reported as duplicates, which is fine
+    if response.status_code not in (201, 207):
+        raise SystemExit(f"Could not create the benchmark users: {response.status_code} {response.text}")
+
+
+async def timed_request(client: httpx.AsyncClient, samples: dict, errors: dict, step: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+    started_at = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        errors[f"{step}:{type(e).__name__}"] += 1
+        return None
+    samples[step].append(time.perf_counter() - started_at)
+    if response.status_code >= 400:
+        errors[f"{step}:{response.status_code}"] += 1
+        return None
+    return response
+
+
+async def virtual_user(client: httpx.AsyncClient, username: str, rounds: int, me_requests: int, samples: dict, errors: dict) -> None:
+    for _ in range(rounds):
+        response = await timed_request(client, samples, errors, "login", "POST", "/auth/token", data={"username": username, "password": PASSWORD})
+        if response is None:
+            continue
+        tokens = response.json()
+        for _ in range(me_requests):
+            await timed_request(client, samples, errors, "me", "GET", "/auth/me", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+        await timed_request(client, samples, errors, "refresh", "POST", "/auth/refresh", headers={"refresh": tokens["refresh_token"]})
+
+
+async def run(args) -> dict:
+    samples, errors = defaultdict(list), defaultdict(int)
+    usernames = [f"load-{i}" for i in range(args.users)]
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        await create_users(client, usernames)
+        started_at = time.perf_counter()
+        await asyncio.gather(*(virtual_user(client, username, args.rounds, args.me_requests, samples, errors) for username in usernames))
+        elapsed_seconds = time.perf_counter() - started_at
+
+    results = {step: summarize(step_samples, elapsed_seconds) for step, step_samples in samples.items()}
+    results["all"] = summarize([sample for step_samples in samples.values() for sample in step_samples], elapsed_seconds)
+    results["all"]["errors"] = dict(errors)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--rounds", type=int, default=5, help="login, me and refresh rounds per user")
+    parser.add_argument("--me-requests", type=int, default=20, help="/auth/me calls per round")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", default=None, help="results file, defaults to benchmarks/results/load-<revision>-<time>.json")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results)
+    if results["all"]["errors"]:
+        print(f"errors: {results['all']['errors']}")
+    parameters = {"base_url": args.base_url, "users": args.users, "rounds": args.rounds, "me_requests": args.me_requests}
+    print(f"results saved to {save_results('load', results, parameters, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Micro benchmarks of the authentication and user services and of the user repository.
+
+Services run against in-memory stand-ins unless --redis-url is given, the repository runs against an in-memory sqlite
+database unless --database-url points to an empty Postgres database (closer to production, tables are dropped after).
+"""
+import argparse
+import itertools
+import os
+
+os.environ.setdefault("PASSWORD_HASHING_SECRET_KEY", "benchmark-secret")
+
+from redis import Redis
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from application.authentication.dtos.authentication_dtos import TokenData
+from application.authentication.dtos.user_dtos import UserCreateDto
+from application.authentication.services.authentication_service import AuthenticationService
+from application.authentication.services.user_service import UserService
+from benchmarks.reporting import measure, print_table, save_results
+from benchmarks.stand_ins import InMemoryCacheService, InMemoryUserRepository
+from domain.authentication.entities.user import User
+from infrastructure.cache.redis_cache_service import RedisCacheService
+from infrastructure.cache.verified_token_cache import VerifiedTokenCache
+from infrastructure.persistence.sql_alchemy.database import Base
+from infrastructure.persistence.sql_alchemy.models.User import UserOrmModel
+from infrastructure.persistence.sql_alchemy.repositories.user_repository import UserSqlAlchemyRepository
+from infrastructure.security.password_hashing_executor import PasswordHashingExecutor
+
+
+SEEDED_USERS = 1000
+
+
+def service_cases(cache_service, iterations: int) -> dict:
+    repository = InMemoryUserRepository()
+    # a single thread keeps bcrypt timings free of pool start up and scheduling noise
+    password_hasher = PasswordHashingExecutor(max_workers=1, max_queue_size=1, use_processes=False)
+    user_service = UserService(repository, password_hasher)
+    user_service.create_user(UserCreateDto(username="benchmark", email="benchmark@example.com", password="benchmark-password"))
+    token_data = TokenData(username="benchmark", email="benchmark@example.com")
+    auth_service = AuthenticationService(repository, cache_service)
+    cached_auth_service = AuthenticationService(repository, cache_service, verified_token_cache=VerifiedTokenCache(1000, 900, 5))
+    access_token = auth_service.create_token_pair(token_data).access_token
+    return {
+        "auth.create_token_pair": (lambda: auth_service.create_token_pair(token_data), iterations),
+        "auth.decode_access_token": (lambda: auth_service.decode_access_token(access_token), iterations),
+        "auth.decode_access_token[verified_cache]": (lambda: cached_auth_service.decode_access_token(access_token), iterations),
+        # bcrypt is slow by design, a few dozen runs are enough for stable percentiles
+        "user.authenticate": (lambda: user_service.authenticate("benchmark", "benchmark-password"), max(iterations // 100, 10)),
+        # should match user.authenticate, a gap between the two reveals which logins exist
+        "user.authenticate[unknown_login]": (lambda: user_service.authenticate("nobody", "benchmark-password"), max(iterations // 100, 10)),
+    }
+
+
+def repository_cases(session: Session, iterations: int, is_postgres: bool) -> dict:
+    session.add_all([UserOrmModel(username=f"seeded{i}", email=f"seeded{i}@example.com", password="hash") for i in range(SEEDED_USERS)])
+    session.commit()
+    repository = UserSqlAlchemyRepository(session)
+    sequence = itertools.count()
+
+    def save():
+        n = next(sequence)
+        repository.save(User(None, f"saved{n}", f"saved{n}@example.com", "hash"))
+
+    def save_many():
+        n = next(sequence)
+        repository.save_many([User(None, f"bulk{n}-{i}", f"bulk{n}-{i}@example.com", "hash") for i in range(100)])
+
+    cases = {
+        "repository.get_by_id": (lambda: repository.get_by_id(SEEDED_USERS // 2), iterations),
+        "repository.get_by_username": (lambda: repository.get_by_username(f"seeded{SEEDED_USERS // 2}"), iterations),
+        "repository.get_all[100]": (lambda: repository.get_all(100, SEEDED_USERS // 2), iterations),
+        "repository.get_page_after[100]": (lambda: repository.get_page_after(SEEDED_USERS // 2, 100), iterations),
+        "repository.save": (save, iterations),
+        "repository.update": (lambda: repository.update(1, username=f"renamed{next(sequence)}"), iterations),
+    }
+    if is_postgres:
+        # ON CONFLICT DO NOTHING is only compiled for Postgres
+        cases["repository.save_many[100]"] = (save_many, max(iterations // 100, 10))
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--output", default=None, help="results file, defaults to benchmarks/results/micro-<revision>-<time>.json")
+    args = parser.parse_args()
+
+    cache_service = RedisCacheService(Redis.from_url(args.redis_url, decode_responses=True)) if args.redis_url else InMemoryCacheService()
+    cases = service_cases(cache_service, args.iterations)
+
+    is_sqlite = args.database_url.startswith("sqlite")
+    engine = create_engine(args.database_url, **({"poolclass": StaticPool, "connect_args": {"check_same_thread": False}} if is_sqlite else {}))
+    if inspect(engine).has_table(UserOrmModel.__tablename__):
+        raise SystemExit("The benchmark database already has a users table, point --database-url to an empty database.")
+    Base.metadata.create_all(engine)
+    try:
+        with Session(engine) as session:
+            cases.update(repository_cases(session, args.iterations, engine.dialect.name == "postgresql"))
+            results = {name: measure(operation, iterations) for name, (operation, iterations) in cases.items()}
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+    print_table(results)
+    path = save_results("micro", results, {"iterations": args.iterations, "redis": bool(args.redis_url), "database": engine.dialect.name}, args.output)
+    print(f"results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Callable, List
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """Nearest rank percentile of already sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    index = max(0, min(len(sorted_samples) - 1, round(fraction * len(sorted_samples) + 0.5) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples: List[float], elapsed_seconds: float) -> dict:
+    """Latency percentiles in milliseconds and throughput of a list of per operation durations in seconds."""
+    sorted_samples = sorted(samples)
+    return {
+        "operations": len(samples),
+        "ops_per_second": round(len(samples) / elapsed_seconds, 2) if elapsed_seconds else 0.0,
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 4) if samples else 0.0,
+        "p50_ms": round(percentile(sorted_samples, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(sorted_samples, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(sorted_samples, 0.99) * 1000, 4),
+        "max_ms": round(sorted_samples[-1] * 1000, 4) if samples else 0.0,
+    }
+
+
+def measure(operation: Callable[[], object], iterations: int, warmup: int = 10) -> dict:
+    for _ in range(warmup):
+        operation()
+    samples = []
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        operation_started_at = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - operation_started_at)
+    return summarize(samples, time.perf_counter() - started_at)
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(suite: str, results: dict, parameters: dict, output: str | None = None) -> str:
+    """Writes results along with what is needed to tell runs apart, returns the path written."""
+    revision = _git_revision()
+    document = {
+        "suite": suite,
+        "revision": revision,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": parameters,
+        "results": results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{suite}-{revision or 'unknown'}-{int(time.time())}.json")
+    with open(output, "w") as results_file:
+        json.dump(document, results_file, indent=2)
+    return output
+
+
+def print_table(results: dict) -> None:
+    print(f"{'case':<40}{'ops/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for case, summary in results.items():
+        print(f"{case:<40}{summary['ops_per_second']:>12.1f}{summary['p50_ms']:>10.3f}{summary['p95_ms']:>10.3f}{summary['p99_ms']:>10.3f}")
@@ -0,0 +1,62 @@
+"""Compares the two ways of rendering a page of users: entities mapped to dtos encoded by FastAPI's jsonable_encoder,
+which is what GET /users/ used to do, against plain rows rendered by orjson, which is what it does now.
+
+Each path is timed with the fetch from an in-memory sqlite database and on its own, on already fetched users.
+"""
+import argparse
+import os
+
+os.environ.setdefault("PASSWORD_HASHING_SECRET_KEY", "benchmark-secret")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from application.authentication.services.user_service import UserService
+from benchmarks.reporting import measure, print_table, save_results
+from infrastructure.persistence.sql_alchemy.database import Base
+from infrastructure.persistence.sql_alchemy.models.User import UserOrmModel
+from infrastructure.persistence.sql_alchemy.repositories.user_repository import UserSqlAlchemyRepository
+from presentation.http.fastapi.json_responses import user_rows_json
+
+
+def render_dtos(users) -> bytes:
+    return JSONResponse(jsonable_encoder(users)).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--output", default=None, help="results file, defaults to benchmarks/results/serialization-<revision>-<time>.json")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([UserOrmModel(username=f"user{i}", email=f"user{i}@example.com", password="hash") for i in range(args.page_size)])
+        session.commit()
+        user_service = UserService(UserSqlAlchemyRepository(session))
+
+        users, rows = user_service.get_all_users(args.page_size), user_service.get_all_user_rows(args.page_size)
+        if render_dtos(users) != user_rows_json(rows):
+            raise SystemExit("Both paths must render the same document.")
+
+        cases = {
+            f"dtos+jsonable_encoder[{args.page_size}]": lambda: render_dtos(users),
+            f"rows+orjson[{args.page_size}]": lambda: user_rows_json(rows),
+            f"fetch+dtos+jsonable_encoder[{args.page_size}]": lambda: render_dtos(user_service.get_all_users(args.page_size)),
+            f"fetch+rows+orjson[{args.page_size}]": lambda: user_rows_json(user_service.get_all_user_rows(args.page_size)),
+        }
+        results = {name: measure(operation, args.iterations) for name, operation in cases.items()}
+    engine.dispose()
+
+    print_table(results)
+    path = save_results("serialization", results, {"iterations": args.iterations, "page_size": args.page_size}, args.output)
+    print(f"results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
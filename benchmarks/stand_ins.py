@@ -0,0 +1,172 @@
+"""In-memory replacements for redis and the user repository, so services can be measured without their backends."""
+import time
+from typing import Iterable, Iterator, List, Tuple, Union
+
+from domain.authentication.entities.user import User
+from domain.authentication.entities.user_profile import UserProfile
+from domain.authentication.repositories.exceptions import DatabaseIntegrityError
+from domain.authentication.repositories.user_repository import UserRepository
+from infrastructure.cache.base_cache_service import BaseCacheService
+from infrastructure.cache.local_sliding_windows import LocalSlidingWindows
+
+
+class InMemoryCacheService(BaseCacheService):
+
+    def __init__(self):
+        self._entries = {}
+        self._sliding_windows = LocalSlidingWindows(max_keys=100000)
+
+    def _get(self, hash_key: str):
+        entry = self._entries.get(hash_key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[hash_key]
+            return None
+        return value
+
+    def _set(self, hash_key: str, value, expiration_time_minutes: int) -> None:
+        self._entries[hash_key] = (value, time.monotonic() + expiration_time_minutes * 60)
+
+    def save_expirable_dict(self, hash_key: str, obj: dict, expiration_time_minutes: int) -> None:
+        self._set(hash_key, {**(self._get(hash_key) or {}), **obj}, expiration_time_minutes)
+
+    def save_expirable_value(self, hash_key: str, value: Union[str, float], expiration_time_minutes: int) -> None:
+        self._set(hash_key, value, expiration_time_minutes)
+
+    def get_dict_key_value_from_cache(self, hash_key: str, key: str) -> Union[str, float]:
+        return (self._get(hash_key) or {}).get(key)
+
+    def get_complete_dict_from_cache(self, hash_key: str) -> dict:
+        return dict(self._get(hash_key) or {})
+
+    def get_value_from_cache(self, hash_key: str) -> Union[str, float]:
+        return self._get(hash_key)
+
+    def remove_from_cache(self, hash_key: str) -> None:
+        self._entries.pop(hash_key, None)
+        self._sliding_windows.remove(hash_key)
+
+    def remove_many_from_cache(self, hash_keys: List[str]) -> None:
+        for hash_key in hash_keys:
+            self.remove_from_cache(hash_key)
+
+    def get_many_values_from_cache(self, hash_keys: List[str]) -> List[Union[str, float, None]]:
+        return [self._get(hash_key) for hash_key in hash_keys]
+
+    def save_many_expirable_values(self, items: Iterable[Tuple[str, Union[str, float], int]]) -> None:
+        for hash_key, value, expiration_time_minutes in items:
+            self._set(hash_key, value, expiration_time_minutes)
+
+    def save_many_expirable_values_and_publish(
+            self,
+            items: Iterable[Tuple[str, Union[str, float], int]],
+            channel: str,
+            messages: List[str],
+            expires_at: float
+        ) -> None:
+        # nothing subscribes to an in-memory cache, only the values matter
+        self.save_many_expirable_values(items)
+
+    def save_expirable_dict_if_absent(
+            self,
+            hash_key: str,
+            obj: dict,
+            expiration_time_minutes: int,
+            blocking_keys: Iterable[str] = ()
+        ) -> Tuple[bool, dict]:
+        if any(self._get(blocking_key) is not None for blocking_key in blocking_keys):
+            return False, {}
+        existing = self._get(hash_key)
+        if existing:
+            return False, dict(existing)
+        self._set(hash_key, dict(obj), expiration_time_minutes)
+        return True, {}
+
+    def add_to_sliding_windows(self, windows: List[Tuple[str, int, float]]) -> List[float]:
+        return self._sliding_windows.add(windows)
+
+
+class InMemoryUserRepository(UserRepository):
+
+    def __init__(self):
+        self._users = {}
+        self._ids_by_username = {}
+        self._next_id = 1
+
+    def get_by_id(self, id: int) -> User | None:
+        return self._users.get(id)
+
+    def get_by_username(self, username: str) -> User | None:
+        return self._users.get(self._ids_by_username.get(username))
+
+    def get_by_login(self, login: str) -> User | None:
+        matches = [user for user in self._users.values() if login.lower() in (user.username.lower(), user.email.lower())]
+        return min(matches, key=lambda user: (user.username != login, user.id), default=None)
+
+    def get_profile_by_id(self, id: int) -> UserProfile | None:
+        return self._profile(self.get_by_id(id))
+
+    def get_profile_by_username(self, username: str) -> UserProfile | None:
+        return self._profile(self.get_by_username(username))
+
+    def get_all(self, limit: int = 1000, offset: int = 0) -> List[UserProfile]:
+        return [self._profile(user) for user in sorted(self._users.values(), key=lambda user: user.id)[offset:offset + limit]]
+
+    def get_all_rows(self, limit: int = 1000, offset: int = 0) -> List[Tuple[int, str, str, int]]:
+        return [(user.id, user.username, user.email, user.version) for user in self.get_all(limit, offset)]
+
+    def get_page_after(self, after_id: int | None = None, limit: int = 1000) -> List[UserProfile]:
+        return [user for user in self.get_all(len(self._users)) if after_id is None or user.id > after_id][:limit]
+
+    def stream_all(self, batch_size: int = 1000) -> Iterator[UserProfile]:
+        return iter(self.get_all(len(self._users)))
+
+    def save(self, user: User) -> User | None:
+        if user.id is not None:
+            return self.update(user.id, username=user.username, email=user.email, password=user.password)
+        if any(existing.username == user.username or existing.email == user.email for existing in self._users.values()):
+            raise DatabaseIntegrityError("Duplicated username and or email.")
+        new_user = User(self._next_id, user.username, user.email, user.password)
+        self._users[new_user.id] = new_user
+        self._ids_by_username[new_user.username] = new_user.id
+        self._next_id += 1
+        return new_user
+
+    def update_password_hash(self, id: int, current_hash: str, new_hash: str) -> bool:
+        user = self._users.get(id)
+        if user is None or user.password != current_hash:
+            return False
+        self._users[id] = User(user.id, user.username, user.email, new_hash, user.version)
+        return True
+
+    def save_many(self, users: List[User]) -> List[User | DatabaseIntegrityError]:
+        results = []
+        for user in users:
+            try:
+                results.append(self.save(user))
+            except DatabaseIntegrityError as e:
+                results.append(e)
+        return results
+
+    def update(self, id: int, **fields) -> User | None:
+        user = self._users.get(id)
+        if user is None:
+            return None
+        updated_user = User(user.id, fields.get("username", user.username), fields.get("email", user.email), fields.get("password", user.password))
+        self._users[id] = updated_user
+        del self._ids_by_username[user.username]
+        self._ids_by_username[updated_user.username] = id
+        return updated_user
+
+    def delete(self, id: int) -> bool:
+        user = self._users.pop(id, None)
+        if user is None:
+            return False
+        del self._ids_by_username[user.username]
+        return True
+
+    @staticmethod
+    def _profile(user: User | None) -> UserProfile | None:
+        return UserProfile(user.id, user.username, user.email, user.version) if user else None
@@ -2,8 +2,11 @@ from domain.base.base_entity import BaseEntity
 
 
 class User(BaseEntity):
-    def __init__(self, id: int | None, username: str, email: str, password: str):
+    __slots__ = ("id", "username", "email", "password", "version")
+
+    def __init__(self, id: int | None, username: str, email: str, password: str, version: int | None = None):
         self.id = id  # pk, auto-increment
         self.username = username  # unique, not-null
         self.email = email  # unique, not-null
         self.password = password  # not-null
+        self.version = version  # incremented on every update, None until persisted
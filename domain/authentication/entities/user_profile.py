@@ -0,0 +1,12 @@
+from domain.base.base_entity import BaseEntity
+
+
+class UserProfile(BaseEntity):
+    """Public projection of a user, loaded by reads that never look at the password hash."""
+    __slots__ = ("id", "username", "email", "version")
+
+    def __init__(self, id: int, username: str, email: str, version: int | None = None):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.version = version
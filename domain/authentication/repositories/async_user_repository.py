@@ -0,0 +1,76 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List, Tuple
+
+from domain.authentication.entities.user import User
+from domain.authentication.entities.user_profile import UserProfile
+from domain.authentication.repositories.exceptions import DatabaseIntegrityError
+
+
+class AsyncUserRepository(ABC):
+
+    @abstractmethod
+    async def get_by_id(self, id: int) -> User | None:
+        pass
+
+    @abstractmethod
+    async def get_by_username(self, username: str) -> User | None:
+        pass
+
+    @abstractmethod
+    async def get_by_login(self, login: str) -> User | None:
+        """Case insensitive lookup by username or email, a user whose username is exactly login comes first."""
+        pass
+
+    @abstractmethod
+    async def get_profile_by_id(self, id: int) -> UserProfile | None:
+        pass
+
+    @abstractmethod
+    async def get_profile_by_username(self, username: str) -> UserProfile | None:
+        pass
+
+    @abstractmethod
+    async def get_all(self, limit: int = 1000, offset: int = 0) -> List[UserProfile]:
+        pass
+
+    @abstractmethod
+    async def get_all_rows(self, limit: int = 1000, offset: int = 0) -> List[Tuple[int, str, str, int]]:
+        """Same users as get_all as (id, username, email, version) tuples, for read only listings."""
+        pass
+
+    @abstractmethod
+    async def get_page_after(self, after_id: int | None = None, limit: int = 1000) -> List[UserProfile]:
+        """Keyset pagination, returns users ordered by id with an id greater than after_id."""
+        pass
+
+    @abstractmethod
+    def stream_all(self, batch_size: int = 1000) -> AsyncIterator[UserProfile]:
+        """Yields every user ordered by id, fetching batch_size rows at a time."""
+        pass
+
+    @abstractmethod
+    async def save(self, user: User) -> User | None:
+        """Inserts users without an id and updates the others, returns None when the user to update does not exist."""
+        pass
+
+    @abstractmethod
+    async def update(self, id: int, **fields) -> User | None:
+        """Updates only the given fields, returns None when the user does not exist."""
+        pass
+
+    @abstractmethod
+    async def update_password_hash(self, id: int, current_hash: str, new_hash: str) -> bool:
+        """Replaces the password hash unless it changed since it was read, returns whether it was replaced.
+
+        Neither the version nor the change listeners are touched, the user is the same one under a stronger hash."""
+        pass
+
+    @abstractmethod
+    async def save_many(self, users: List[User]) -> List[User | DatabaseIntegrityError]:
+        """Inserts new users in batches, returns the created user or the reason it was rejected for each of them."""
+        pass
+
+    @abstractmethod
+    async def delete(self, id: int) -> bool:
+        """Returns whether the user existed."""
+        pass
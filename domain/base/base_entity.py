@@ -2,4 +2,5 @@ from abc import ABC
 
 
 class BaseEntity(ABC):
-    pass
+    # entities are allocated per row, subclasses list their attributes in __slots__ instead of carrying a __dict__
+    __slots__ = ()
@@ -1,4 +1,9 @@
 #!/bin/bash
 
 alembic upgrade head
-python ./presentation/http/fastapi/main.py
\ No newline at end of file
+if [ "$SERVER_MODE" = "production" ]; then
+    # settings are read from gunicorn.conf.py
+    exec gunicorn
+else
+    python ./presentation/http/fastapi/main.py
+fi
@@ -0,0 +1,46 @@
+"""Production server settings, read by gunicorn from the working directory (see entrypoint.sh)."""
+import os
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+def _usable_cpu_count() -> int:
+    # the cores the container may run on, sched_getaffinity only exists on linux
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+wsgi_app = "presentation.http.fastapi.main:app"
+worker_class = "presentation.http.fastapi.uvicorn_worker.ProductionUvicornWorker"
+bind = os.getenv("SERVER_BIND", "0.0.0.0:8000")
+# proxies whose X-Forwarded-For and X-Forwarded-Proto are trusted, comma separated, "*" trusts any
+forwarded_allow_ips = os.getenv("SERVER_FORWARDED_ALLOW_IPS", "127.0.0.1")
+# one worker per core the container may run on, every worker runs its own event loop
+workers = int(os.getenv("WEB_CONCURRENCY") or _usable_cpu_count())
+# every worker has its own password hashing pool, by default they split the cores instead of each taking all of them.
+# Set in the master before forking, so the workers inherit it
+if not os.getenv("PASSWORD_HASHING_WORKERS"):
+    os.environ["PASSWORD_HASHING_WORKERS"] = str(max(1, _usable_cpu_count() // workers))
+
+# above the idle timeout of the load balancer in front, so it never reuses a connection the worker just closed
+keepalive = int(os.getenv("SERVER_KEEPALIVE_SECONDS", 75))
+backlog = int(os.getenv("SERVER_BACKLOG", 2048))
+# workers are recycled after this many requests, the jitter keeps them from restarting all at once
+max_requests = int(os.getenv("SERVER_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", 1000))
+timeout = int(os.getenv("SERVER_TIMEOUT_SECONDS", 30))
+# a worker told to stop (recycle, HUP, deploy) finishes its in flight requests within this time
+graceful_timeout = int(os.getenv("SERVER_GRACEFUL_TIMEOUT_SECONDS", 30))
+
+# every worker imports the app after it was forked, so no connection, pool or thread is ever shared with the master
+preload_app = False
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    # engines, redis pools and the revocation filter synchronizer are opened by the app lifespan, inside the worker
+    server.log.info(f"Worker {worker.pid} forked, opening its pools on startup.")
@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Tuple, Union
+
+
+class AsyncBaseCacheService(ABC):
+
+    @abstractmethod
+    async def save_expirable_dict(self, hash_key: str, obj: dict, expiration_time_minutes: int) -> None:
+        pass
+
+    @abstractmethod
+    async def save_expirable_value(self, hash_key: str, value: Union[str, float], expiration_time_minutes: int) -> None:
+        pass
+
+    @abstractmethod
+    async def get_dict_key_value_from_cache(self, hash_key: str, key: str) -> Union[str, float]:
+        pass
+
+    @abstractmethod
+    async def get_complete_dict_from_cache(self, hash_key: str) -> dict:
+        pass
+
+    @abstractmethod
+    async def get_value_from_cache(self, hash_key: str) -> Union[str, float]:
+        pass
+
+    @abstractmethod
+    async def remove_from_cache(self, hash_key: str) -> None:
+        pass
+
+    @abstractmethod
+    async def remove_many_from_cache(self, hash_keys: List[str]) -> None:
+        """Removes several keys in a single round trip."""
+        pass
+
+    @abstractmethod
+    async def get_many_values_from_cache(self, hash_keys: List[str]) -> List[Union[str, float, None]]:
+        """Fetches several values in a single round trip, missing keys come back as None."""
+        pass
+
+    @abstractmethod
+    async def save_many_expirable_values(self, items: Iterable[Tuple[str, Union[str, float], int]]) -> None:
+        """Saves (hash_key, value, expiration_time_minutes) items in a single round trip."""
+        pass
+
+    @abstractmethod
+    async def save_many_expirable_values_and_publish(
+            self,
+            items: Iterable[Tuple[str, Union[str, float], int]],
+            channel: str,
+            messages: List[str],
+            expires_at: float
+        ) -> None:
+        """Saves items like save_many_expirable_values and, in the same transaction, adds every message to the sorted set
+        named after channel, scored by expires_at (a unix timestamp), and publishes it on channel. Members of that set
+        whose expires_at has passed are dropped."""
+        pass
+
+    @abstractmethod
+    async def save_expirable_dict_if_absent(
+            self,
+            hash_key: str,
+            obj: dict,
+            expiration_time_minutes: int,
+            blocking_keys: Iterable[str] = ()
+        ) -> Tuple[bool, dict]:
+        """Atomically saves obj unless hash_key or any of blocking_keys already exists.
+
+        Returns whether obj was saved and, when it was not, the dict already stored under hash_key (empty when the save
+        was prevented by one of the blocking keys).
+        """
+        pass
+
+    @abstractmethod
+    async def add_to_sliding_windows(self, windows: List[Tuple[str, int, float]]) -> List[float]:
+        """Atomically counts one hit in every (hash_key, limit, window_seconds) sliding window unless one of them is full.
+
+        Returns, per window, the seconds until it has room again, all zeros when the hit was counted.
+        """
+        pass
@@ -0,0 +1,91 @@
+import time
+
+from typing import Iterable, List, Tuple, Union
+
+from redis.asyncio import Redis
+
+from infrastructure.cache.async_base_cache_service import AsyncBaseCacheService
+from infrastructure.cache.redis_cache_service import (
+    ADD_TO_SLIDING_WINDOWS_SCRIPT,
+    SAVE_DICT_IF_ABSENT_SCRIPT,
+    flatten_mapping,
+    sliding_windows_arguments,
+    unflatten_mapping
+)
+
+
+class AsyncRedisCacheService(AsyncBaseCacheService):
+
+    def __init__(self, redis_client: Redis):
+        self._redis_client = redis_client
+        self._save_dict_if_absent_script = redis_client.register_script(SAVE_DICT_IF_ABSENT_SCRIPT)
+        self._add_to_sliding_windows_script = redis_client.register_script(ADD_TO_SLIDING_WINDOWS_SCRIPT)
+
+    async def get_complete_dict_from_cache(self, hash_key: str) -> dict:
+        return await self._redis_client.hgetall(name=hash_key)
+
+    async def get_dict_key_value_from_cache(self, hash_key: str, key: str) -> Union[str, float]:
+        return await self._redis_client.hget(name=hash_key, key=key)
+
+    async def get_value_from_cache(self, hash_key: str) -> Union[str, float]:
+        return await self._redis_client.get(name=hash_key)
+
+    async def get_many_values_from_cache(self, hash_keys: List[str]) -> List[Union[str, float, None]]:
+        if not hash_keys:
+            return []
+        return await self._redis_client.mget(hash_keys)
+
+    async def remove_from_cache(self, hash_key: str) -> None:
+        await self._redis_client.delete(hash_key)
+
+    async def remove_many_from_cache(self, hash_keys: List[str]) -> None:
+        if hash_keys:
+            await self._redis_client.delete(*hash_keys)
+
+    async def save_expirable_dict(self, hash_key: str, obj: dict, expiration_time_minutes: int) -> None:
+        async with self._redis_client.pipeline(transaction=True) as pipeline:
+            pipeline.hset(name=hash_key, mapping=obj)
+            pipeline.expire(name=hash_key, time=expiration_time_minutes * 60)
+            await pipeline.execute()
+
+    async def save_expirable_value(self, hash_key: str, value: Union[str, float], expiration_time_minutes: int) -> None:
+        await self._redis_client.set(name=hash_key, value=value, ex=expiration_time_minutes * 60)
+
+    async def save_many_expirable_values(self, items: Iterable[Tuple[str, Union[str, float], int]]) -> None:
+        async with self._redis_client.pipeline(transaction=True) as pipeline:
+            for hash_key, value, expiration_time_minutes in items:
+                pipeline.set(name=hash_key, value=value, ex=expiration_time_minutes * 60)
+            await pipeline.execute()
+
+    async def save_many_expirable_values_and_publish(
+            self,
+            items: Iterable[Tuple[str, Union[str, float], int]],
+            channel: str,
+            messages: List[str],
+            expires_at: float
+        ) -> None:
+        async with self._redis_client.pipeline(transaction=True) as pipeline:
+            for hash_key, value, expiration_time_minutes in items:
+                pipeline.set(name=hash_key, value=value, ex=expiration_time_minutes * 60)
+            pipeline.zremrangebyscore(channel, "-inf", time.time())
+            pipeline.zadd(channel, {message: expires_at for message in messages})
+            for message in messages:
+                pipeline.publish(channel, message)
+            await pipeline.execute()
+
+    async def save_expirable_dict_if_absent(
+            self,
+            hash_key: str,
+            obj: dict,
+            expiration_time_minutes: int,
+            blocking_keys: Iterable[str] = ()
+        ) -> Tuple[bool, dict]:
+        saved, existing = await self._save_dict_if_absent_script(
+            keys=[hash_key, *blocking_keys],
+            args=[expiration_time_minutes * 60, *flatten_mapping(obj)]
+        )
+        return bool(saved), unflatten_mapping(existing)
+
+    async def add_to_sliding_windows(self, windows: List[Tuple[str, int, float]]) -> List[float]:
+        keys, args = sliding_windows_arguments(windows)
+        return [retry_after_ms / 1000 for retry_after_ms in await self._add_to_sliding_windows_script(keys=keys, args=args)]
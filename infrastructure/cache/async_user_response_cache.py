@@ -0,0 +1,26 @@
+import uuid
+
+from typing import List, Tuple
+
+from domain.authentication.entities.user import User
+from infrastructure.cache.async_base_cache_service import AsyncBaseCacheService
+from infrastructure.cache.user_response_cache import GENERATION_KEY, USER_RESPONSE_CACHE_TTL_MINUTES, response_key
+
+
+class AsyncUserResponseCache:
+    """Awaitable counterpart of UserResponseCache."""
+
+    def __init__(self, cache_service: AsyncBaseCacheService, ttl_minutes: int = USER_RESPONSE_CACHE_TTL_MINUTES):
+        self._cache_service = cache_service
+        self._ttl_minutes = ttl_minutes
+
+    async def get(self, key: str) -> Tuple[str, Tuple[str, str] | None]:
+        generation = await self._cache_service.get_value_from_cache(GENERATION_KEY) or "0"
+        entry = await self._cache_service.get_complete_dict_from_cache(response_key(generation, key))
+        return generation, (entry["etag"], entry["body"]) if entry else None
+
+    async def save(self, generation: str, key: str, etag: str, body: str) -> None:
+        await self._cache_service.save_expirable_dict(response_key(generation, key), {"etag": etag, "body": body}, self._ttl_minutes)
+
+    async def invalidate(self, users: List[User] | None = None) -> None:
+        await self._cache_service.save_expirable_value(GENERATION_KEY, uuid.uuid4().hex, self._ttl_minutes * 2)
@@ -0,0 +1,68 @@
+import time
+
+from typing import Iterable, List, Tuple, Union
+
+from infrastructure.cache.base_cache_service import BaseCacheService
+from infrastructure.instrumentation.request_metrics import record_cache_call
+
+
+class InstrumentedCacheService(BaseCacheService):
+    """Counts and times every call of the wrapped cache service into the metrics of the current request."""
+
+    def __init__(self, cache_service: BaseCacheService):
+        self._cache_service = cache_service
+
+    def _timed(self, method, *args):
+        started_at = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            record_cache_call(time.perf_counter() - started_at)
+
+    def save_expirable_dict(self, hash_key: str, obj: dict, expiration_time_minutes: int) -> None:
+        return self._timed(self._cache_service.save_expirable_dict, hash_key, obj, expiration_time_minutes)
+
+    def save_expirable_value(self, hash_key: str, value: Union[str, float], expiration_time_minutes: int) -> None:
+        return self._timed(self._cache_service.save_expirable_value, hash_key, value, expiration_time_minutes)
+
+    def get_dict_key_value_from_cache(self, hash_key: str, key: str) -> Union[str, float]:
+        return self._timed(self._cache_service.get_dict_key_value_from_cache, hash_key, key)
+
+    def get_complete_dict_from_cache(self, hash_key: str) -> dict:
+        return self._timed(self._cache_service.get_complete_dict_from_cache, hash_key)
+
+    def get_value_from_cache(self, hash_key: str) -> Union[str, float]:
+        return self._timed(self._cache_service.get_value_from_cache, hash_key)
+
+    def remove_from_cache(self, hash_key: str) -> None:
+        return self._timed(self._cache_service.remove_from_cache, hash_key)
+
+    def remove_many_from_cache(self, hash_keys: List[str]) -> None:
+        return self._timed(self._cache_service.remove_many_from_cache, hash_keys)
+
+    def get_many_values_from_cache(self, hash_keys: List[str]) -> List[Union[str, float, None]]:
+        return self._timed(self._cache_service.get_many_values_from_cache, hash_keys)
+
+    def save_many_expirable_values(self, items: Iterable[Tuple[str, Union[str, float], int]]) -> None:
+        return self._timed(self._cache_service.save_many_expirable_values, items)
+
+    def save_many_expirable_values_and_publish(
+            self,
+            items: Iterable[Tuple[str, Union[str, float], int]],
+            channel: str,
+            messages: List[str],
+            expires_at: float
+        ) -> None:
+        return self._timed(self._cache_service.save_many_expirable_values_and_publish, items, channel, messages, expires_at)
+
+    def save_expirable_dict_if_absent(
+            self,
+            hash_key: str,
+            obj: dict,
+            expiration_time_minutes: int,
+            blocking_keys: Iterable[str] = ()
+        ) -> Tuple[bool, dict]:
+        return self._timed(self._cache_service.save_expirable_dict_if_absent, hash_key, obj, expiration_time_minutes, blocking_keys)
+
+    def add_to_sliding_windows(self, windows: List[Tuple[str, int, float]]) -> List[float]:
+        return self._timed(self._cache_service.add_to_sliding_windows, windows)
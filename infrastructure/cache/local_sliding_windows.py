@@ -0,0 +1,43 @@
+import threading
+import time
+
+from collections import OrderedDict, deque
+from typing import Deque, Iterable, List, Tuple
+
+
+class LocalSlidingWindows:
+    """In-process sliding window counters, same semantics as the add_to_sliding_windows of the cache services.
+
+    Holds at most max_keys windows, the least recently hit ones are dropped first.
+    """
+
+    def __init__(self, max_keys: int):
+        self._max_keys = max_keys
+        self._hits: OrderedDict[str, Deque[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, windows: Iterable[Tuple[str, int, float]]) -> List[float]:
+        windows = list(windows)
+        now = time.monotonic()
+        with self._lock:
+            retry_after = []
+            for key, limit, window_seconds in windows:
+                hits = self._hits.get(key)
+                while hits and hits[0] <= now - window_seconds:
+                    hits.popleft()
+                if hits is not None and len(hits) >= limit:
+                    retry_after.append(hits[0] + window_seconds - now if hits else window_seconds)
+                else:
+                    retry_after.append(0.0)
+            if any(retry_after):
+                return retry_after
+            for key, _, _ in windows:
+                self._hits.setdefault(key, deque()).append(now)
+                self._hits.move_to_end(key)
+            while len(self._hits) > self._max_keys:
+                self._hits.popitem(last=False)
+            return retry_after
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._hits.pop(key, None)
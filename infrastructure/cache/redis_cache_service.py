@@ -1,4 +1,7 @@
-from typing import Union
+import time
+import uuid
+
+from typing import Iterable, List, Tuple, Union
 
 from dotenv import load_dotenv
 from redis import Redis
@@ -9,10 +12,75 @@ from infrastructure.cache.base_cache_service import BaseCacheService
 load_dotenv()
 
 
+# KEYS[1] is the hash to be saved, KEYS[2..n] block the save when present. ARGV[1] is the ttl in seconds followed by
+# the flattened field/value pairs of the hash
+SAVE_DICT_IF_ABSENT_SCRIPT = """
+for i = 2, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        return {0, {}}
+    end
+end
+local existing = redis.call('HGETALL', KEYS[1])
+if #existing > 0 then
+    return {0, existing}
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return {1, {}}
+"""
+
+
+# KEYS are sorted sets of hit timestamps in ms, ARGV[1] tells this hit apart followed by the limit and the window in
+# ms of every key. Timestamps come from the redis clock, so hits of every process are ordered alike
+ADD_TO_SLIDING_WINDOWS_SCRIPT = """
+pcall(redis.replicate_commands)
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local retry_after = {}
+local full = false
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[i * 2])
+    local window = tonumber(ARGV[i * 2 + 1])
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', now - window)
+    retry_after[i] = 0
+    if redis.call('ZCARD', KEYS[i]) >= limit then
+        local oldest = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+        retry_after[i] = #oldest > 0 and tonumber(oldest[2]) + window - now or window
+        full = true
+    end
+end
+if not full then
+    for i = 1, #KEYS do
+        redis.call('ZADD', KEYS[i], now, now .. ':' .. ARGV[1])
+        redis.call('PEXPIRE', KEYS[i], ARGV[i * 2 + 1])
+    end
+end
+return retry_after
+"""
+
+
+def sliding_windows_arguments(windows: List[Tuple[str, int, float]]) -> Tuple[list, list]:
+    """Keys and arguments of ADD_TO_SLIDING_WINDOWS_SCRIPT."""
+    args = [uuid.uuid4().hex]
+    for _, limit, window_seconds in windows:
+        args += [limit, int(window_seconds * 1000)]
+    return [key for key, _, _ in windows], args
+
+
+def flatten_mapping(obj: dict) -> list:
+    return [item for pair in obj.items() for item in pair]
+
+
+def unflatten_mapping(items: list) -> dict:
+    return dict(zip(items[::2], items[1::2]))
+
+
 class RedisCacheService(BaseCacheService):
 
     def __init__(self, redis_client: Redis):
         self._redis_client = redis_client
+        self._save_dict_if_absent_script = redis_client.register_script(SAVE_DICT_IF_ABSENT_SCRIPT)
+        self._add_to_sliding_windows_script = redis_client.register_script(ADD_TO_SLIDING_WINDOWS_SCRIPT)
 
     def get_complete_dict_from_cache(self, hash_key: str) -> dict:
         return self._redis_client.hgetall(name=hash_key)
@@ -23,12 +91,62 @@ class RedisCacheService(BaseCacheService):
     def get_value_from_cache(self, hash_key: str) -> Union[str, float]:
         return self._redis_client.get(name=hash_key)
 
+    def get_many_values_from_cache(self, hash_keys: List[str]) -> List[Union[str, float, None]]:
+        if not hash_keys:
+            return []
+        return self._redis_client.mget(hash_keys)
+
     def remove_from_cache(self, hash_key: str) -> None:
         self._redis_client.delete(hash_key)
 
+    def remove_many_from_cache(self, hash_keys: List[str]) -> None:
+        if hash_keys:
+            self._redis_client.delete(*hash_keys)
+
     def save_expirable_dict(self, hash_key: str, obj: dict, expiration_time_minutes: int) -> None:
-        self._redis_client.hset(name=hash_key, mapping=obj)
-        self._redis_client.expire(name=hash_key, time=expiration_time_minutes * 60)
+        with self._redis_client.pipeline(transaction=True) as pipeline:
+            pipeline.hset(name=hash_key, mapping=obj)
+            pipeline.expire(name=hash_key, time=expiration_time_minutes * 60)
+            pipeline.execute()
 
     def save_expirable_value(self, hash_key: str, value: Union[str, float], expiration_time_minutes: int) -> None:
         self._redis_client.set(name=hash_key, value=value, ex=expiration_time_minutes * 60)
+
+    def save_many_expirable_values(self, items: Iterable[Tuple[str, Union[str, float], int]]) -> None:
+        with self._redis_client.pipeline(transaction=True) as pipeline:
+            for hash_key, value, expiration_time_minutes in items:
+                pipeline.set(name=hash_key, value=value, ex=expiration_time_minutes * 60)
+            pipeline.execute()
+
+    def save_many_expirable_values_and_publish(
+            self,
+            items: Iterable[Tuple[str, Union[str, float], int]],
+            channel: str,
+            messages: List[str],
+            expires_at: float
+        ) -> None:
+        with self._redis_client.pipeline(transaction=True) as pipeline:
+            for hash_key, value, expiration_time_minutes in items:
+                pipeline.set(name=hash_key, value=value, ex=expiration_time_minutes * 60)
+            pipeline.zremrangebyscore(channel, "-inf", time.time())
+            pipeline.zadd(channel, {message: expires_at for message in messages})
+            for message in messages:
+                pipeline.publish(channel, message)
+            pipeline.execute()
+
+    def save_expirable_dict_if_absent(
+            self,
+            hash_key: str,
+            obj: dict,
+            expiration_time_minutes: int,
+            blocking_keys: Iterable[str] = ()
+        ) -> Tuple[bool, dict]:
+        saved, existing = self._save_dict_if_absent_script(
+            keys=[hash_key, *blocking_keys],
+            args=[expiration_time_minutes * 60, *flatten_mapping(obj)]
+        )
+        return bool(saved), unflatten_mapping(existing)
+
+    def add_to_sliding_windows(self, windows: List[Tuple[str, int, float]]) -> List[float]:
+        keys, args = sliding_windows_arguments(windows)
+        return [retry_after_ms / 1000 for retry_after_ms in self._add_to_sliding_windows_script(keys=keys, args=args)]
@@ -0,0 +1,89 @@
+import os
+
+import redis
+import redis.asyncio
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+class RedisConnectionPoolManager:
+    """Application scoped redis connection pools.
+
+    Pools are opened once on application startup and shared by every request, clients created from them are cheap
+    wrappers that borrow a connection only while a command is running.
+    """
+
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            max_connections: int,
+            health_check_interval: int,
+            socket_timeout: float,
+            socket_connect_timeout: float,
+            pool_timeout: float
+        ):
+        self._pool_timeout = pool_timeout
+        self._connection_kwargs = dict(
+            host=host,
+            port=port,
+            max_connections=max_connections,
+            health_check_interval=health_check_interval,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_connect_timeout,
+            socket_keepalive=True,
+            decode_responses=True
+        )
+        self._pool: redis.ConnectionPool | None = None
+        self._async_pool: redis.asyncio.ConnectionPool | None = None
+
+    @staticmethod
+    def from_env() -> "RedisConnectionPoolManager":
+        return RedisConnectionPoolManager(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", 50)),
+            health_check_interval=int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30)),
+            socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", 5)),
+            socket_connect_timeout=float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 2)),
+            pool_timeout=float(os.getenv("REDIS_POOL_TIMEOUT", 5))
+        )
+
+    def open(self, api_mode: str) -> None:
+        """Opens the pool of the api mode being served, "sync" or "async", the other one is only opened if asked for."""
+        if api_mode == "async":
+            self._open_async_pool()
+        else:
+            self._open_pool()
+
+    def _open_pool(self) -> None:
+        if self._pool is None:
+            # blocking pools wait for a free connection instead of failing once max_connections is reached
+            self._pool = redis.BlockingConnectionPool(timeout=self._pool_timeout, **self._connection_kwargs)
+
+    def _open_async_pool(self) -> None:
+        if self._async_pool is None:
+            self._async_pool = redis.asyncio.BlockingConnectionPool(timeout=self._pool_timeout, **self._connection_kwargs)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            self._pool.disconnect()
+            self._pool = None
+        if self._async_pool is not None:
+            await self._async_pool.disconnect()
+            self._async_pool = None
+
+    def get_client(self) -> redis.Redis:
+        # the revocation filter synchronizer thread needs a blocking client in async mode too
+        self._open_pool()
+        return redis.Redis(connection_pool=self._pool)
+
+    def get_async_client(self) -> redis.asyncio.Redis:
+        self._open_async_pool()
+        return redis.asyncio.Redis(connection_pool=self._async_pool)
+
+
+redis_connection_pool_manager = RedisConnectionPoolManager.from_env()
@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from redis import Redis, RedisError
+from typing import Callable, List
+
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+REVOCATION_FILTER_ENABLED = os.getenv("AUTH_REVOCATION_FILTER_ENABLED", "true").lower() == "true"
+
+
+class BloomFilter:
+
+    def __init__(self, capacity: int, error_rate: float):
+        self._size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._hash_count = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+
+    def _positions(self, item: str):
+        # double hashing, two 64 bit halves of one digest stand for k independent hash functions
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self._size for i in range(self._hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationFilter:
+    """In-process probabilistic set of revoked token ids.
+
+    A negative answer is definite, so callers can skip the authoritative lookup, a positive one may be a false positive
+    and must be confirmed. Ids are kept in generations spanning the lifetime of the tokens, two generations cover every
+    revocation of a still valid token, older ones are dropped together with the expired tokens they hold.
+    While the filter is not in sync with the other processes every id is reported as possibly revoked.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, generation_seconds: float):
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._generation_seconds = generation_seconds
+        self._lock = threading.Lock()
+        self._generations: List[BloomFilter] = [self._new_generation(), self._new_generation()]
+        self._generation_started_at = time.monotonic()
+        self._synced = False
+        self._listeners: List[Callable[[str], None]] = []
+
+    @staticmethod
+    def from_env(generation_seconds: float) -> "RevocationFilter":
+        return RevocationFilter(
+            capacity=int(os.getenv("AUTH_REVOCATION_FILTER_CAPACITY", 100000)),
+            error_rate=float(os.getenv("AUTH_REVOCATION_FILTER_ERROR_RATE", 0.001)),
+            generation_seconds=generation_seconds
+        )
+
+    @property
+    def synced(self) -> bool:
+        return self._synced
+
+    def mark_synced(self, synced: bool) -> None:
+        self._synced = synced
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Registers a callback for every revocation, made by this process or received from another one."""
+        self._listeners.append(listener)
+
+    def might_be_revoked(self, token_id: str) -> bool:
+        if not self._synced:
+            return True
+        return any(token_id in generation for generation in self._current_generations())
+
+    def add(self, token_id: str) -> None:
+        self._current_generations()[0].add(token_id)
+        for listener in self._listeners:
+            listener(token_id)
+
+    def _new_generation(self) -> BloomFilter:
+        return BloomFilter(self._capacity, self._error_rate)
+
+    def _current_generations(self) -> List[BloomFilter]:
+        if time.monotonic() - self._generation_started_at >= self._generation_seconds:
+            with self._lock:
+                elapsed = time.monotonic() - self._generation_started_at
+                if elapsed >= self._generation_seconds:
+                    rotations = min(int(elapsed // self._generation_seconds), len(self._generations))
+                    self._generations = [self._new_generation() for _ in range(rotations)] + self._generations[:len(self._generations) - rotations]
+                    self._generation_started_at += elapsed // self._generation_seconds * self._generation_seconds
+        return self._generations
+
+
+class RedisRevocationFilterSynchronizer:
+    """Keeps a RevocationFilter in sync across processes through redis.
+
+    Revocations are kept in a sorted set scored by their expiration, which is loaded as a snapshot whenever the
+    subscription to the revocation channel is (re)established, and announced on that channel for live updates. Both
+    are written by whoever revokes, in the transaction that stores the revocation itself, this only reads them.
+    Runs on a daemon thread, the filter is marked out of sync whenever redis can not be reached.
+    """
+
+    RECONNECT_DELAY_SECONDS = 1.0
+
+    def __init__(self, revocation_filter: RevocationFilter, client_factory: Callable[[], Redis], key: str):
+        self._filter = revocation_filter
+        self._client_factory = client_factory
+        self._key = key
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="revocation-filter-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._filter.mark_synced(False)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            pubsub = None
+            try:
+                client = self._client_factory()
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                # subscribing before the snapshot is loaded leaves no gap where a revocation could be missed
+                pubsub.subscribe(self._key)
+                self._load_snapshot(client)
+                self._filter.mark_synced(True)
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=0.5)
+                    if message is not None:
+                        self._filter.add(message["data"])
+            except RedisError as e:
+                logger.warning(f"Revocation filter out of sync: {e}")
+                self._filter.mark_synced(False)
+                self._stopped.wait(self.RECONNECT_DELAY_SECONDS)
+            finally:
+                if pubsub is not None:
+                    pubsub.close()
+
+    def _load_snapshot(self, client: Redis) -> None:
+        now = time.time()
+        with client.pipeline(transaction=False) as pipeline:
+            pipeline.zremrangebyscore(self._key, "-inf", now)
+            pipeline.zrangebyscore(self._key, now, "+inf")
+            _, token_ids = pipeline.execute()
+        for token_id in token_ids:
+            self._filter.add(token_id)
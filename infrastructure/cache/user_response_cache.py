@@ -0,0 +1,47 @@
+import os
+import uuid
+
+from dotenv import load_dotenv
+from typing import List, Tuple
+
+from domain.authentication.entities.user import User
+from infrastructure.cache.base_cache_service import BaseCacheService
+
+
+load_dotenv()
+
+
+USER_RESPONSE_CACHE_ENABLED = os.getenv("USER_RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+USER_RESPONSE_CACHE_TTL_MINUTES = int(os.getenv("USER_RESPONSE_CACHE_TTL_MINUTES", 5))
+
+GENERATION_KEY = "user_responses_generation"
+
+
+def response_key(generation: str, key: str) -> str:
+    return f"user_response_{generation}_{key}"
+
+
+class UserResponseCache:
+    """Shared cache of serialized user responses along with their etags.
+
+    Entries are keyed by a generation that every user write replaces, so one write invalidates them all in a single
+    round trip. A response built from a read that raced with a write is saved under the generation read before it,
+    which is no longer looked up by then.
+    """
+
+    def __init__(self, cache_service: BaseCacheService, ttl_minutes: int = USER_RESPONSE_CACHE_TTL_MINUTES):
+        self._cache_service = cache_service
+        self._ttl_minutes = ttl_minutes
+
+    def get(self, key: str) -> Tuple[str, Tuple[str, str] | None]:
+        """Returns the current generation and the (etag, body) saved for key in it, if any."""
+        generation = self._cache_service.get_value_from_cache(GENERATION_KEY) or "0"
+        entry = self._cache_service.get_complete_dict_from_cache(response_key(generation, key))
+        return generation, (entry["etag"], entry["body"]) if entry else None
+
+    def save(self, generation: str, key: str, etag: str, body: str) -> None:
+        self._cache_service.save_expirable_dict(response_key(generation, key), {"etag": etag, "body": body}, self._ttl_minutes)
+
+    def invalidate(self, users: List[User] | None = None) -> None:
+        # one generation per write however many users it changed, outliving every entry of the generation it replaces
+        self._cache_service.save_expirable_value(GENERATION_KEY, uuid.uuid4().hex, self._ttl_minutes * 2)
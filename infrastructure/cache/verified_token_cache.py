@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from typing import Any, Tuple
+
+from infrastructure.cache.local_ttl_cache import LocalTTLCache
+
+
+load_dotenv()
+
+
+VERIFIED_TOKEN_CACHE_ENABLED = os.getenv("AUTH_VERIFIED_TOKEN_CACHE_ENABLED", "true").lower() == "true"
+
+
+class VerifiedTokenCache:
+    """Bounded cache of tokens whose signature and claims were already verified, each entry expires with its token.
+
+    Entries are dropped when their token id is revoked or their user changes in this process. Changes made by other
+    processes are not announced, so an entry only vouches for its user for user_check_seconds, after which the caller
+    checks the user again and stores the entry anew. Invalidations are recorded rather than searched for, entries are
+    checked against them when read. A user change only has to be remembered for user_check_seconds, any entry cached
+    before it is older than that by then.
+    """
+
+    def __init__(self, max_size: int, max_ttl_seconds: float, user_check_seconds: float):
+        self._max_ttl_seconds = max_ttl_seconds
+        self._user_check_seconds = user_check_seconds
+        self._entries = LocalTTLCache(max_size, max_ttl_seconds)
+        self._revoked_token_ids = LocalTTLCache(max_size, max_ttl_seconds)
+        self._changed_usernames = LocalTTLCache(max_size, user_check_seconds)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def from_env(max_ttl_seconds: float, user_check_seconds: float) -> "VerifiedTokenCache":
+        return VerifiedTokenCache(
+            max_size=int(os.getenv("AUTH_VERIFIED_TOKEN_CACHE_MAX_SIZE", 10000)),
+            max_ttl_seconds=max_ttl_seconds,
+            user_check_seconds=user_check_seconds
+        )
+
+    def get(self, token: str) -> Tuple[Any, bool] | None:
+        """The cached value and whether its user was checked within user_check_seconds."""
+        found, entry = self._entries.get(token)
+        if found:
+            cached_at, token_id, username, value = entry
+            revoked, _ = self._revoked_token_ids.get(token_id)
+            changed, changed_at = self._changed_usernames.get(username)
+            if not revoked and not (changed and changed_at >= cached_at):
+                self._count(hit=True)
+                return value, time.monotonic() - cached_at < self._user_check_seconds
+            self._entries.delete(token)
+        self._count(hit=False)
+        return None
+
+    def set(self, token: str, token_id: str, username: str, value: Any, expires_at: float) -> None:
+        """expires_at is the token exp claim, as a unix timestamp."""
+        ttl_seconds = min(expires_at - time.time(), self._max_ttl_seconds)
+        if ttl_seconds > 0:
+            self._entries.set(token, (time.monotonic(), token_id, username, value), ttl_seconds)
+
+    def invalidate_token_id(self, token_id: str) -> None:
+        self._revoked_token_ids.set(token_id, True)
+
+    def invalidate_username(self, username: str) -> None:
+        self._changed_usernames.set(username, time.monotonic())
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits_total": self.hits,
+            "misses_total": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,51 @@
+import os
+
+from contextvars import ContextVar
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "true").lower() == "true"
+
+
+class RequestMetrics:
+    """Database and cache work done while serving one request."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.cache_calls = 0
+        self.cache_seconds = 0.0
+
+    def record_query(self, seconds: float) -> None:
+        self.db_queries += 1
+        self.db_seconds += seconds
+
+    def record_cache_call(self, seconds: float) -> None:
+        self.cache_calls += 1
+        self.cache_seconds += seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (
+            f'db;desc="{self.db_queries} queries";dur={self.db_seconds * 1000:.2f}, '
+            f'cache;desc="{self.cache_calls} calls";dur={self.cache_seconds * 1000:.2f}, '
+            f'total;dur={total_seconds * 1000:.2f}'
+        )
+
+
+# set by the instrumentation middleware, it follows the request into the threadpool since contexts are copied there
+current_request_metrics: ContextVar[RequestMetrics | None] = ContextVar("current_request_metrics", default=None)
+
+
+def record_query(seconds: float) -> None:
+    request_metrics = current_request_metrics.get()
+    if request_metrics is not None:
+        request_metrics.record_query(seconds)
+
+
+def record_cache_call(seconds: float) -> None:
+    request_metrics = current_request_metrics.get()
+    if request_metrics is not None:
+        request_metrics.record_cache_call(seconds)
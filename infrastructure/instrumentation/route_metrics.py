@@ -0,0 +1,90 @@
+import bisect
+import threading
+
+from typing import Dict, List, Tuple
+
+from infrastructure.instrumentation.request_metrics import RequestMetrics
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# queries per request, a route sitting in the upper buckets is usually issuing one query per item
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str) -> List[str]:
+        lines, cumulative = [], 0
+        for bucket, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bucket}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class RouteMetrics:
+
+    def __init__(self):
+        self.responses: Dict[int, int] = {}
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.db_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = 0.0
+        self.cache_calls = 0
+        self.cache_seconds = 0.0
+
+
+class RouteMetricsRegistry:
+    """Aggregates request metrics per method and route template, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+
+    def observe(self, method: str, route: str, status_code: int, duration_seconds: float, request_metrics: RequestMetrics) -> None:
+        with self._lock:
+            route_metrics = self._routes.get((method, route))
+            if route_metrics is None:
+                route_metrics = self._routes[(method, route)] = RouteMetrics()
+            route_metrics.responses[status_code] = route_metrics.responses.get(status_code, 0) + 1
+            route_metrics.duration.observe(duration_seconds)
+            route_metrics.db_queries.observe(request_metrics.db_queries)
+            route_metrics.db_seconds += request_metrics.db_seconds
+            route_metrics.cache_calls += request_metrics.cache_calls
+            route_metrics.cache_seconds += request_metrics.cache_seconds
+
+    def render_prometheus(self) -> str:
+        requests = ["# TYPE http_requests_total counter"]
+        durations = ["# TYPE http_request_duration_seconds histogram"]
+        queries = ["# TYPE http_request_db_queries histogram"]
+        db_seconds = ["# TYPE http_request_db_seconds_total counter"]
+        cache_calls = ["# TYPE http_request_cache_calls_total counter"]
+        cache_seconds = ["# TYPE http_request_cache_seconds_total counter"]
+        with self._lock:
+            for (method, route), route_metrics in sorted(self._routes.items()):
+                labels = f'method="{method}",route="{route}"'
+                for status_code, count in sorted(route_metrics.responses.items()):
+                    requests.append(f'http_requests_total{{{labels},status="{status_code}"}} {count}')
+                durations += route_metrics.duration.render("http_request_duration_seconds", labels)
+                queries += route_metrics.db_queries.render("http_request_db_queries", labels)
+                db_seconds.append(f"http_request_db_seconds_total{{{labels}}} {route_metrics.db_seconds}")
+                cache_calls.append(f"http_request_cache_calls_total{{{labels}}} {route_metrics.cache_calls}")
+                cache_seconds.append(f"http_request_cache_seconds_total{{{labels}}} {route_metrics.cache_seconds}")
+        return "\n".join(requests + durations + queries + db_seconds + cache_calls + cache_seconds) + "\n"
+
+
+route_metrics = RouteMetricsRegistry()
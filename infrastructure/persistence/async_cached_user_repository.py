@@ -0,0 +1,99 @@
+from typing import AsyncIterator, List, Tuple
+
+from domain.authentication.entities.user import User
+from domain.authentication.entities.user_profile import UserProfile
+from domain.authentication.repositories.exceptions import DatabaseIntegrityError
+from domain.authentication.repositories.async_user_repository import AsyncUserRepository
+from infrastructure.cache.async_base_cache_service import AsyncBaseCacheService
+from infrastructure.cache.local_ttl_cache import LocalTTLCache
+from infrastructure.persistence.cached_user_repository import (
+    USER_CACHE_NEGATIVE_TTL_SECONDS,
+    USER_CACHE_SHARED_TTL_MINUTES,
+    profile_from_cache_mapping,
+    profile_to_cache_mapping,
+    user_cache_key
+)
+
+
+class AsyncUserCacheInvalidator:
+    """Awaitable counterpart of UserCacheInvalidator."""
+
+    def __init__(self, local_cache: LocalTTLCache, shared_cache: AsyncBaseCacheService | None = None):
+        self._local_cache = local_cache
+        self._shared_cache = shared_cache
+
+    async def __call__(self, users: List[User]) -> None:
+        keys = list({user_cache_key(user.username) for user in users})
+        for key in keys:
+            self._local_cache.delete(key)
+        if self._shared_cache is not None:
+            await self._shared_cache.remove_many_from_cache(keys)
+
+
+class AsyncCachedUserRepository(AsyncUserRepository):
+    """Awaitable counterpart of CachedUserRepository, sharing its local cache entries."""
+
+    def __init__(self, user_repository: AsyncUserRepository, local_cache: LocalTTLCache, shared_cache: AsyncBaseCacheService | None = None):
+        self._user_repository = user_repository
+        self._local_cache = local_cache
+        self._shared_cache = shared_cache
+
+    async def get_by_id(self, id: int) -> User | None:
+        return await self._user_repository.get_by_id(id)
+
+    async def get_by_username(self, username: str) -> User | None:
+        return await self._user_repository.get_by_username(username)
+
+    async def get_by_login(self, login: str) -> User | None:
+        # logins hash a password anyway, caching them would only add entries to invalidate
+        return await self._user_repository.get_by_login(login)
+
+    async def get_profile_by_id(self, id: int) -> UserProfile | None:
+        return await self._user_repository.get_profile_by_id(id)
+
+    async def get_profile_by_username(self, username: str) -> UserProfile | None:
+        key = user_cache_key(username)
+        found, profile = self._local_cache.get(key)
+        if found:
+            return profile
+        if self._shared_cache is not None:
+            mapping = await self._shared_cache.get_complete_dict_from_cache(key)
+            if mapping:
+                profile = profile_from_cache_mapping(mapping)
+                await self._remember(key, profile, shared=False)
+                return profile
+        profile = await self._user_repository.get_profile_by_username(username)
+        await self._remember(key, profile)
+        return profile
+
+    async def get_all(self, limit: int = 1000, offset: int = 0) -> List[UserProfile]:
+        return await self._user_repository.get_all(limit, offset)
+
+    async def get_all_rows(self, limit: int = 1000, offset: int = 0) -> List[Tuple[int, str, str, int]]:
+        return await self._user_repository.get_all_rows(limit, offset)
+
+    async def get_page_after(self, after_id: int | None = None, limit: int = 1000) -> List[UserProfile]:
+        return await self._user_repository.get_page_after(after_id, limit)
+
+    def stream_all(self, batch_size: int = 1000) -> AsyncIterator[UserProfile]:
+        return self._user_repository.stream_all(batch_size)
+
+    async def save(self, user: User) -> User | None:
+        return await self._user_repository.save(user)
+
+    async def update(self, id: int, **fields) -> User | None:
+        return await self._user_repository.update(id, **fields)
+
+    async def update_password_hash(self, id: int, current_hash: str, new_hash: str) -> bool:
+        return await self._user_repository.update_password_hash(id, current_hash, new_hash)
+
+    async def save_many(self, users: List[User]) -> List[User | DatabaseIntegrityError]:
+        return await self._user_repository.save_many(users)
+
+    async def delete(self, id: int) -> bool:
+        return await self._user_repository.delete(id)
+
+    async def _remember(self, key: str, profile: UserProfile | None, shared: bool = True) -> None:
+        self._local_cache.set(key, profile, None if profile else USER_CACHE_NEGATIVE_TTL_SECONDS)
+        if shared and self._shared_cache is not None:
+            await self._shared_cache.save_expirable_dict(key, profile_to_cache_mapping(profile), USER_CACHE_SHARED_TTL_MINUTES)
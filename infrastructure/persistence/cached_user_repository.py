@@ -0,0 +1,138 @@
+import os
+
+from dotenv import load_dotenv
+from typing import Iterator, List, Tuple
+
+from domain.authentication.entities.user import User
+from domain.authentication.entities.user_profile import UserProfile
+from domain.authentication.repositories.exceptions import DatabaseIntegrityError
+from domain.authentication.repositories.user_repository import UserRepository
+from infrastructure.cache.base_cache_service import BaseCacheService
+from infrastructure.cache.local_ttl_cache import LocalTTLCache
+
+
+load_dotenv()
+
+
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "true").lower() == "true"
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 5))
+USER_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("USER_CACHE_NEGATIVE_TTL_SECONDS", 2))
+USER_CACHE_SHARED_ENABLED = os.getenv("USER_CACHE_SHARED_ENABLED", "false").lower() == "true"
+USER_CACHE_SHARED_TTL_MINUTES = int(os.getenv("USER_CACHE_SHARED_TTL_MINUTES", 1))
+
+# process wide, repositories are built per request but share these entries
+user_cache = LocalTTLCache(max_size=int(os.getenv("USER_CACHE_MAX_SIZE", 10000)), ttl_seconds=USER_CACHE_TTL_SECONDS)
+
+_MISSING_USER = {"missing": "1"}
+
+
+def user_cache_key(username: str) -> str:
+    return f"user_by_username_{username}"
+
+
+def profile_to_cache_mapping(profile: UserProfile | None) -> dict:
+    if profile is None:
+        return _MISSING_USER
+    # redis hashes can not hold None, an empty version reads back as None
+    version = "" if profile.version is None else profile.version
+    return {"id": profile.id, "username": profile.username, "email": profile.email, "version": version}
+
+
+def profile_from_cache_mapping(mapping: dict) -> UserProfile | None:
+    if mapping.get("missing"):
+        return None
+    version = mapping.get("version")
+    return UserProfile(id=int(mapping["id"]), username=mapping["username"], email=mapping["email"], version=int(version) if version else None)
+
+
+class UserCacheInvalidator:
+    """Change listener for user repositories, drops cached entries of the users a write changed or deleted.
+
+    Only this process' entries and the shared tier are dropped, other processes catch up within USER_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, local_cache: LocalTTLCache, shared_cache: BaseCacheService | None = None):
+        self._local_cache = local_cache
+        self._shared_cache = shared_cache
+
+    def __call__(self, users: List[User]) -> None:
+        keys = list({user_cache_key(user.username) for user in users})
+        for key in keys:
+            self._local_cache.delete(key)
+        if self._shared_cache is not None:
+            self._shared_cache.remove_many_from_cache(keys)
+
+
+class CachedUserRepository(UserRepository):
+    """Read-through decorator caching get_profile_by_username, lookups of unknown usernames are cached as well.
+
+    Entries live in the local LRU first and optionally in a shared tier (redis) that survives across processes. Only
+    profiles are cached, password hashes are always read from the database. Entries are dropped by the UserCacheInvalidator
+    registered as a change listener of the wrapped repository, writes made through this decorator included.
+    """
+
+    def __init__(self, user_repository: UserRepository, local_cache: LocalTTLCache, shared_cache: BaseCacheService | None = None):
+        self._user_repository = user_repository
+        self._local_cache = local_cache
+        self._shared_cache = shared_cache
+
+    def get_by_id(self, id: int) -> User | None:
+        return self._user_repository.get_by_id(id)
+
+    def get_by_username(self, username: str) -> User | None:
+        return self._user_repository.get_by_username(username)
+
+    def get_by_login(self, login: str) -> User | None:
+        # logins hash a password anyway, caching them would only add entries to invalidate
+        return self._user_repository.get_by_login(login)
+
+    def get_profile_by_id(self, id: int) -> UserProfile | None:
+        return self._user_repository.get_profile_by_id(id)
+
+    def get_profile_by_username(self, username: str) -> UserProfile | None:
+        key = user_cache_key(username)
+        found, profile = self._local_cache.get(key)
+        if found:
+            return profile
+        if self._shared_cache is not None:
+            mapping = self._shared_cache.get_complete_dict_from_cache(key)
+            if mapping:
+                profile = profile_from_cache_mapping(mapping)
+                self._remember(key, profile, shared=False)
+                return profile
+        profile = self._user_repository.get_profile_by_username(username)
+        self._remember(key, profile)
+        return profile
+
+    def get_all(self, limit: int = 1000, offset: int = 0) -> List[UserProfile]:
+        return self._user_repository.get_all(limit, offset)
+
+    def get_all_rows(self, limit: int = 1000, offset: int = 0) -> List[Tuple[int, str, str, int]]:
+        return self._user_repository.get_all_rows(limit, offset)
+
+    def get_page_after(self, after_id: int | None = None, limit: int = 1000) -> List[UserProfile]:
+        return self._user_repository.get_page_after(after_id, limit)
+
+    def stream_all(self, batch_size: int = 1000) -> Iterator[UserProfile]:
+        return self._user_repository.stream_all(batch_size)
+
+    def save(self, user: User) -> User | None:
+        return self._user_repository.save(user)
+
+    def update(self, id: int, **fields) -> User | None:
+        return self._user_repository.update(id, **fields)
+
+    def update_password_hash(self, id: int, current_hash: str, new_hash: str) -> bool:
+        # cached profiles hold no hash, nothing to invalidate
+        return self._user_repository.update_password_hash(id, current_hash, new_hash)
+
+    def save_many(self, users: List[User]) -> List[User | DatabaseIntegrityError]:
+        return self._user_repository.save_many(users)
+
+    def delete(self, id: int) -> bool:
+        return self._user_repository.delete(id)
+
+    def _remember(self, key: str, profile: UserProfile | None, shared: bool = True) -> None:
+        self._local_cache.set(key, profile, None if profile else USER_CACHE_NEGATIVE_TTL_SECONDS)
+        if shared and self._shared_cache is not None:
+            self._shared_cache.save_expirable_dict(key, profile_to_cache_mapping(profile), USER_CACHE_SHARED_TTL_MINUTES)
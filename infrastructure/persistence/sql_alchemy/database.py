@@ -1,8 +1,16 @@
 import os
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool
+from typing import List
+
+from infrastructure.instrumentation.request_metrics import INSTRUMENTATION_ENABLED
+from infrastructure.persistence.sql_alchemy.query_instrumentation import instrument_engine
+from infrastructure.persistence.sql_alchemy.routing_session import DatabaseRouter, RoutingSession
+from infrastructure.persistence.sql_alchemy.pool_metrics import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, PoolMetrics
 
 
 load_dotenv()
@@ -14,12 +22,147 @@ pg_password = os.environ.get('POSTGRES_PASSWORD', 'password123')
 pg_port = os.environ.get('POSTGRES_PORT', 5432)
 pg_user = os.environ.get('POSTGRES_USER', 'admin')
 
+# pool settings, ignored when an external pooler (e.g. PgBouncer) owns the connections
+pg_pool_size = int(os.environ.get('POSTGRES_POOL_SIZE', 5))
+pg_max_overflow = int(os.environ.get('POSTGRES_MAX_OVERFLOW', 10))
+pg_pool_timeout = float(os.environ.get('POSTGRES_POOL_TIMEOUT', 30))
+pg_pool_recycle = int(os.environ.get('POSTGRES_POOL_RECYCLE', 1800))
+pg_pool_pre_ping = os.environ.get('POSTGRES_POOL_PRE_PING', 'true').lower() == 'true'
+pg_external_pooler = os.environ.get('POSTGRES_EXTERNAL_POOLER', 'false').lower() == 'true'
+pg_statement_timeout_ms = int(os.environ.get('POSTGRES_STATEMENT_TIMEOUT_MS', 0))
+
+# streaming replicas as comma separated host:port pairs, sharing the database and credentials of the primary
+pg_replica_hosts = [host.strip() for host in os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',') if host.strip()]
+pg_replica_selection = os.environ.get('POSTGRES_REPLICA_SELECTION', 'round_robin')
+pg_replica_max_lag_seconds = float(os.environ.get('POSTGRES_REPLICA_MAX_LAG_SECONDS', 5))
+pg_replica_check_interval_seconds = float(os.environ.get('POSTGRES_REPLICA_CHECK_INTERVAL_SECONDS', 5))
+pg_read_your_writes_seconds = float(os.environ.get('POSTGRES_READ_YOUR_WRITES_SECONDS', 2))
+
 SQLALCHEMY_DATABASE_URL = f"postgresql://{pg_user}:{pg_password}@{pg_host}:{pg_port}/{pg_db}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{pg_user}:{pg_password}@{pg_host}:{pg_port}/{pg_db}"
+REPLICA_DATABASE_URLS = [f"postgresql://{pg_user}:{pg_password}@{host}/{pg_db}" for host in pg_replica_hosts]
+ASYNC_REPLICA_DATABASE_URLS = [f"postgresql+asyncpg://{pg_user}:{pg_password}@{host}/{pg_db}" for host in pg_replica_hosts]
+
+
+def _pool_kwargs(pool_class) -> dict:
+    if pg_external_pooler:
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": pool_class,
+        "pool_size": pg_pool_size,
+        "max_overflow": pg_max_overflow,
+        "pool_timeout": pg_pool_timeout,
+        "pool_recycle": pg_pool_recycle,
+        "pool_pre_ping": pg_pool_pre_ping,
+    }
+
+
+def create_database_engine(url: str = SQLALCHEMY_DATABASE_URL, metrics: PoolMetrics | None = None) -> Engine:
+    connect_args = {}
+    if pg_statement_timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={pg_statement_timeout_ms}"
+    engine = create_engine(url, connect_args=connect_args, **_pool_kwargs(InstrumentedQueuePool))
+    engine.pool.metrics = metrics
+    if INSTRUMENTATION_ENABLED:
+        instrument_engine(engine)
+    return engine
+
+
+def create_async_database_engine(url: str = ASYNC_SQLALCHEMY_DATABASE_URL, metrics: PoolMetrics | None = None) -> AsyncEngine:
+    connect_args = {}
+    if pg_statement_timeout_ms:
+        connect_args["server_settings"] = {"statement_timeout": str(pg_statement_timeout_ms)}
+    if pg_external_pooler:
+        # PgBouncer in transaction mode does not keep prepared statements between transactions
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+    engine = create_async_engine(url, connect_args=connect_args, **_pool_kwargs(InstrumentedAsyncAdaptedQueuePool))
+    engine.sync_engine.pool.metrics = metrics
+    if INSTRUMENTATION_ENABLED:
+        instrument_engine(engine.sync_engine)
+    return engine
+
+
+def create_database_router(primary: Engine, replicas: List[Engine]) -> DatabaseRouter:
+    return DatabaseRouter(
+        primary,
+        replicas,
+        selection=pg_replica_selection,
+        max_lag_seconds=pg_replica_max_lag_seconds,
+        check_interval_seconds=pg_replica_check_interval_seconds,
+        read_your_writes_seconds=pg_read_your_writes_seconds
+    )
+
+
+SqlAlchemySession = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
+# expire_on_commit is disabled because attributes can not be lazily refreshed outside of an awaitable context
+AsyncSqlAlchemySession = async_sessionmaker(sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False)
+
+
+class DatabaseEngineManager:
+    """Owns the application engines, created on startup and disposed on shutdown.
+
+    Session factories above are bound here, so nothing connects to the database at import time.
+    """
+
+    def __init__(self):
+        self.engine: Engine | None = None
+        self.async_engine: AsyncEngine | None = None
+        self.replica_engines: List[Engine] = []
+        self.async_replica_engines: List[AsyncEngine] = []
+        self.router: DatabaseRouter | None = None
+        self.async_router: DatabaseRouter | None = None
+        self._metrics = PoolMetrics()
+        self._async_metrics = PoolMetrics()
+
+    def open(self, api_mode: str) -> None:
+        """Creates the engines of the api mode being served, "sync" or "async", the other stack stays unopened."""
+        if api_mode == "async":
+            self._open_async()
+        else:
+            self._open_sync()
+
+    def _open_sync(self) -> None:
+        if self.engine is None:
+            self.engine = create_database_engine(metrics=self._metrics)
+            if REPLICA_DATABASE_URLS:
+                self.replica_engines = [create_database_engine(url) for url in REPLICA_DATABASE_URLS]
+                self.router = create_database_router(self.engine, self.replica_engines)
+            SqlAlchemySession.configure(bind=self.engine, router=self.router)
+
+    def _open_async(self) -> None:
+        if self.async_engine is None:
+            self.async_engine = create_async_database_engine(metrics=self._async_metrics)
+            if ASYNC_REPLICA_DATABASE_URLS:
+                self.async_replica_engines = [create_async_database_engine(url) for url in ASYNC_REPLICA_DATABASE_URLS]
+                # sessions route their sync side, so the router works with the sync engines of the async ones
+                self.async_router = create_database_router(self.async_engine.sync_engine, [engine.sync_engine for engine in self.async_replica_engines])
+            AsyncSqlAlchemySession.configure(bind=self.async_engine, router=self.async_router)
+
+    async def close(self) -> None:
+        if self.engine is not None:
+            for engine in [self.engine, *self.replica_engines]:
+                engine.dispose()
+            self.engine, self.replica_engines, self.router = None, [], None
+        if self.async_engine is not None:
+            for async_engine in [self.async_engine, *self.async_replica_engines]:
+                await async_engine.dispose()
+            self.async_engine, self.async_replica_engines, self.async_router = None, [], None
+
+    def pool_metrics(self) -> dict:
+        metrics = {}
+        if self.engine is not None:
+            metrics["sync"] = self._metrics.snapshot(self.engine.pool)
+        if self.async_engine is not None:
+            metrics["async"] = self._async_metrics.snapshot(self.async_engine.sync_engine.pool)
+        if self.router is not None:
+            metrics["replicas"] = self.router.snapshot()
+        if self.async_router is not None:
+            metrics["async_replicas"] = self.async_router.snapshot()
+        return metrics
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL
-)
 
-SqlAlchemySession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+database_engine_manager = DatabaseEngineManager()
 
 Base = declarative_base()
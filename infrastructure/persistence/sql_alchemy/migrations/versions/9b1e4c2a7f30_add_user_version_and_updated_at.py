@@ -0,0 +1,29 @@
+"""add user version and updated_at
+
+Revision ID: 9b1e4c2a7f30
+Revises: 5d484d9833ad
+Create Date: 2024-09-02 10:12:41.118407
+
+"""
+import sqlalchemy as sa
+
+from typing import Sequence, Union
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1e4c2a7f30'
+down_revision: Union[str, None] = '5d484d9833ad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # constant defaults, so existing rows are filled without rewriting the table
+    op.add_column('users', sa.Column('version', sa.INTEGER(), nullable=False, server_default='1'))
+    op.add_column('users', sa.Column('updated_at', sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.func.now()))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'updated_at')
+    op.drop_column('users', 'version')
@@ -0,0 +1,36 @@
+"""add user lookup indexes
+
+Revision ID: c4f7a1e9d2b6
+Revises: 9b1e4c2a7f30
+Create Date: 2024-09-09 16:41:07.502913
+
+"""
+import sqlalchemy as sa
+
+from typing import Sequence, Union
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f7a1e9d2b6'
+down_revision: Union[str, None] = '9b1e4c2a7f30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # built concurrently so logins keep working while the indexes are created, which can not happen in a transaction
+    with op.get_context().autocommit_block():
+        # case insensitive logins by username or email
+        op.create_index(
+            'ix_users_lower_username', 'users', [sa.text('lower(username)')], postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_users_lower_email', 'users', [sa.text('lower(email)')], postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_lower_email', 'users', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_users_lower_username', 'users', postgresql_concurrently=True, if_exists=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, DateTime, Index, Integer, String, func
 from sqlalchemy.orm import declarative_base
 
 from domain.authentication.entities.user import User
@@ -13,10 +13,17 @@ class UserOrmModel(Base, BaseOrmModel):
     username = Column(String, nullable=False, unique=True)
     email = Column(String, nullable=False, unique=True)
     password = Column(String, nullable=False)
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
     def to_domain(self) -> User:
-        return User(self.id, self.username, self.email, self.password)
+        return User(self.id, self.username, self.email, self.password, self.version)
 
     @staticmethod
     def from_entity(user: User):
         return UserOrmModel(id=user.id, username=user.username, email=user.email, password=user.password)
+
+
+# mirrors migration c4f7a1e9d2b6, so databases built from the metadata (e.g. in tests) get the same plans
+Index("ix_users_lower_username", func.lower(UserOrmModel.username))
+Index("ix_users_lower_email", func.lower(UserOrmModel.email))
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolMetrics:
+    """Counters for connection checkouts, collected by the instrumented pools below."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self, pool: Pool) -> dict:
+        status = {
+            "pool_class": type(pool).__name__,
+            "checkouts_total": self.checkouts,
+            "checkout_timeouts_total": self.timeouts,
+            "checkout_wait_seconds_total": round(self.wait_seconds_total, 6),
+            "checkout_wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+        if isinstance(pool, QueuePool):
+            status.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return status
+
+
+class _InstrumentedPoolMixin:
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            self._record_wait(time.perf_counter() - started_at, timed_out=True)
+            raise
+        self._record_wait(time.perf_counter() - started_at)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps the pool for a fresh one, the counters must survive it
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        if self.metrics is not None:
+            self.metrics.record_wait(seconds, timed_out)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,19 @@
+import time
+
+from sqlalchemy import Engine, event
+
+from infrastructure.instrumentation.request_metrics import record_query
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.instrumentation_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_query(time.perf_counter() - context.instrumentation_started_at)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Counts and times every statement into the metrics of the current request, async engines pass their sync_engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,142 @@
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, Tuple
+
+from domain.authentication.entities.user import User
+from domain.authentication.entities.user_profile import UserProfile
+from domain.authentication.repositories.async_user_repository import AsyncUserRepository
+from domain.authentication.repositories.exceptions import DatabaseIntegrityError
+from infrastructure.persistence.sql_alchemy.repositories.base_sql_alchemy_repository import BaseAsyncSqlAlchemyRepository
+from infrastructure.persistence.sql_alchemy.models.User import UserOrmModel
+from infrastructure.persistence.sql_alchemy.repositories.user_repository import (
+    BULK_INSERT_BATCH_SIZE,
+    PUBLIC_USER_COLUMNS,
+    USER_COLUMNS,
+    bulk_insert_statement,
+    conflict_error,
+    conflicting_users_query,
+    delete_statement,
+    insert_statement,
+    login_query,
+    password_hash_update_statement,
+    profile_from_row,
+    split_batch_duplicates,
+    update_statement,
+    user_from_row
+)
+
+
+class AsyncUserSqlAlchemyRepository(BaseAsyncSqlAlchemyRepository, AsyncUserRepository):
+
+    def __init__(self, db_session, change_listeners: Iterable[Callable[[List[User]], Awaitable[None]]] = ()):
+        BaseAsyncSqlAlchemyRepository.__init__(self, db_session)
+        # awaited once per write with the previous and the current state of every user it wrote or deleted, e.g. to
+        # invalidate caches
+        self._change_listeners = list(change_listeners)
+
+    async def get_by_id(self, id: int) -> User | None:
+        row = (await self._session.execute(select(*USER_COLUMNS).where(UserOrmModel.id == id))).first()
+        return user_from_row(row) if row else None
+
+    async def get_by_username(self, username: str) -> User | None:
+        row = (await self._session.execute(select(*USER_COLUMNS).where(UserOrmModel.username == username))).first()
+        return user_from_row(row) if row else None
+
+    async def get_by_login(self, login: str) -> User | None:
+        row = (await self._session.execute(login_query(login))).first()
+        return user_from_row(row) if row else None
+
+    async def get_profile_by_id(self, id: int) -> UserProfile | None:
+        row = (await self._session.execute(select(*PUBLIC_USER_COLUMNS).where(UserOrmModel.id == id))).first()
+        return profile_from_row(row) if row else None
+
+    async def get_profile_by_username(self, username: str) -> UserProfile | None:
+        row = (await self._session.execute(select(*PUBLIC_USER_COLUMNS).where(UserOrmModel.username == username))).first()
+        return profile_from_row(row) if row else None
+
+    async def get_all(self, limit: int = 1000, offset: int = 0) -> List[UserProfile]:
+        rows = await self._session.execute(select(*PUBLIC_USER_COLUMNS).order_by(UserOrmModel.id).offset(offset).limit(limit))
+        return [profile_from_row(row) for row in rows]
+
+    async def get_all_rows(self, limit: int = 1000, offset: int = 0) -> List[Tuple[int, str, str, int]]:
+        rows = await self._session.execute(select(*PUBLIC_USER_COLUMNS).order_by(UserOrmModel.id).offset(offset).limit(limit))
+        return [tuple(row) for row in rows]
+
+    async def get_page_after(self, after_id: int | None = None, limit: int = 1000) -> List[UserProfile]:
+        query = select(*PUBLIC_USER_COLUMNS)
+        if after_id is not None:
+            query = query.where(UserOrmModel.id > after_id)
+        rows = await self._session.execute(query.order_by(UserOrmModel.id).limit(limit))
+        return [profile_from_row(row) for row in rows]
+
+    async def stream_all(self, batch_size: int = 1000) -> AsyncIterator[UserProfile]:
+        # yield_per implies a server side cursor, rows are fetched in batches instead of being buffered at once
+        rows = await self._session.stream(select(*PUBLIC_USER_COLUMNS).order_by(UserOrmModel.id).execution_options(yield_per=batch_size))
+        async for row in rows:
+            yield profile_from_row(row)
+
+    async def save(self, user: User) -> User | None:
+        if user.id is not None:
+            return await self.update(user.id, username=user.username, email=user.email, password=user.password)
+        try:
+            row = (await self._session.execute(insert_statement(user))).one()
+            await self._session.commit()
+        except IntegrityError as e:
+            await self._session.rollback()
+            raise DatabaseIntegrityError("Duplicated username and or email.")
+        new_user = user_from_row(row)
+        await self._notify_change(new_user)
+        return new_user
+
+    async def update(self, id: int, **fields) -> User | None:
+        try:
+            row = (await self._session.execute(update_statement(id, fields))).first()
+            await self._session.commit()
+        except IntegrityError as e:
+            await self._session.rollback()
+            raise DatabaseIntegrityError("Duplicated username and or email.")
+        if row is None:
+            return None
+        updated_user = user_from_row(row)
+        await self._notify_change(User(row.id, row.previous_username, row.previous_email, row.password, row.version - 1), updated_user)
+        return updated_user
+
+    async def update_password_hash(self, id: int, current_hash: str, new_hash: str) -> bool:
+        result = await self._session.execute(password_hash_update_statement(id, current_hash, new_hash))
+        await self._session.commit()
+        return result.rowcount > 0
+
+    async def save_many(self, users: List[User]) -> List[User | DatabaseIntegrityError]:
+        unique_users, results = split_batch_duplicates(users)
+        created = {}
+        for start in range(0, len(unique_users), BULK_INSERT_BATCH_SIZE):
+            batch = [user for _, user in unique_users[start:start + BULK_INSERT_BATCH_SIZE]]
+            for row in await self._session.execute(bulk_insert_statement(batch)):
+                created[row.username] = user_from_row(row)
+        await self._session.commit()
+
+        rejected = [(index, user) for index, user in unique_users if user.username not in created]
+        if rejected:
+            rows = (await self._session.execute(conflicting_users_query([user for _, user in rejected]))).all()
+            taken_usernames, taken_emails = {row.username for row in rows}, {row.email for row in rows}
+            for index, user in rejected:
+                results[index] = conflict_error(user, taken_usernames, taken_emails)
+        for index, user in unique_users:
+            if user.username in created:
+                results[index] = created[user.username]
+        await self._notify_change(*created.values())
+        return [results[index] for index in range(len(users))]
+
+    async def delete(self, id: int) -> bool:
+        row = (await self._session.execute(delete_statement(id))).first()
+        await self._session.commit()
+        if row is None:
+            return False
+        await self._notify_change(user_from_row(row))
+        return True
+
+    async def _notify_change(self, *users: User) -> None:
+        if not users:
+            return
+        for listener in self._change_listeners:
+            await listener(list(users))
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 
@@ -8,3 +9,10 @@ class BaseSqlAlchemyRepository(ABC):
     @abstractmethod
     def __init__(self, session: Session):
         self._session = session
+
+
+class BaseAsyncSqlAlchemyRepository(ABC):
+
+    @abstractmethod
+    def __init__(self, session: AsyncSession):
+        self._session = session
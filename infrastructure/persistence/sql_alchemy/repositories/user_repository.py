@@ -1,62 +1,219 @@
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Tuple
 
 from domain.authentication.entities.user import User
+from domain.authentication.entities.user_profile import UserProfile
 from domain.authentication.repositories.exceptions import DatabaseIntegrityError
 from domain.authentication.repositories.user_repository import UserRepository
 from infrastructure.persistence.sql_alchemy.repositories.base_sql_alchemy_repository import BaseSqlAlchemyRepository
 from infrastructure.persistence.sql_alchemy.models.User import UserOrmModel
 
 
+USER_COLUMNS = (UserOrmModel.id, UserOrmModel.username, UserOrmModel.email, UserOrmModel.password, UserOrmModel.version)
+PUBLIC_USER_COLUMNS = (UserOrmModel.id, UserOrmModel.username, UserOrmModel.email, UserOrmModel.version)
+
+# rows per INSERT statement, keeps the bind parameters of a statement well below the driver limits
+BULK_INSERT_BATCH_SIZE = 1000
+
+
+def user_from_row(row) -> User:
+    return User(row.id, row.username, row.email, row.password, row.version)
+
+
+def profile_from_row(row) -> UserProfile:
+    return UserProfile(row.id, row.username, row.email, row.version)
+
+
+def split_batch_duplicates(users: List[User]) -> Tuple[List[Tuple[int, User]], dict]:
+    """Sets apart users repeating the username or email of an earlier user of the same batch."""
+    unique_users, rejected = [], {}
+    usernames, emails = set(), set()
+    for index, user in enumerate(users):
+        if user.username in usernames or user.email in emails:
+            rejected[index] = DatabaseIntegrityError("Duplicated username and or email within the batch.")
+            continue
+        usernames.add(user.username)
+        emails.add(user.email)
+        unique_users.append((index, user))
+    return unique_users, rejected
+
+
+def login_query(login: str):
+    # lower() on both sides matches the ix_users_lower_username and ix_users_lower_email expression indexes
+    return (
+        select(*USER_COLUMNS)
+        .where(or_(func.lower(UserOrmModel.username) == func.lower(login), func.lower(UserOrmModel.email) == func.lower(login)))
+        .order_by((UserOrmModel.username == login).desc(), UserOrmModel.id)
+        .limit(1)
+    )
+
+
+def insert_statement(user: User):
+    return insert(UserOrmModel).values(username=user.username, email=user.email, password=user.password).returning(*USER_COLUMNS)
+
+
+def update_statement(id: int, fields: dict):
+    # the subquery reads the row as it was before the update, so one round trip also tells which username was replaced
+    previous = select(UserOrmModel.id, UserOrmModel.username, UserOrmModel.email).where(UserOrmModel.id == id).with_for_update().subquery("previous")
+    return (
+        update(UserOrmModel)
+        .where(UserOrmModel.id == previous.c.id)
+        .values(**fields, version=UserOrmModel.version + 1, updated_at=func.now())
+        .returning(*USER_COLUMNS, previous.c.username.label("previous_username"), previous.c.email.label("previous_email"))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def password_hash_update_statement(id: int, current_hash: str, new_hash: str):
+    # matching the current hash keeps a rehash from overwriting a password changed in the meantime
+    return (
+        update(UserOrmModel)
+        .where(UserOrmModel.id == id, UserOrmModel.password == current_hash)
+        .values(password=new_hash)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def delete_statement(id: int):
+    return delete(UserOrmModel).where(UserOrmModel.id == id).returning(*USER_COLUMNS).execution_options(synchronize_session=False)
+
+
+def bulk_insert_statement(users: List[User]):
+    # DO NOTHING skips rows conflicting on any unique constraint, RETURNING reports the ones that were inserted
+    return (
+        insert(UserOrmModel)
+        .values([{"username": user.username, "email": user.email, "password": user.password} for user in users])
+        .on_conflict_do_nothing()
+        .returning(*USER_COLUMNS)
+    )
+
+
+def conflicting_users_query(users: List[User]):
+    return select(UserOrmModel.username, UserOrmModel.email).where(
+        or_(UserOrmModel.username.in_([user.username for user in users]), UserOrmModel.email.in_([user.email for user in users]))
+    )
+
+
+def conflict_error(user: User, taken_usernames: set, taken_emails: set) -> DatabaseIntegrityError:
+    taken = [field for field, values in (("username", taken_usernames), ("email", taken_emails)) if getattr(user, field) in values]
+    return DatabaseIntegrityError(f"Duplicated {' and '.join(taken) or 'username and or email'}.")
+
+
 class UserSqlAlchemyRepository(BaseSqlAlchemyRepository, UserRepository):
 
-    def __init__(self, db_session):
+    def __init__(self, db_session, change_listeners: Iterable[Callable[[List[User]], None]] = ()):
         BaseSqlAlchemyRepository.__init__(self, db_session)
+        # called once per write with the previous and the current state of every user it wrote or deleted, e.g. to
+        # invalidate caches
+        self._change_listeners = list(change_listeners)
+
+    # reads select columns instead of entities, rows skip the identity map and are mapped straight to slotted entities
 
     def get_by_id(self, id: int) -> User | None:
-        user: UserOrmModel = self._session.query(UserOrmModel).filter(UserOrmModel.id == id).first()
-        if not user:
-            return None
-        return user.to_domain()
+        row = self._session.execute(select(*USER_COLUMNS).where(UserOrmModel.id == id)).first()
+        return user_from_row(row) if row else None
     
     def get_by_username(self, username: str) -> User | None:
-        user: UserOrmModel = self._session.query(UserOrmModel).filter(UserOrmModel.username == username).first()
-        if not user:
-            return None
-        return user.to_domain()
+        row = self._session.execute(select(*USER_COLUMNS).where(UserOrmModel.username == username)).first()
+        return user_from_row(row) if row else None
 
-    def get_all(self, limit: int = 1000, offset: int = 0) -> List[User]:
-        users = self._session.query(UserOrmModel).order_by(UserOrmModel.id).offset(offset).limit(limit).all()
-        if not users:
-            return []
-        return [user.to_domain() for user in users]
-
-    def save(self, user: User) -> User:
-        old_user = self._session.query(UserOrmModel).filter(UserOrmModel.id == user.id).first()
-        if old_user:
-            try:
-                old_user.email = user.email
-                old_user.username = user.username
-                old_user.password = user.password
-                self._session.merge(old_user)
-                self._session.commit()
-                return old_user
-            except IntegrityError as e:
-                raise DatabaseIntegrityError("Duplicated username and or email.")
+    def get_by_login(self, login: str) -> User | None:
+        row = self._session.execute(login_query(login)).first()
+        return user_from_row(row) if row else None
+
+    def get_profile_by_id(self, id: int) -> UserProfile | None:
+        row = self._session.execute(select(*PUBLIC_USER_COLUMNS).where(UserOrmModel.id == id)).first()
+        return profile_from_row(row) if row else None
+
+    def get_profile_by_username(self, username: str) -> UserProfile | None:
+        row = self._session.execute(select(*PUBLIC_USER_COLUMNS).where(UserOrmModel.username == username)).first()
+        return profile_from_row(row) if row else None
+
+    def get_all(self, limit: int = 1000, offset: int = 0) -> List[UserProfile]:
+        rows = self._session.execute(select(*PUBLIC_USER_COLUMNS).order_by(UserOrmModel.id).offset(offset).limit(limit))
+        return [profile_from_row(row) for row in rows]
+
+    def get_all_rows(self, limit: int = 1000, offset: int = 0) -> List[Tuple[int, str, str, int]]:
+        rows = self._session.execute(select(*PUBLIC_USER_COLUMNS).order_by(UserOrmModel.id).offset(offset).limit(limit))
+        return [tuple(row) for row in rows]
+
+    def get_page_after(self, after_id: int | None = None, limit: int = 1000) -> List[UserProfile]:
+        query = select(*PUBLIC_USER_COLUMNS)
+        if after_id is not None:
+            query = query.where(UserOrmModel.id > after_id)
+        rows = self._session.execute(query.order_by(UserOrmModel.id).limit(limit))
+        return [profile_from_row(row) for row in rows]
+
+    def stream_all(self, batch_size: int = 1000) -> Iterator[UserProfile]:
+        # yield_per implies a server side cursor, rows are fetched in batches instead of being buffered at once
+        rows = self._session.execute(select(*PUBLIC_USER_COLUMNS).order_by(UserOrmModel.id).execution_options(yield_per=batch_size))
+        for row in rows:
+            yield profile_from_row(row)
+
+    def save(self, user: User) -> User | None:
+        if user.id is not None:
+            return self.update(user.id, username=user.username, email=user.email, password=user.password)
+        try:
+            row = self._session.execute(insert_statement(user)).one()
+            self._session.commit()
+        except IntegrityError as e:
+            self._session.rollback()
+            raise DatabaseIntegrityError("Duplicated username and or email.")
+        new_user = user_from_row(row)
+        self._notify_change(new_user)
+        return new_user
 
+    def update(self, id: int, **fields) -> User | None:
         try:
-            user_orm_model = UserOrmModel.from_entity(user)
-            self._session.add(user_orm_model)
+            row = self._session.execute(update_statement(id, fields)).first()
             self._session.commit()
-            self._session.refresh(user_orm_model)
-            return user_orm_model.to_domain()
         except IntegrityError as e:
+            self._session.rollback()
             raise DatabaseIntegrityError("Duplicated username and or email.")
+        if row is None:
+            return None
+        updated_user = user_from_row(row)
+        self._notify_change(User(row.id, row.previous_username, row.previous_email, row.password, row.version - 1), updated_user)
+        return updated_user
+
+    def update_password_hash(self, id: int, current_hash: str, new_hash: str) -> bool:
+        result = self._session.execute(password_hash_update_statement(id, current_hash, new_hash))
+        self._session.commit()
+        return result.rowcount > 0
+
+    def save_many(self, users: List[User]) -> List[User | DatabaseIntegrityError]:
+        unique_users, results = split_batch_duplicates(users)
+        created = {}
+        for start in range(0, len(unique_users), BULK_INSERT_BATCH_SIZE):
+            batch = [user for _, user in unique_users[start:start + BULK_INSERT_BATCH_SIZE]]
+            for row in self._session.execute(bulk_insert_statement(batch)):
+                created[row.username] = user_from_row(row)
+        self._session.commit()
 
-    def delete(self, id: int) -> None:
-        user = self._session.query(UserOrmModel).filter(UserOrmModel.id == id).first()
-        if not user:
-            raise Exception("User not found.")
-        self._session.delete(user)
+        rejected = [(index, user) for index, user in unique_users if user.username not in created]
+        if rejected:
+            rows = self._session.execute(conflicting_users_query([user for _, user in rejected])).all()
+            taken_usernames, taken_emails = {row.username for row in rows}, {row.email for row in rows}
+            for index, user in rejected:
+                results[index] = conflict_error(user, taken_usernames, taken_emails)
+        for index, user in unique_users:
+            if user.username in created:
+                results[index] = created[user.username]
+        self._notify_change(*created.values())
+        return [results[index] for index in range(len(users))]
+
+    def delete(self, id: int) -> bool:
+        row = self._session.execute(delete_statement(id)).first()
         self._session.commit()
-        return None
+        if row is None:
+            return False
+        self._notify_change(user_from_row(row))
+        return True
+
+    def _notify_change(self, *users: User) -> None:
+        if not users:
+            return
+        for listener in self._change_listeners:
+            listener(list(users))
@@ -0,0 +1,151 @@
+import itertools
+import logging
+import threading
+import time
+
+from contextvars import ContextVar
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import Session
+from typing import List
+
+
+logger = logging.getLogger(__name__)
+
+# a replica that is not in recovery (e.g. a promoted one) can not lag, neither can one that replayed all it received
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+ROUND_ROBIN = "round_robin"
+LEAST_CONNECTIONS = "least_connections"
+
+
+class ClientWrites:
+    """When the client of the current request last wrote, as a unix timestamp carried between its requests."""
+
+    def __init__(self, wrote_at: float | None = None):
+        self.wrote_at = wrote_at
+        self.wrote = False
+
+    def mark_write(self) -> None:
+        self.wrote_at = time.time()
+        self.wrote = True
+
+
+# set by the read your writes middleware, outside of a request no client is known and reads are never held back
+current_client_writes: ContextVar[ClientWrites | None] = ContextVar("current_client_writes", default=None)
+
+
+class ReplicaHealth:
+    """Replication lag of one replica, measured at most once per interval by whichever request needs it first."""
+
+    def __init__(self, engine: Engine, max_lag_seconds: float, check_interval_seconds: float):
+        self.engine = engine
+        self._max_lag_seconds = max_lag_seconds
+        self._check_interval_seconds = check_interval_seconds
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self.lag_seconds: float | None = None
+        self.error: str | None = None
+
+    def is_usable(self) -> bool:
+        if time.monotonic() - self._checked_at >= self._check_interval_seconds and self._lock.acquire(blocking=False):
+            # other requests keep using the last known state instead of waiting for this check
+            try:
+                self._check()
+            finally:
+                self._lock.release()
+        return self._was_usable()
+
+    def _was_usable(self) -> bool:
+        return self.error is None and self.lag_seconds is not None and self.lag_seconds <= self._max_lag_seconds
+
+    def _check(self) -> None:
+        try:
+            with self.engine.connect() as connection:
+                self.lag_seconds = float(connection.execute(REPLICA_LAG_QUERY).scalar())
+            self.error = None
+        except Exception as e:
+            if self.error is None:
+                logger.warning(f"Replica {self.engine.url.host} is unavailable, reads fall back to the primary: {e}")
+            self.error = str(e)
+        self._checked_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        """Last known state, without checking: async replicas can only be checked from a session's greenlet."""
+        return {"host": self.engine.url.host, "lag_seconds": self.lag_seconds, "error": self.error, "usable": self._was_usable()}
+
+
+class DatabaseRouter:
+    """Picks the engine of every statement: writes and locking reads go to the primary, plain reads to a replica.
+
+    Reads fall back to the primary when no replica is usable, and stay there for read_your_writes_seconds after the
+    client of the current request wrote, so its follow up requests see its own writes whichever process serves them.
+    Other clients keep reading from the replicas.
+    """
+
+    def __init__(
+            self,
+            primary: Engine,
+            replicas: List[Engine],
+            selection: str = ROUND_ROBIN,
+            max_lag_seconds: float = 5,
+            check_interval_seconds: float = 5,
+            read_your_writes_seconds: float = 2
+        ):
+        if selection not in (ROUND_ROBIN, LEAST_CONNECTIONS):
+            raise Exception(f"Unknown replica selection {selection}, use {ROUND_ROBIN} or {LEAST_CONNECTIONS}.")
+        self.primary = primary
+        self._replicas = [ReplicaHealth(replica, max_lag_seconds, check_interval_seconds) for replica in replicas]
+        self._selection = selection
+        self._next_replica = itertools.count()
+        self._read_your_writes_seconds = read_your_writes_seconds
+
+    @staticmethod
+    def mark_write() -> None:
+        client_writes = current_client_writes.get()
+        if client_writes is not None:
+            client_writes.mark_write()
+
+    def reader(self) -> Engine:
+        client_writes = current_client_writes.get()
+        if client_writes is not None and client_writes.wrote_at is not None and time.time() - client_writes.wrote_at < self._read_your_writes_seconds:
+            return self.primary
+        replicas = [replica for replica in self._replicas if replica.is_usable()]
+        if not replicas:
+            return self.primary
+        if self._selection == LEAST_CONNECTIONS:
+            return min(replicas, key=lambda replica: replica.engine.pool.checkedout()).engine
+        return replicas[next(self._next_replica) % len(replicas)].engine
+
+    def snapshot(self) -> List[dict]:
+        return [replica.snapshot() for replica in self._replicas]
+
+
+class RoutingSession(Session):
+    """Session routing its statements through a DatabaseRouter, without one it is a plain session.
+
+    Once a session wrote, the rest of it reads from the primary too, so a request always sees its own writes.
+    Also serves as the sync_session_class of async sessions, which route to the sync_engine of their engines.
+    """
+
+    def __init__(self, *args, router: DatabaseRouter | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._router = router
+        self._wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._router is None:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._wrote:
+            return self._router.primary
+        if self._flushing or getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None) is not None:
+            self._wrote = True
+            self._router.mark_write()
+            return self._router.primary
+        if getattr(clause, "is_select", False):
+            return self._router.reader()
+        # no statement (a bare connection) or text, which can not be told apart from a write, goes to the primary
+        # without holding back later reads
+        return self._router.primary
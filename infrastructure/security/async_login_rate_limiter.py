@@ -0,0 +1,60 @@
+import logging
+
+from infrastructure.cache.async_base_cache_service import AsyncBaseCacheService
+from infrastructure.cache.local_sliding_windows import LocalSlidingWindows
+from infrastructure.cache.local_ttl_cache import LocalTTLCache
+from infrastructure.security.login_rate_limiter import (
+    LOGIN_RATE_LIMIT_IP_ATTEMPTS,
+    LOGIN_RATE_LIMIT_LOGIN_ATTEMPTS,
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+    blocked_login_keys,
+    local_login_windows,
+    locally_blocked_seconds,
+    login_key,
+    login_rate_limit_windows,
+    remember_blocked_keys
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncLoginRateLimiter:
+    """Awaitable counterpart of LoginRateLimiter, sharing its local tiers."""
+
+    def __init__(
+            self,
+            cache_service: AsyncBaseCacheService,
+            ip_attempts: int = LOGIN_RATE_LIMIT_IP_ATTEMPTS,
+            login_attempts: int = LOGIN_RATE_LIMIT_LOGIN_ATTEMPTS,
+            window_seconds: float = LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+            blocked_keys: LocalTTLCache = blocked_login_keys,
+            local_windows: LocalSlidingWindows = local_login_windows
+        ):
+        self._cache_service = cache_service
+        self._ip_attempts = ip_attempts
+        self._login_attempts = login_attempts
+        self._window_seconds = window_seconds
+        self._blocked_keys = blocked_keys
+        self._local_windows = local_windows
+
+    async def attempt(self, ip: str, login: str) -> float:
+        windows = login_rate_limit_windows(ip, login, self._ip_attempts, self._login_attempts, self._window_seconds)
+        blocked_seconds = locally_blocked_seconds(self._blocked_keys, windows)
+        if blocked_seconds > 0:
+            return blocked_seconds
+        try:
+            retry_after = await self._cache_service.add_to_sliding_windows(windows)
+        except Exception as e:
+            logger.warning(f"Login rate limits fall back to local windows: {e}")
+            retry_after = self._local_windows.add(windows)
+        return remember_blocked_keys(self._blocked_keys, windows, retry_after)
+
+    async def reset(self, login: str) -> None:
+        key = login_key(login)
+        self._blocked_keys.delete(key)
+        self._local_windows.remove(key)
+        try:
+            await self._cache_service.remove_from_cache(key)
+        except Exception as e:
+            logger.warning(f"Could not reset the login rate limit of {login}: {e}")
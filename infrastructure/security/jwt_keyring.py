@@ -0,0 +1,106 @@
+import os
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from dotenv import load_dotenv
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+from typing import Any, Iterable
+
+
+load_dotenv()
+
+
+LEGACY_KEY_ID = "hs256"
+
+
+class SigningKey:
+    """A verification key, along with its private part when tokens can still be signed with it."""
+
+    def __init__(self, kid: str, algorithm: str, verifying_key: Any, signing_key: Any = None):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.verifying_key = verifying_key
+        self.signing_key = signing_key
+
+    @property
+    def is_asymmetric(self) -> bool:
+        return self.algorithm != "HS256"
+
+    @staticmethod
+    def from_pem(kid: str, pem: bytes, passphrase: bytes | None = None) -> "SigningKey":
+        try:
+            private_key = serialization.load_pem_private_key(pem, password=passphrase)
+            public_key = private_key.public_key()
+        except ValueError:
+            # a key whose private part was removed, kept to verify tokens it signed while it was active
+            private_key = None
+            public_key = serialization.load_pem_public_key(pem)
+        if isinstance(public_key, rsa.RSAPublicKey):
+            return SigningKey(kid, "RS256", public_key, private_key)
+        if isinstance(public_key, ed25519.Ed25519PublicKey):
+            return SigningKey(kid, "EdDSA", public_key, private_key)
+        raise Exception(f"Unsupported signing key type for {kid}.")
+
+    def to_jwk(self) -> dict:
+        if self.algorithm == "RS256":
+            jwk = RSAAlgorithm.to_jwk(self.verifying_key, as_dict=True)
+        else:
+            jwk = OKPAlgorithm.to_jwk(self.verifying_key, as_dict=True)
+        jwk.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return jwk
+
+
+class JwtKeyring:
+    """Signs tokens with the active key and verifies them with whichever key their kid header names.
+
+    Every other key is retiring: it still verifies the tokens it signed until they expire, and its public part stays
+    in the JWKS. Tokens issued before kid headers were added are verified with the shared HS256 secret.
+    """
+
+    def __init__(self, keys: Iterable[SigningKey], active_kid: str, legacy_kid: str | None = LEGACY_KEY_ID):
+        self._keys = {key.kid: key for key in keys}
+        if active_kid not in self._keys:
+            raise Exception(f"Active signing key {active_kid} not found.")
+        self._active = self._keys[active_kid]
+        if self._active.is_asymmetric and self._active.signing_key is None:
+            raise Exception(f"Active signing key {active_kid} has no private key.")
+        self._legacy_kid = legacy_kid
+        self._jwks = {"keys": [key.to_jwk() for key in self._keys.values() if key.is_asymmetric]}
+
+    @staticmethod
+    def from_env() -> "JwtKeyring":
+        """Uses the <kid>.pem files of JWT_KEYS_DIR when it is set, the shared HS256 secret otherwise."""
+        secret = os.getenv("PASSWORD_HASHING_SECRET_KEY")
+        keys = []
+        if os.getenv("JWT_LEGACY_HS256_ENABLED", "true").lower() == "true" or not os.getenv("JWT_KEYS_DIR"):
+            keys.append(SigningKey(LEGACY_KEY_ID, "HS256", secret, secret))
+        keys_dir = os.getenv("JWT_KEYS_DIR")
+        if keys_dir:
+            passphrase = os.getenv("JWT_KEYS_PASSPHRASE")
+            for file_name in sorted(os.listdir(keys_dir)):
+                if file_name.endswith(".pem"):
+                    with open(os.path.join(keys_dir, file_name), "rb") as pem_file:
+                        keys.append(SigningKey.from_pem(file_name[:-len(".pem")], pem_file.read(), passphrase.encode() if passphrase else None))
+        return JwtKeyring(keys, os.getenv("JWT_ACTIVE_KEY_ID", LEGACY_KEY_ID))
+
+    @property
+    def active_kid(self) -> str:
+        return self._active.kid
+
+    def encode(self, payload: dict) -> str:
+        return jwt.encode(payload, self._active.signing_key, algorithm=self._active.algorithm, headers={"kid": self._active.kid})
+
+    def decode(self, token: str) -> dict:
+        kid = jwt.get_unverified_header(token).get("kid") or self._legacy_kid
+        key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key.")
+        # pinning the algorithm to the key keeps a token from picking how it gets verified
+        return jwt.decode(token, key.verifying_key, algorithms=[key.algorithm])
+
+    def jwks(self) -> dict:
+        return self._jwks
+
+
+jwt_keyring = JwtKeyring.from_env()
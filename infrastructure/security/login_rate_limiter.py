@@ -0,0 +1,100 @@
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+from typing import List, Tuple
+
+from infrastructure.cache.base_cache_service import BaseCacheService
+from infrastructure.cache.local_sliding_windows import LocalSlidingWindows
+from infrastructure.cache.local_ttl_cache import LocalTTLCache
+
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+LOGIN_RATE_LIMIT_ENABLED = os.getenv("LOGIN_RATE_LIMIT_ENABLED", "true").lower() == "true"
+LOGIN_RATE_LIMIT_WINDOW_SECONDS = float(os.getenv("LOGIN_RATE_LIMIT_WINDOW_SECONDS", 300))
+LOGIN_RATE_LIMIT_IP_ATTEMPTS = int(os.getenv("LOGIN_RATE_LIMIT_IP_ATTEMPTS", 50))
+LOGIN_RATE_LIMIT_LOGIN_ATTEMPTS = int(os.getenv("LOGIN_RATE_LIMIT_LOGIN_ATTEMPTS", 10))
+LOGIN_RATE_LIMIT_LOCAL_MAX_KEYS = int(os.getenv("LOGIN_RATE_LIMIT_LOCAL_MAX_KEYS", 100000))
+
+# process wide, keys the cache service reported as full are answered from here until they have room again
+blocked_login_keys = LocalTTLCache(max_size=LOGIN_RATE_LIMIT_LOCAL_MAX_KEYS, ttl_seconds=LOGIN_RATE_LIMIT_WINDOW_SECONDS)
+# process wide, stands in for the shared windows while the cache service is unreachable
+local_login_windows = LocalSlidingWindows(max_keys=LOGIN_RATE_LIMIT_LOCAL_MAX_KEYS)
+
+
+def login_key(login: str) -> str:
+    # logins match usernames and emails case insensitively, so do their windows
+    return f"login_attempts_login_{login.lower()}"
+
+
+def login_rate_limit_windows(ip: str, login: str, ip_attempts: int, login_attempts: int, window_seconds: float) -> List[Tuple[str, int, float]]:
+    return [(f"login_attempts_ip_{ip}", ip_attempts, window_seconds), (login_key(login), login_attempts, window_seconds)]
+
+
+def locally_blocked_seconds(blocked_keys: LocalTTLCache, windows: List[Tuple[str, int, float]]) -> float:
+    now = time.monotonic()
+    blocked_seconds = 0.0
+    for key, _, _ in windows:
+        found, blocked_until = blocked_keys.get(key)
+        if found:
+            blocked_seconds = max(blocked_seconds, blocked_until - now)
+    return blocked_seconds
+
+
+def remember_blocked_keys(blocked_keys: LocalTTLCache, windows: List[Tuple[str, int, float]], retry_after: List[float]) -> float:
+    now = time.monotonic()
+    for (key, _, _), seconds in zip(windows, retry_after):
+        if seconds > 0:
+            blocked_keys.set(key, now + seconds, ttl_seconds=seconds)
+    return max(retry_after, default=0.0)
+
+
+class LoginRateLimiter:
+    """Sliding window limits on login attempts per client ip and per login, checked before any database or bcrypt work.
+
+    Counters live in the cache service, so they are shared by every process. Keys known to be full are answered
+    locally until they have room again, and local windows take over while the cache service is unreachable.
+    """
+
+    def __init__(
+            self,
+            cache_service: BaseCacheService,
+            ip_attempts: int = LOGIN_RATE_LIMIT_IP_ATTEMPTS,
+            login_attempts: int = LOGIN_RATE_LIMIT_LOGIN_ATTEMPTS,
+            window_seconds: float = LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+            blocked_keys: LocalTTLCache = blocked_login_keys,
+            local_windows: LocalSlidingWindows = local_login_windows
+        ):
+        self._cache_service = cache_service
+        self._ip_attempts = ip_attempts
+        self._login_attempts = login_attempts
+        self._window_seconds = window_seconds
+        self._blocked_keys = blocked_keys
+        self._local_windows = local_windows
+
+    def attempt(self, ip: str, login: str) -> float:
+        """Counts a login attempt, returns 0 when it may proceed or the seconds to wait before trying again."""
+        windows = login_rate_limit_windows(ip, login, self._ip_attempts, self._login_attempts, self._window_seconds)
+        blocked_seconds = locally_blocked_seconds(self._blocked_keys, windows)
+        if blocked_seconds > 0:
+            return blocked_seconds
+        try:
+            retry_after = self._cache_service.add_to_sliding_windows(windows)
+        except Exception as e:
+            logger.warning(f"Login rate limits fall back to local windows: {e}")
+            retry_after = self._local_windows.add(windows)
+        return remember_blocked_keys(self._blocked_keys, windows, retry_after)
+
+    def reset(self, login: str) -> None:
+        """Forgets the attempts of a login that succeeded, so only consecutive failures add up."""
+        key = login_key(login)
+        self._blocked_keys.delete(key)
+        self._local_windows.remove(key)
+        try:
+            self._cache_service.remove_from_cache(key)
+        except Exception as e:
+            logger.warning(f"Could not reset the login rate limit of {login}: {e}")
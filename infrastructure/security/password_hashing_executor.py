@@ -0,0 +1,230 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+from collections import deque
+
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+from typing import List, Tuple
+
+from infrastructure.security.password_hashing_policy import crypt_context_config
+
+
+load_dotenv()
+
+
+# set in every worker from the policy settings the pool was started with
+pwd_context: CryptContext | None = None
+
+
+def _configure_worker(config: str) -> None:
+    global pwd_context
+    pwd_context = CryptContext.from_string(config)
+    # the dummy hash is made on first use, making it now keeps the first unknown login as fast as the others
+    pwd_context.dummy_verify()
+
+
+# worker functions run in the pool, they report when they started (monotonic clock is shared by every process on the
+# host) and how long hashing took, so queue wait and hash time can be told apart
+def _hash_password(password: str) -> tuple[str, float, float]:
+    started_at = time.monotonic()
+    password_hash = pwd_context.hash(password)
+    return password_hash, started_at, time.monotonic() - started_at
+
+
+def _verify_password(plain: str, hashed: str) -> tuple[bool, float, float]:
+    started_at = time.monotonic()
+    is_valid = pwd_context.verify(plain, hashed)
+    return is_valid, started_at, time.monotonic() - started_at
+
+
+def _verify_and_update_password(plain: str, hashed: str) -> tuple[tuple[bool, str | None], float, float]:
+    started_at = time.monotonic()
+    result = pwd_context.verify_and_update(plain, hashed)
+    return result, started_at, time.monotonic() - started_at
+
+
+def _dummy_verify_password() -> tuple[bool, float, float]:
+    started_at = time.monotonic()
+    # verifies against a hash of the default scheme made once per worker, so it costs what a real verify costs
+    pwd_context.dummy_verify()
+    return False, started_at, time.monotonic() - started_at
+
+
+class PasswordHashingQueueFullError(Exception):
+    pass
+
+
+class PasswordHashingMetrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_seconds_total = 0.0
+        self.queue_wait_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+
+    def record(self, queue_wait_seconds: float, hash_seconds: float) -> None:
+        with self._lock:
+            self.completed += 1
+            self.queue_wait_seconds_total += queue_wait_seconds
+            self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, queue_wait_seconds)
+            self.hash_seconds_total += hash_seconds
+            self.hash_seconds_max = max(self.hash_seconds_max, hash_seconds)
+
+    def record_rejection(self) -> None:
+        with self._lock:
+            self.rejected += 1
+
+
+class PasswordHashingExecutor:
+    """Bounded pool dedicated to password hashing.
+
+    Hashing is cpu bound and slow by design, running it on the request threadpool lets a burst of logins starve every
+    other route. Work above max_workers waits on a queue of max_queue_size, anything beyond that is rejected right away
+    with PasswordHashingQueueFullError. Processes are used by default so hashing is not serialized by the GIL.
+
+    Workers hash with the policy of crypt_context_config, which defaults to the one of the environment and is resolved
+    (and calibrated, when asked to) along with the pool.
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int, use_processes: bool = True, crypt_context_config: str | None = None):
+        self._max_workers = max_workers
+        self._max_queue_size = max_queue_size
+        self._use_processes = use_processes
+        self._crypt_context_config = crypt_context_config
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.metrics = PasswordHashingMetrics()
+
+    @staticmethod
+    def from_env() -> "PasswordHashingExecutor":
+        return PasswordHashingExecutor(
+            max_workers=int(os.getenv("PASSWORD_HASHING_WORKERS", os.cpu_count() or 1)),
+            max_queue_size=int(os.getenv("PASSWORD_HASHING_MAX_QUEUE_SIZE", 64)),
+            use_processes=os.getenv("PASSWORD_HASHING_USE_PROCESSES", "true").lower() == "true"
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def hash(self, password: str) -> str:
+        return self._submit(_hash_password, password).result()[0]
+
+    def verify(self, plain: str, hashed: str) -> bool:
+        return self._submit(_verify_password, plain, hashed).result()[0]
+
+    def verify_and_update(self, plain: str, hashed: str) -> Tuple[bool, str | None]:
+        """Also returns a new hash when hashed no longer follows the policy, None otherwise."""
+        return self._submit(_verify_and_update_password, plain, hashed).result()[0]
+
+    def dummy_verify(self) -> bool:
+        """Spends the time of a verify without a hash to verify against, always False."""
+        return self._submit(_dummy_verify_password).result()[0]
+
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hashes a batch across the workers, keeping at most max_workers of its hashes in flight so one batch can not
+        take over the whole queue."""
+        in_flight, password_hashes = deque(), []
+        for password in passwords:
+            if len(in_flight) >= self._max_workers:
+                password_hashes.append(in_flight.popleft().result()[0])
+            in_flight.append(self._submit(_hash_password, password))
+        password_hashes.extend(future.result()[0] for future in in_flight)
+        return password_hashes
+
+    async def hash_async(self, password: str) -> str:
+        return (await asyncio.wrap_future(self._submit(_hash_password, password)))[0]
+
+    async def verify_async(self, plain: str, hashed: str) -> bool:
+        return (await asyncio.wrap_future(self._submit(_verify_password, plain, hashed)))[0]
+
+    async def verify_and_update_async(self, plain: str, hashed: str) -> Tuple[bool, str | None]:
+        return (await asyncio.wrap_future(self._submit(_verify_and_update_password, plain, hashed)))[0]
+
+    async def dummy_verify_async(self) -> bool:
+        return (await asyncio.wrap_future(self._submit(_dummy_verify_password)))[0]
+
+    async def hash_many_async(self, passwords: List[str]) -> List[str]:
+        in_flight, password_hashes = deque(), []
+        for password in passwords:
+            if len(in_flight) >= self._max_workers:
+                password_hashes.append((await asyncio.wrap_future(in_flight.popleft()))[0])
+            in_flight.append(self._submit(_hash_password, password))
+        for future in in_flight:
+            password_hashes.append((await asyncio.wrap_future(future))[0])
+        return password_hashes
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self._max_workers + self._max_queue_size:
+                self.metrics.record_rejection()
+                raise PasswordHashingQueueFullError("Too many password hashing requests, try again later.")
+            self._pending += 1
+            executor = self._get_executor()
+        submitted_at = time.monotonic()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda f: self._on_done(f, submitted_at))
+        return future
+
+    def _get_executor(self) -> Executor:
+        # created on first use, so forked server workers never inherit a pool from their parent
+        if self._executor is None:
+            if self._crypt_context_config is None:
+                self._crypt_context_config = crypt_context_config()
+            initargs = (self._crypt_context_config,)
+            if self._use_processes:
+                self._executor = ProcessPoolExecutor(
+                    self._max_workers, mp_context=multiprocessing.get_context("spawn"), initializer=_configure_worker, initargs=initargs
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self._max_workers, thread_name_prefix="password-hashing", initializer=_configure_worker, initargs=initargs
+                )
+        return self._executor
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _on_done(self, future: Future, submitted_at: float) -> None:
+        self._release()
+        if future.cancelled() or future.exception() is not None:
+            return
+        _, started_at, hash_seconds = future.result()
+        self.metrics.record(max(started_at - submitted_at, 0.0), hash_seconds)
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            "crypt_context": self._crypt_context_config,
+            "max_workers": self._max_workers,
+            "max_queue_size": self._max_queue_size,
+            "pending": self._pending,
+            "completed_total": self.metrics.completed,
+            "rejected_total": self.metrics.rejected,
+            "queue_wait_seconds_total": round(self.metrics.queue_wait_seconds_total, 6),
+            "queue_wait_seconds_max": round(self.metrics.queue_wait_seconds_max, 6),
+            "hash_seconds_total": round(self.metrics.hash_seconds_total, 6),
+            "hash_seconds_max": round(self.metrics.hash_seconds_max, 6),
+        }
+
+
+password_hashing_executor = PasswordHashingExecutor.from_env()
@@ -0,0 +1,60 @@
+import math
+import os
+import time
+
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+from passlib.hash import bcrypt
+from typing import List
+
+
+load_dotenv()
+
+
+# the first scheme hashes new passwords, hashes of the others are still verified and replaced on the next login
+PASSWORD_HASHING_SCHEMES = [scheme.strip() for scheme in os.getenv("PASSWORD_HASHING_SCHEMES", "bcrypt").split(",") if scheme.strip()]
+# a number of rounds, or "auto" for the rounds whose hash takes about PASSWORD_HASHING_TARGET_MS on this host
+PASSWORD_HASHING_BCRYPT_ROUNDS = os.getenv("PASSWORD_HASHING_BCRYPT_ROUNDS", "12")
+PASSWORD_HASHING_TARGET_MS = float(os.getenv("PASSWORD_HASHING_TARGET_MS", 250))
+PASSWORD_HASHING_ARGON2_MEMORY_COST_KIB = int(os.getenv("PASSWORD_HASHING_ARGON2_MEMORY_COST_KIB", 65536))
+PASSWORD_HASHING_ARGON2_TIME_COST = int(os.getenv("PASSWORD_HASHING_ARGON2_TIME_COST", 3))
+PASSWORD_HASHING_ARGON2_PARALLELISM = int(os.getenv("PASSWORD_HASHING_ARGON2_PARALLELISM", 1))
+
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = BCRYPT_MIN_ROUNDS, max_rounds: int = BCRYPT_MAX_ROUNDS) -> int:
+    """Rounds whose hash takes closest to target_ms on this host, every extra round doubles the cost."""
+    # the fastest of a few runs, the others mostly measure scheduling noise
+    elapsed_ms = float("inf")
+    for _ in range(3):
+        started_at = time.perf_counter()
+        bcrypt.using(rounds=min_rounds).hash("calibration")
+        elapsed_ms = min(elapsed_ms, (time.perf_counter() - started_at) * 1000)
+    rounds = min_rounds + round(math.log2(target_ms / elapsed_ms))
+    return max(min_rounds, min(max_rounds, rounds))
+
+
+def crypt_context_config(
+        schemes: List[str] = PASSWORD_HASHING_SCHEMES,
+        bcrypt_rounds: str = PASSWORD_HASHING_BCRYPT_ROUNDS,
+        target_ms: float = PASSWORD_HASHING_TARGET_MS,
+        argon2_memory_cost_kib: int = PASSWORD_HASHING_ARGON2_MEMORY_COST_KIB,
+        argon2_time_cost: int = PASSWORD_HASHING_ARGON2_TIME_COST,
+        argon2_parallelism: int = PASSWORD_HASHING_ARGON2_PARALLELISM
+    ) -> str:
+    """The hashing policy as CryptContext settings, a string so hashing workers can be started with it."""
+    settings = {"schemes": schemes, "default": schemes[0], "deprecated": "auto"}
+    if "bcrypt" in schemes:
+        rounds = calibrate_bcrypt_rounds(target_ms) if bcrypt_rounds == "auto" else int(bcrypt_rounds)
+        # cheaper hashes are upgraded on login while costlier ones are kept, so hosts calibrating a round apart do not
+        # keep replacing each other's hashes
+        settings.update({"bcrypt__default_rounds": rounds, "bcrypt__min_rounds": rounds})
+    if "argon2" in schemes:
+        settings.update({
+            "argon2__memory_cost": argon2_memory_cost_kib,
+            "argon2__time_cost": argon2_time_cost,
+            "argon2__parallelism": argon2_parallelism,
+        })
+    return CryptContext(**settings).to_string()
@@ -0,0 +1,36 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable
+
+from infrastructure.cache.async_base_cache_service import AsyncBaseCacheService
+from infrastructure.persistence.sql_alchemy.database import AsyncSqlAlchemySession
+
+
+class AsyncRequestScope:
+    """Awaitable counterpart of RequestScope."""
+
+    def __init__(
+            self,
+            cache_service_factory: Callable[[], AsyncBaseCacheService],
+            session_factory: Callable[[], AsyncSession] = AsyncSqlAlchemySession
+        ):
+        self._cache_service_factory = cache_service_factory
+        self._session_factory = session_factory
+        self._cache_service: AsyncBaseCacheService | None = None
+        self._session: AsyncSession | None = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    @property
+    def cache_service(self) -> AsyncBaseCacheService:
+        if self._cache_service is None:
+            self._cache_service = self._cache_service_factory()
+        return self._cache_service
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -1,28 +1,188 @@
 import os
 
-import redis
-
+from contextlib import asynccontextmanager, contextmanager
 from dotenv import load_dotenv
+from fastapi import Depends
+from typing import Annotated
 
+from application.authentication.services.async_authentication_service import AsyncAuthenticationService
+from application.authentication.services.async_user_service import AsyncUserService
 from application.authentication.services.authentication_service import AuthenticationService
 from application.authentication.services.user_service import UserService
+from infrastructure.cache.async_instrumented_cache_service import AsyncInstrumentedCacheService
+from infrastructure.cache.async_redis_cache_service import AsyncRedisCacheService
+from infrastructure.cache.async_user_response_cache import AsyncUserResponseCache
+from infrastructure.cache.instrumented_cache_service import InstrumentedCacheService
 from infrastructure.cache.redis_cache_service import RedisCacheService
-from infrastructure.persistence.sql_alchemy.database import SqlAlchemySession
+from infrastructure.cache.redis_connection_pool import redis_connection_pool_manager
+from infrastructure.cache.revocation_filter import REVOCATION_FILTER_ENABLED, RedisRevocationFilterSynchronizer, RevocationFilter
+from infrastructure.cache.user_response_cache import USER_RESPONSE_CACHE_ENABLED, UserResponseCache
+from infrastructure.cache.verified_token_cache import VERIFIED_TOKEN_CACHE_ENABLED, VerifiedTokenCache
+from infrastructure.instrumentation.request_metrics import INSTRUMENTATION_ENABLED
+from infrastructure.persistence.async_cached_user_repository import AsyncCachedUserRepository, AsyncUserCacheInvalidator
+from infrastructure.persistence.cached_user_repository import (
+    USER_CACHE_ENABLED,
+    USER_CACHE_SHARED_ENABLED,
+    USER_CACHE_TTL_SECONDS,
+    CachedUserRepository,
+    UserCacheInvalidator,
+    user_cache
+)
+from infrastructure.persistence.sql_alchemy.repositories.async_user_repository import AsyncUserSqlAlchemyRepository
 from infrastructure.persistence.sql_alchemy.repositories.user_repository import UserSqlAlchemyRepository
+from infrastructure.security.async_login_rate_limiter import AsyncLoginRateLimiter
+from infrastructure.security.login_rate_limiter import LOGIN_RATE_LIMIT_ENABLED, LoginRateLimiter
+from presentation.async_request_scope import AsyncRequestScope
+from presentation.request_scope import RequestScope
 
 
 load_dotenv()
 
 
-def get_user_service():
-    with SqlAlchemySession() as db:
-        user_repository = UserSqlAlchemyRepository(db)
-        yield UserService(user_repository)
+access_token_revocation_filter = None
+access_token_revocation_filter_synchronizer = None
+if REVOCATION_FILTER_ENABLED:
+    access_token_revocation_filter = RevocationFilter.from_env(generation_seconds=AuthenticationService.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    access_token_revocation_filter_synchronizer = RedisRevocationFilterSynchronizer(
+        access_token_revocation_filter,
+        redis_connection_pool_manager.get_client,
+        key=AuthenticationService.REVOKED_ACCESS_TOKENS_KEY
+    )
+
+verified_token_cache = None
+if VERIFIED_TOKEN_CACHE_ENABLED:
+    verified_token_cache = VerifiedTokenCache.from_env(
+        max_ttl_seconds=float(os.getenv("AUTH_VERIFIED_TOKEN_CACHE_MAX_TTL_SECONDS", AuthenticationService.ACCESS_TOKEN_EXPIRE_MINUTES * 60)),
+        # users changed by other processes are rechecked as often as the user cache would notice them
+        user_check_seconds=USER_CACHE_TTL_SECONDS
+    )
+    if access_token_revocation_filter is not None:
+        # revocations received from other processes reach the cache through the filter
+        access_token_revocation_filter.add_listener(verified_token_cache.invalidate_token_id)
+
+
+def _forget_verified_tokens_of(users) -> None:
+    if verified_token_cache is not None:
+        for user in users:
+            verified_token_cache.invalidate_username(user.username)
+
+
+async def _async_forget_verified_tokens_of(users) -> None:
+    _forget_verified_tokens_of(users)
+
+
+def _build_cache_service():
+    cache_service = RedisCacheService(redis_connection_pool_manager.get_client())
+    return InstrumentedCacheService(cache_service) if INSTRUMENTATION_ENABLED else cache_service
+
+
+def _build_async_cache_service():
+    cache_service = AsyncRedisCacheService(redis_connection_pool_manager.get_async_client())
+    return AsyncInstrumentedCacheService(cache_service) if INSTRUMENTATION_ENABLED else cache_service
+
+
+def _build_user_repository(scope: RequestScope, cached: bool = False):
+    shared_cache = scope.cache_service if USER_CACHE_SHARED_ENABLED else None
+    change_listeners = [UserCacheInvalidator(user_cache, shared_cache), _forget_verified_tokens_of]
+    if USER_RESPONSE_CACHE_ENABLED:
+        change_listeners.append(UserResponseCache(scope.cache_service).invalidate)
+    user_repository = UserSqlAlchemyRepository(scope.session, change_listeners=change_listeners)
+    if cached and USER_CACHE_ENABLED:
+        return CachedUserRepository(user_repository, user_cache, shared_cache)
+    return user_repository
+
+
+def _build_async_user_repository(scope: AsyncRequestScope, cached: bool = False):
+    shared_cache = scope.cache_service if USER_CACHE_SHARED_ENABLED else None
+    change_listeners = [AsyncUserCacheInvalidator(user_cache, shared_cache), _async_forget_verified_tokens_of]
+    if USER_RESPONSE_CACHE_ENABLED:
+        change_listeners.append(AsyncUserResponseCache(scope.cache_service).invalidate)
+    user_repository = AsyncUserSqlAlchemyRepository(scope.session, change_listeners=change_listeners)
+    if cached and USER_CACHE_ENABLED:
+        return AsyncCachedUserRepository(user_repository, user_cache, shared_cache)
+    return user_repository
+
+
+@contextmanager
+def request_scope():
+    scope = RequestScope(_build_cache_service)
+    try:
+        yield scope
+    finally:
+        scope.close()
+
+
+def get_request_scope():
+    """FastAPI resolves a dependency once per request, so every service of a request gets this same scope."""
+    with request_scope() as scope:
+        yield scope
+
+
+@contextmanager
+def user_service_scope():
+    with request_scope() as scope:
+        yield UserService(_build_user_repository(scope))
+
+
+def get_user_service(scope: Annotated[RequestScope, Depends(get_request_scope)]):
+    return UserService(_build_user_repository(scope))
+
+
+def get_user_service_scope():
+    """Provides the scope itself for streaming responses, which outlive the dependencies of their route."""
+    return user_service_scope
+
+
+def get_user_response_cache(scope: Annotated[RequestScope, Depends(get_request_scope)]) -> UserResponseCache | None:
+    return UserResponseCache(scope.cache_service) if USER_RESPONSE_CACHE_ENABLED else None
+
+
+def get_login_rate_limiter(scope: Annotated[RequestScope, Depends(get_request_scope)]) -> LoginRateLimiter | None:
+    return LoginRateLimiter(scope.cache_service) if LOGIN_RATE_LIMIT_ENABLED else None
+
+
+def get_authentication_service(scope: Annotated[RequestScope, Depends(get_request_scope)]):
+    user_repository = _build_user_repository(scope, cached=True)
+    return AuthenticationService(user_repository, scope.cache_service, access_token_revocation_filter, verified_token_cache)
+
+
+@asynccontextmanager
+async def async_request_scope():
+    scope = AsyncRequestScope(_build_async_cache_service)
+    try:
+        yield scope
+    finally:
+        await scope.close()
+
+
+async def get_async_request_scope():
+    async with async_request_scope() as scope:
+        yield scope
+
+
+@asynccontextmanager
+async def async_user_service_scope():
+    async with async_request_scope() as scope:
+        yield AsyncUserService(_build_async_user_repository(scope))
+
+
+async def get_async_user_service(scope: Annotated[AsyncRequestScope, Depends(get_async_request_scope)]):
+    return AsyncUserService(_build_async_user_repository(scope))
+
+
+def get_async_user_service_scope():
+    """Provides the scope itself for streaming responses, which outlive the dependencies of their route."""
+    return async_user_service_scope
+
+
+async def get_async_user_response_cache(scope: Annotated[AsyncRequestScope, Depends(get_async_request_scope)]) -> AsyncUserResponseCache | None:
+    return AsyncUserResponseCache(scope.cache_service) if USER_RESPONSE_CACHE_ENABLED else None
+
+
+async def get_async_login_rate_limiter(scope: Annotated[AsyncRequestScope, Depends(get_async_request_scope)]) -> AsyncLoginRateLimiter | None:
+    return AsyncLoginRateLimiter(scope.cache_service) if LOGIN_RATE_LIMIT_ENABLED else None
 
 
-def get_authentication_service():
-    with SqlAlchemySession() as db:
-        redis_client = redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
-        cache_service = RedisCacheService(redis_client)
-        user_repository = UserSqlAlchemyRepository(db)
-        yield AuthenticationService(user_repository, cache_service)
+async def get_async_authentication_service(scope: Annotated[AsyncRequestScope, Depends(get_async_request_scope)]):
+    user_repository = _build_async_user_repository(scope, cached=True)
+    return AsyncAuthenticationService(user_repository, scope.cache_service, access_token_revocation_filter, verified_token_cache)
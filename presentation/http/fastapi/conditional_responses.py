@@ -0,0 +1,20 @@
+from fastapi import Request, Response
+from typing import Callable
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison, which is what If-None-Match calls for."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def conditional_json_response(request: Request, etag: str, render_body: Callable[[], str | bytes]) -> Response:
+    """Answers 304 when the client already holds etag, the body is only rendered otherwise."""
+    # no-cache lets clients keep the response but makes them revalidate it on every use
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(render_body(), media_type="application/json", headers=headers)
@@ -0,0 +1,15 @@
+import orjson
+
+from fastapi import Response
+from pydantic import BaseModel
+from typing import Iterable, Tuple
+
+
+def dto_response(dto: BaseModel, status_code: int = 200, headers: dict | None = None) -> Response:
+    """Serializes dto once in pydantic-core, skipping FastAPI's response model validation and jsonable_encoder."""
+    return Response(dto.model_dump_json(), status_code=status_code, headers=headers, media_type="application/json")
+
+
+def user_rows_json(rows: Iterable[Tuple[int, str, str, int]]) -> bytes:
+    """Renders (id, username, email, version) rows exactly as a list of UserDto would be."""
+    return orjson.dumps([{"username": username, "id": id, "email": email} for id, username, email, _ in rows])
@@ -1,11 +1,25 @@
 import logging
+import os
+
 import uvicorn
 
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 
+from infrastructure.cache.redis_connection_pool import redis_connection_pool_manager
+from infrastructure.instrumentation.request_metrics import INSTRUMENTATION_ENABLED
+from infrastructure.persistence.sql_alchemy.database import database_engine_manager, pg_read_your_writes_seconds, pg_replica_hosts
+from infrastructure.security.password_hashing_executor import PasswordHashingQueueFullError, password_hashing_executor
+from presentation.dependencies import access_token_revocation_filter_synchronizer
+from presentation.http.fastapi.middlewares.instrumentation_middleware import InstrumentationMiddleware
+from presentation.http.fastapi.middlewares.read_your_writes_middleware import ReadYourWritesMiddleware
+from presentation.http.fastapi.routers.async_auth import async_auth_router
+from presentation.http.fastapi.routers.async_user import async_user_router
 from presentation.http.fastapi.routers.user import user_router
 from presentation.http.fastapi.routers.auth import auth_router
+from presentation.http.fastapi.routers.metrics import metrics_router
 
 
 # TODO: check if it is possible to use ormmodel capabilities to get a parsed integrity error handler on repositories
@@ -15,6 +29,9 @@ from presentation.http.fastapi.routers.auth import auth_router
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# "sync" serves routes from the threadpool with blocking drivers, "async" serves them from the event loop
+API_MODE = os.getenv("API_MODE", "sync")
+
 tags_metadata = [
     {
         "name": "users",
@@ -24,11 +41,53 @@ tags_metadata = [
         "name": "auth",
         "description": "Authentication logic.",
     },
+    {
+        "name": "metrics",
+        "description": "Runtime metrics.",
+    },
 ]
 
-app = FastAPI(root_path="", title="Food Services Api", openapi_tags=tags_metadata)
-app.include_router(user_router, prefix="/users", tags=["users"])
-app.include_router(auth_router, prefix="/auth", tags=["auth"])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database_engine_manager.open(app.state.api_mode)
+    redis_connection_pool_manager.open(app.state.api_mode)
+    if access_token_revocation_filter_synchronizer is not None:
+        access_token_revocation_filter_synchronizer.start()
+    yield
+    if access_token_revocation_filter_synchronizer is not None:
+        access_token_revocation_filter_synchronizer.stop()
+    password_hashing_executor.shutdown()
+    await redis_connection_pool_manager.close()
+    await database_engine_manager.close()
+
+
+def password_hashing_queue_full_handler(request: Request, exc: PasswordHashingQueueFullError):
+    return ORJSONResponse({"detail": exc.args}, status_code=503, headers={"Retry-After": "1"})
+
+
+def create_app(api_mode: str = API_MODE) -> FastAPI:
+    # routes returning plain dicts and lists are rendered by orjson, dtos go through dto_response
+    app = FastAPI(root_path="", title="Food Services Api", openapi_tags=tags_metadata, lifespan=lifespan, default_response_class=ORJSONResponse)
+    # the lifespan opens the engines and redis pools of this mode only
+    app.state.api_mode = api_mode
+    if api_mode == "async":
+        app.include_router(async_user_router, prefix="/users", tags=["users"])
+        app.include_router(async_auth_router, prefix="/auth", tags=["auth"])
+    else:
+        app.include_router(user_router, prefix="/users", tags=["users"])
+        app.include_router(auth_router, prefix="/auth", tags=["auth"])
+    app.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
+    if INSTRUMENTATION_ENABLED:
+        app.add_middleware(InstrumentationMiddleware)
+    if pg_replica_hosts:
+        app.add_middleware(ReadYourWritesMiddleware, read_your_writes_seconds=pg_read_your_writes_seconds)
+    app.add_exception_handler(PasswordHashingQueueFullError, password_hashing_queue_full_handler)
+    return app
+
+
+app = create_app()
+logger.info(f"Serving {API_MODE} routes.")
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, log_level="info", reload_excludes=["./database/*"])
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, log_level="info", loop="uvloop", http="httptools", reload_excludes=["./database/*"])
@@ -0,0 +1,60 @@
+import os
+import time
+
+from dotenv import load_dotenv
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from infrastructure.instrumentation.request_metrics import RequestMetrics, current_request_metrics
+from infrastructure.instrumentation.route_metrics import RouteMetricsRegistry, route_metrics
+
+
+load_dotenv()
+
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+
+class InstrumentationMiddleware:
+    """Collects the queries, cache calls and latency of each request.
+
+    They are reported in a Server-Timing header and aggregated per route template. Written as plain ASGI rather than
+    BaseHTTPMiddleware, which would run the route in another task and buffer streaming responses.
+    """
+
+    def __init__(self, app: ASGIApp, registry: RouteMetricsRegistry = route_metrics, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self._registry = registry
+        self._server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_metrics = RequestMetrics()
+        token = current_request_metrics.set(request_metrics)
+        started_at = time.perf_counter()
+        status_code = 500
+
+        async def send_with_server_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self._server_timing:
+                    MutableHeaders(scope=message).append("Server-Timing", request_metrics.server_timing(time.perf_counter() - started_at))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            current_request_metrics.reset(token)
+            # the matched route is left in the scope by the router, templates keep the label cardinality bounded
+            route = scope.get("route")
+            self._registry.observe(
+                scope["method"],
+                route.path_format if route is not None else "unmatched",
+                status_code,
+                time.perf_counter() - started_at,
+                request_metrics
+            )
@@ -0,0 +1,51 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from infrastructure.persistence.sql_alchemy.routing_session import ClientWrites, current_client_writes
+
+
+class ReadYourWritesMiddleware:
+    """Carries the time of a client's last write between its requests in a cookie.
+
+    Reads of a request whose client wrote within read_your_writes_seconds go to the primary, on whichever process
+    serves it, while every other client keeps reading from the replicas.
+    """
+
+    COOKIE_NAME = "last_write_at"
+
+    def __init__(self, app: ASGIApp, read_your_writes_seconds: float):
+        self.app = app
+        self._read_your_writes_seconds = read_your_writes_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client_writes = ClientWrites(self._wrote_at(HTTPConnection(scope).cookies.get(self.COOKIE_NAME)))
+        token = current_client_writes.set(client_writes)
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and client_writes.wrote:
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{self.COOKIE_NAME}={client_writes.wrote_at:.3f}; Max-Age={max(1, round(self._read_your_writes_seconds))}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            current_client_writes.reset(token)
+
+    @staticmethod
+    def _wrote_at(cookie: str | None) -> float | None:
+        try:
+            # a timestamp from the future would hold the client's reads back for longer than asked
+            return min(float(cookie), time.time()) if cookie else None
+        except ValueError:
+            return None
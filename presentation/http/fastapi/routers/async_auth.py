@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, Header, Request, Response
+from fastapi.security import OAuth2PasswordRequestForm
+from typing import Annotated
+
+from application.authentication.dtos.authentication_dtos import TokenPairResponseDto, TokenData
+from application.authentication.services.async_authentication_service import AsyncAuthenticationService
+from application.authentication.services.async_user_service import AsyncUserService
+from domain.authentication.entities.user import User
+from infrastructure.security.async_login_rate_limiter import AsyncLoginRateLimiter
+from infrastructure.security.jwt_keyring import jwt_keyring
+from presentation.dependencies import get_async_authentication_service, get_async_login_rate_limiter, get_async_user_service
+from presentation.http.fastapi.routers.auth import credentials_exception, oauth2_scheme, too_many_login_attempts
+
+
+async_auth_router = APIRouter()
+
+
+async def get_current_user(
+        token: Annotated[str, Depends(oauth2_scheme)],
+        auth_service: Annotated[AsyncAuthenticationService, Depends(get_async_authentication_service)]
+    ):
+    try:
+        return await auth_service.decode_access_token(access_token=token)
+    except:
+        raise credentials_exception
+
+
+@async_auth_router.post("/token")
+async def login_for_access_token(
+        request: Request,
+        form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+        user_service: Annotated[AsyncUserService, Depends(get_async_user_service)],
+        auth_service: Annotated[AsyncAuthenticationService, Depends(get_async_authentication_service)],
+        rate_limiter: Annotated[AsyncLoginRateLimiter | None, Depends(get_async_login_rate_limiter)]
+        ) -> TokenPairResponseDto:
+    if rate_limiter:
+        retry_after_seconds = await rate_limiter.attempt(request.client.host if request.client else "unknown", form_data.username)
+        if retry_after_seconds > 0:
+            raise too_many_login_attempts(retry_after_seconds)
+    user = await user_service.authenticate(form_data.username, form_data.password)
+    if not user:
+        raise credentials_exception
+    if rate_limiter:
+        await rate_limiter.reset(form_data.username)
+    # the form username may also be an email, tokens always carry the stored username
+    return auth_service.create_token_pair(TokenData(username=user.username, email=user.email))
+
+
+@async_auth_router.post("/refresh")
+async def refresh_auth_and_refresh_tokens(
+        refresh: Annotated[str, Header()],
+        auth_service: Annotated[AsyncAuthenticationService, Depends(get_async_authentication_service)]
+        ) -> TokenPairResponseDto:
+    try:
+        token_data = await auth_service.decode_refresh_token(refresh)
+        return await auth_service.refresh_token_pair(token_data, refresh)
+    except:
+        raise credentials_exception
+
+
+@async_auth_router.get("/me")
+async def who_am_i(current_user: Annotated[User, Depends(get_current_user)]):
+    return current_user
+
+
+@async_auth_router.get("/.well-known/jwks.json")
+async def get_json_web_key_set(response: Response):
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return jwt_keyring.jwks()
@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.exceptions import HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from application.authentication.dtos.user_dtos import UserBulkCreateDto, UserCreateDto, UserPageDto, UserUpdateDto
+from application.authentication.services.async_user_service import AsyncUserService
+from application.base.cursor import InvalidCursorError
+from application.base.etag import strong_etag
+from domain.authentication.repositories.exceptions import DatabaseIntegrityError
+from infrastructure.security.password_hashing_executor import PasswordHashingQueueFullError
+from infrastructure.cache.async_user_response_cache import AsyncUserResponseCache
+from presentation.dependencies import get_async_user_response_cache, get_async_user_service, get_async_user_service_scope
+from presentation.http.fastapi.conditional_responses import conditional_json_response
+from presentation.http.fastapi.json_responses import dto_response, user_rows_json
+
+
+async_user_router = APIRouter()
+
+
+@async_user_router.get("/page", response_model=UserPageDto)
+async def get_users_page(
+        user_service: AsyncUserService = Depends(get_async_user_service),
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: str | None = Query(None),
+        after_id: int | None = Query(None, ge=0)
+    ):
+    try:
+        return dto_response(await user_service.get_users_page(limit, cursor, after_id))
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=e.args)
+
+
+@async_user_router.get("/export")
+async def export_users(user_service_scope=Depends(get_async_user_service_scope), batch_size: int = Query(1000, ge=1, le=10000)):
+    async def ndjson_lines():
+        async with user_service_scope() as user_service:
+            async for user in user_service.stream_all_users(batch_size):
+                yield user.model_dump_json() + "\n"
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+@async_user_router.get("/{id}")
+async def get_user(
+        id: int,
+        request: Request,
+        user_service: AsyncUserService = Depends(get_async_user_service),
+        response_cache: AsyncUserResponseCache | None = Depends(get_async_user_response_cache)
+    ):
+    key = f"user_{id}"
+    generation, cached_response = await response_cache.get(key) if response_cache else (None, None)
+    if cached_response:
+        etag, body = cached_response
+        return conditional_json_response(request, etag, lambda: body)
+    user = await user_service.get_user_by_id(id)
+    if not user:
+        raise HTTPException(status_code=404)
+    etag = strong_etag("user", user.id, user.version)
+    if response_cache:
+        body = user.model_dump_json()
+        await response_cache.save(generation, key, etag, body)
+        return conditional_json_response(request, etag, lambda: body)
+    return conditional_json_response(request, etag, user.model_dump_json)
+
+
+@async_user_router.get("/")
+async def get_users(
+        request: Request,
+        user_service: AsyncUserService = Depends(get_async_user_service),
+        response_cache: AsyncUserResponseCache | None = Depends(get_async_user_response_cache),
+        items_per_page: int = Query(1000, ge=0),
+        page: int = Query(0, ge=0)
+    ):
+    key = f"users_{items_per_page}_{page}"
+    generation, cached_response = await response_cache.get(key) if response_cache else (None, None)
+    if cached_response:
+        etag, body = cached_response
+        return conditional_json_response(request, etag, lambda: body)
+    rows = await user_service.get_all_user_rows(items_per_page, page)
+    etag = strong_etag("users", *(f"{id}:{version}" for id, _, _, version in rows))
+    if response_cache:
+        body = user_rows_json(rows).decode()
+        await response_cache.save(generation, key, etag, body)
+        return conditional_json_response(request, etag, lambda: body)
+    return conditional_json_response(request, etag, lambda: user_rows_json(rows))
+
+
+@async_user_router.post("/")
+async def create_user(user: UserCreateDto, user_service: AsyncUserService = Depends(get_async_user_service)):
+    try:
+        create_user_dto = await user_service.create_user(user)
+        return dto_response(create_user_dto, status_code=201)
+    except DatabaseIntegrityError as e:
+        raise HTTPException(status_code=400, detail=e.args)
+    except PasswordHashingQueueFullError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500)
+
+
+@async_user_router.post("/bulk")
+async def create_users(users: UserBulkCreateDto, user_service: AsyncUserService = Depends(get_async_user_service)):
+    result = await user_service.create_users(users.users)
+    # 207 tells clients that some of the users were rejected, each one is detailed in errors
+    return dto_response(result, status_code=207 if result.errors else 201)
+
+
+@async_user_router.put("/{id}")
+async def update_user(id: int, user_dto: UserUpdateDto, user_service: AsyncUserService = Depends(get_async_user_service)):
+    try:
+        updated_user_dto = await user_service.update_user(id, user_dto)
+    except DatabaseIntegrityError as e:
+        raise HTTPException(status_code=400, detail=e.args)
+    except:
+        raise HTTPException(status_code=500)
+    if not updated_user_dto:
+        raise HTTPException(404)
+    return dto_response(updated_user_dto)
+
+
+@async_user_router.delete("/{id}")
+async def delete_user(id: int, user_service: AsyncUserService = Depends(get_async_user_service)):
+    if not await user_service.delete_user_by_id(id):
+        raise HTTPException(404)
+    return JSONResponse(content=None, status_code=204)
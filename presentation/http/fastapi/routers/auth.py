@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, status, Header
+import math
+
+from fastapi import APIRouter, Depends, status, Header, Request, Response
 from fastapi.exceptions import HTTPException
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from typing import Annotated
@@ -7,7 +9,9 @@ from application.authentication.services.authentication_service import Authentic
 from application.authentication.dtos.authentication_dtos import TokenPairResponseDto, TokenData
 from application.authentication.services.user_service import UserService
 from domain.authentication.entities.user import User
-from presentation.dependencies import get_authentication_service, get_user_service
+from infrastructure.security.jwt_keyring import jwt_keyring
+from infrastructure.security.login_rate_limiter import LoginRateLimiter
+from presentation.dependencies import get_authentication_service, get_login_rate_limiter, get_user_service
 
 
 auth_router = APIRouter()
@@ -22,6 +26,14 @@ credentials_exception = HTTPException(
 )
 
 
+def too_many_login_attempts(retry_after_seconds: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many login attempts",
+        headers={"Retry-After": str(math.ceil(retry_after_seconds))}
+    )
+
+
 def get_current_user(
         token: Annotated[str, Depends(oauth2_scheme)],
         auth_service: Annotated[AuthenticationService, Depends(get_authentication_service)]
@@ -34,13 +46,23 @@ def get_current_user(
 
 @auth_router.post("/token")
 def login_for_access_token(
+        request: Request,
         form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
         user_service: Annotated[UserService, Depends(get_user_service)],
-        auth_service: Annotated[AuthenticationService, Depends(get_authentication_service)]
+        auth_service: Annotated[AuthenticationService, Depends(get_authentication_service)],
+        rate_limiter: Annotated[LoginRateLimiter | None, Depends(get_login_rate_limiter)]
         ) -> TokenPairResponseDto:
-    if not user_service.check_password_is_valid(form_data.username, form_data.password):
+    # checked before the user is fetched or any password hashed, rejected attempts cost a cache round trip at most
+    if rate_limiter:
+        retry_after_seconds = rate_limiter.attempt(request.client.host if request.client else "unknown", form_data.username)
+        if retry_after_seconds > 0:
+            raise too_many_login_attempts(retry_after_seconds)
+    user = user_service.authenticate(form_data.username, form_data.password)
+    if not user:
         raise credentials_exception
-    user = user_service.get_user_by_username(form_data.username)
+    if rate_limiter:
+        rate_limiter.reset(form_data.username)
+    # the form username may also be an email, tokens always carry the stored username
     return auth_service.create_token_pair(TokenData(username=user.username, email=user.email))
 
 
@@ -51,11 +73,17 @@ def refresh_auth_and_refresh_tokens(
         ) -> TokenPairResponseDto:
     try:
         token_data = auth_service.decode_refresh_token(refresh)
+        return auth_service.refresh_token_pair(token_data, refresh)
     except:
         raise credentials_exception
-    return auth_service.refresh_token_pair(token_data, refresh)
 
 
 @auth_router.get("/me")
 def who_am_i(current_user: Annotated[User, Depends(get_current_user)]):
     return current_user
+
+
+@auth_router.get("/.well-known/jwks.json")
+def get_json_web_key_set(response: Response):
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return jwt_keyring.jwks()
@@ -0,0 +1,37 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from infrastructure.instrumentation.route_metrics import route_metrics
+from infrastructure.persistence.cached_user_repository import user_cache
+from infrastructure.persistence.sql_alchemy.database import database_engine_manager
+from infrastructure.security.password_hashing_executor import password_hashing_executor
+from presentation.dependencies import verified_token_cache
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("", response_class=PlainTextResponse)
+def get_prometheus_metrics():
+    """Per route request counts, latency, queries and cache calls of this process, in the Prometheus text format."""
+    return PlainTextResponse(route_metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@metrics_router.get("/database-pool")
+def get_database_pool_metrics():
+    return database_engine_manager.pool_metrics()
+
+
+@metrics_router.get("/password-hashing")
+def get_password_hashing_metrics():
+    return password_hashing_executor.metrics_snapshot()
+
+
+@metrics_router.get("/user-cache")
+def get_user_cache_metrics():
+    return user_cache.stats()
+
+
+@metrics_router.get("/verified-token-cache")
+def get_verified_token_cache_metrics():
+    return verified_token_cache.stats() if verified_token_cache is not None else {"enabled": False}
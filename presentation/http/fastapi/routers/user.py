@@ -1,56 +1,124 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from fastapi.exceptions import HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from application.authentication.dtos.user_dtos import UserCreateDto, UserUpdateDto
+from application.authentication.dtos.user_dtos import UserBulkCreateDto, UserCreateDto, UserPageDto, UserUpdateDto
 from application.authentication.services.user_service import UserService
+from application.base.cursor import InvalidCursorError
+from application.base.etag import strong_etag
 from domain.authentication.repositories.exceptions import DatabaseIntegrityError
-from presentation.dependencies import get_user_service
+from infrastructure.security.password_hashing_executor import PasswordHashingQueueFullError
+from infrastructure.cache.user_response_cache import UserResponseCache
+from presentation.dependencies import get_user_response_cache, get_user_service, get_user_service_scope
+from presentation.http.fastapi.conditional_responses import conditional_json_response
+from presentation.http.fastapi.json_responses import dto_response, user_rows_json
 
 
 user_router = APIRouter()
 
 
+@user_router.get("/page", response_model=UserPageDto)
+def get_users_page(
+        user_service: UserService = Depends(get_user_service),
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: str | None = Query(None),
+        after_id: int | None = Query(None, ge=0)
+    ):
+    try:
+        return dto_response(user_service.get_users_page(limit, cursor, after_id))
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=e.args)
+
+
+@user_router.get("/export")
+def export_users(user_service_scope=Depends(get_user_service_scope), batch_size: int = Query(1000, ge=1, le=10000)):
+    def ndjson_lines():
+        with user_service_scope() as user_service:
+            for user in user_service.stream_all_users(batch_size):
+                yield user.model_dump_json() + "\n"
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @user_router.get("/{id}")
-def get_user(id: int, user_service: UserService = Depends(get_user_service)):
+def get_user(
+        id: int,
+        request: Request,
+        user_service: UserService = Depends(get_user_service),
+        response_cache: UserResponseCache | None = Depends(get_user_response_cache)
+    ):
+    key = f"user_{id}"
+    generation, cached_response = response_cache.get(key) if response_cache else (None, None)
+    if cached_response:
+        etag, body = cached_response
+        return conditional_json_response(request, etag, lambda: body)
     user = user_service.get_user_by_id(id)
     if not user:
         raise HTTPException(status_code=404)
-    return user
+    etag = strong_etag("user", user.id, user.version)
+    if response_cache:
+        body = user.model_dump_json()
+        response_cache.save(generation, key, etag, body)
+        return conditional_json_response(request, etag, lambda: body)
+    return conditional_json_response(request, etag, user.model_dump_json)
 
 
 @user_router.get("/")
-def get_users(user_service: UserService = Depends(get_user_service), items_per_page: int = Query(1000, ge=0), page: int = Query(0, ge=0)):
-    return user_service.get_all_users(items_per_page, page)
+def get_users(
+        request: Request,
+        user_service: UserService = Depends(get_user_service),
+        response_cache: UserResponseCache | None = Depends(get_user_response_cache),
+        items_per_page: int = Query(1000, ge=0),
+        page: int = Query(0, ge=0)
+    ):
+    key = f"users_{items_per_page}_{page}"
+    generation, cached_response = response_cache.get(key) if response_cache else (None, None)
+    if cached_response:
+        etag, body = cached_response
+        return conditional_json_response(request, etag, lambda: body)
+    rows = user_service.get_all_user_rows(items_per_page, page)
+    etag = strong_etag("users", *(f"{id}:{version}" for id, _, _, version in rows))
+    if response_cache:
+        body = user_rows_json(rows).decode()
+        response_cache.save(generation, key, etag, body)
+        return conditional_json_response(request, etag, lambda: body)
+    return conditional_json_response(request, etag, lambda: user_rows_json(rows))
 
 
 @user_router.post("/")
 def create_user(user: UserCreateDto, user_service: UserService = Depends(get_user_service)):
     try:
         create_user_dto = user_service.create_user(user)
-        return JSONResponse(create_user_dto.model_dump(), status_code=201)
+        return dto_response(create_user_dto, status_code=201)
     except DatabaseIntegrityError as e:
         raise HTTPException(status_code=400, detail=e.args)
+    except PasswordHashingQueueFullError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500)
 
 
+@user_router.post("/bulk")
+def create_users(users: UserBulkCreateDto, user_service: UserService = Depends(get_user_service)):
+    result = user_service.create_users(users.users)
+    # 207 tells clients that some of the users were rejected, each one is detailed in errors
+    return dto_response(result, status_code=207 if result.errors else 201)
+
+
 @user_router.put("/{id}")
 def update_user(id: int, user_dto: UserUpdateDto, user_service: UserService = Depends(get_user_service)):
-    if not user_service.get_user_by_id(id):
-        raise HTTPException(404)
     try:
         updated_user_dto = user_service.update_user(id, user_dto)
-        return updated_user_dto
     except DatabaseIntegrityError as e:
         raise HTTPException(status_code=400, detail=e.args)
     except:
         raise HTTPException(status_code=500)
+    if not updated_user_dto:
+        raise HTTPException(404)
+    return dto_response(updated_user_dto)
 
 
 @user_router.delete("/{id}")
 def delete_user(id: int, user_service: UserService = Depends(get_user_service)):
-    if not user_service.get_user_by_id(id):
+    if not user_service.delete_user_by_id(id):
         raise HTTPException(404)
-    user_service.delete_user_by_id(id)
     return JSONResponse(content=None, status_code=204)
@@ -1,20 +1,45 @@
 import os
+import time
 
 import pytest
 import redis
+import redis.asyncio
 
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from passlib.hash import bcrypt
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
 from testcontainers.postgres import PostgresContainer
 
+from application.authentication.services.async_authentication_service import AsyncAuthenticationService
+from application.authentication.services.async_user_service import AsyncUserService
 from application.authentication.services.authentication_service import AuthenticationService
 from application.authentication.services.user_service import UserService
+from infrastructure.cache.async_redis_cache_service import AsyncRedisCacheService
+from infrastructure.cache.local_sliding_windows import LocalSlidingWindows
+from infrastructure.cache.local_ttl_cache import LocalTTLCache
 from infrastructure.cache.redis_cache_service import RedisCacheService
+from infrastructure.cache.verified_token_cache import VerifiedTokenCache
 from infrastructure.persistence.sql_alchemy.database import Base
+from infrastructure.persistence.sql_alchemy.repositories.async_user_repository import AsyncUserSqlAlchemyRepository
 from infrastructure.persistence.sql_alchemy.repositories.user_repository import UserSqlAlchemyRepository
-from presentation.http.fastapi.main import app
-from presentation.dependencies import get_authentication_service, get_user_service
+from infrastructure.security.async_login_rate_limiter import AsyncLoginRateLimiter
+from infrastructure.security.login_rate_limiter import LoginRateLimiter
+from presentation.async_request_scope import AsyncRequestScope
+from presentation.http.fastapi.main import create_app
+from presentation.dependencies import (
+    get_async_authentication_service,
+    get_async_login_rate_limiter,
+    get_async_request_scope,
+    get_async_user_service,
+    get_authentication_service,
+    get_login_rate_limiter,
+    get_request_scope,
+    get_user_service
+)
+from presentation.request_scope import RequestScope
 
 
 @pytest.fixture(scope='session')
@@ -25,6 +50,12 @@ def engine():
             yield _engine
 
 
+@pytest.fixture(scope='session')
+def async_engine(engine):
+    # every test client runs its own event loop, asyncpg connections can not be pooled across them
+    return create_async_engine(engine.url.set(drivername="postgresql+asyncpg"), poolclass=NullPool)
+
+
 @pytest.fixture
 def session_(engine):
     Base.metadata.create_all(engine)
@@ -34,26 +65,61 @@ def session_(engine):
     Base.metadata.drop_all(engine)
 
 
+@pytest.fixture(params=["sync", "async"])
+def api_mode(request):
+    return request.param
+
+
+@pytest.fixture
+def verified_token_cache(request):
+    # parametrize indirectly with the user check interval to cache verified tokens
+    user_check_seconds = getattr(request, "param", None)
+    if user_check_seconds is None:
+        return None
+    return VerifiedTokenCache(max_size=100, max_ttl_seconds=900, user_check_seconds=user_check_seconds)
+
+
 @pytest.fixture
-def client(session_):
+def client(api_mode, session_, async_engine, verified_token_cache):
+    app = create_app(api_mode)
 
     def override_get_authentication_service():
         user_repository = UserSqlAlchemyRepository(session_)
         redis_client = redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
         cache_service = RedisCacheService(redis_client)
-        return AuthenticationService(user_repository=user_repository, cache_service=cache_service)
+        return AuthenticationService(user_repository=user_repository, cache_service=cache_service, verified_token_cache=verified_token_cache)
 
     def override_get_user_service():
         user_repository = UserSqlAlchemyRepository(session_)
         return UserService(user_repository=user_repository)
 
+    async_session = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_authentication_service():
+        async with async_session() as db:
+            redis_client = redis.asyncio.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
+            cache_service = AsyncRedisCacheService(redis_client)
+            yield AsyncAuthenticationService(
+                user_repository=AsyncUserSqlAlchemyRepository(db),
+                cache_service=cache_service,
+                verified_token_cache=verified_token_cache
+            )
+            await redis_client.aclose()
+
+    async def override_get_async_user_service():
+        async with async_session() as db:
+            yield AsyncUserService(user_repository=AsyncUserSqlAlchemyRepository(db))
+
+    app.dependency_overrides[get_authentication_service] = override_get_authentication_service
+    app.dependency_overrides[get_user_service] = override_get_user_service
+    app.dependency_overrides[get_async_authentication_service] = override_get_async_authentication_service
+    app.dependency_overrides[get_async_user_service] = override_get_async_user_service
+    # logins are only rate limited by the test that checks it, the counters live in the shared redis
+    app.dependency_overrides[get_login_rate_limiter] = lambda: None
+    app.dependency_overrides[get_async_login_rate_limiter] = lambda: None
     with TestClient(app) as client:
-        app.dependency_overrides[get_authentication_service] = override_get_authentication_service
-        app.dependency_overrides[get_user_service] = override_get_user_service
         yield client
 
-    app.dependency_overrides.clear()
-
 
 def create_user(client: TestClient):
     create_user_payload = {
@@ -77,6 +143,15 @@ def test_login_for_access_token_200(client):
     assert json_response_auth.get("token_type") == "bearer"
 
 
+def test_login_for_access_token_with_email_200(client):
+    response = create_user(client)
+    assert response.status_code == 201
+    response_auth = client.post("/auth/token/", data={"username": "EMAIL@email.com", "password": "password"}, headers=[("content-type", "application/x-www-form-urlencoded")])
+    assert response_auth.status_code == 200
+    me_response = client.get("/auth/me/", headers=[("authorization", f"bearer {response_auth.json()['access_token']}")])
+    assert me_response.json()["username"] == "username"
+
+
 def test_login_for_access_token_with_unexistent_user_401(client):
     response = client.post("/auth/token/", data={"username": "username", "password": "password"}, headers=[("content-type", "application/x-www-form-urlencoded")])
     assert response.status_code == 401
@@ -89,6 +164,105 @@ def test_login_for_access_token_with_wrong_password_401(client):
     assert response.status_code == 401
 
 
+def test_login_for_access_token_rate_limited_429(client, api_mode):
+    redis_client = redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
+    redis_client.delete("login_attempts_login_rate_limited")
+    rate_limit_settings = {
+        "ip_attempts": 100,
+        "login_attempts": 2,
+        "window_seconds": 60,
+        "blocked_keys": LocalTTLCache(max_size=100, ttl_seconds=60),
+        "local_windows": LocalSlidingWindows(max_keys=100)
+    }
+    if api_mode == "async":
+        def override_get_async_login_rate_limiter():
+            async_redis_client = redis.asyncio.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
+            return AsyncLoginRateLimiter(AsyncRedisCacheService(async_redis_client), **rate_limit_settings)
+
+        client.app.dependency_overrides[get_async_login_rate_limiter] = override_get_async_login_rate_limiter
+    else:
+        rate_limiter = LoginRateLimiter(RedisCacheService(redis_client), **rate_limit_settings)
+        client.app.dependency_overrides[get_login_rate_limiter] = lambda: rate_limiter
+    responses = [
+        client.post("/auth/token/", data={"username": "rate_limited", "password": "password"}, headers=[("content-type", "application/x-www-form-urlencoded")])
+        for _ in range(3)
+    ]
+    assert [response.status_code for response in responses] == [401, 401, 429]
+    assert 0 < int(responses[-1].headers["retry-after"]) <= 60
+
+
+def test_login_upgrades_a_hash_below_the_policy_without_a_new_version(client, engine):
+    user_create_response = create_user(client)
+    assert user_create_response.status_code == 201
+    weak_hash = bcrypt.using(rounds=4).hash("password")
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE users SET password = :password WHERE username = 'username'"), {"password": weak_hash})
+        version, updated_at = connection.execute(text("SELECT version, updated_at FROM users WHERE username = 'username'")).one()
+    login_response = client.post("/auth/token/", data={"username": "username", "password": "password"}, headers=[("content-type", "application/x-www-form-urlencoded")])
+    assert login_response.status_code == 200
+    with engine.connect() as connection:
+        stored = connection.execute(text("SELECT password, version, updated_at FROM users WHERE username = 'username'")).one()
+    assert stored.password != weak_hash
+    assert bcrypt.verify("password", stored.password)
+    assert int(stored.password.split("$")[2]) > 4
+    # the user did not change, so neither does its etag
+    assert (stored.version, stored.updated_at) == (version, updated_at)
+
+
+def test_login_opens_one_session_and_one_connection(client, engine, async_engine):
+    user_create_response = create_user(client)
+    assert user_create_response.status_code == 201
+    sessions = []
+    checkouts = []
+
+    def count_checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts.append(connection_record)
+
+    def session_factory():
+        sessions.append(Session(engine))
+        return sessions[-1]
+
+    def async_session_factory():
+        sessions.append(AsyncSession(async_engine))
+        return sessions[-1]
+
+    def override_get_request_scope():
+        redis_client = redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
+        scope = RequestScope(lambda: RedisCacheService(redis_client), session_factory)
+        try:
+            yield scope
+        finally:
+            scope.close()
+            redis_client.close()
+
+    async def override_get_async_request_scope():
+        redis_client = redis.asyncio.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
+        scope = AsyncRequestScope(lambda: AsyncRedisCacheService(redis_client), async_session_factory)
+        try:
+            yield scope
+        finally:
+            await scope.close()
+            await redis_client.aclose()
+
+    # the services are built from the request scope, as they are outside of tests
+    client.app.dependency_overrides.pop(get_authentication_service)
+    client.app.dependency_overrides.pop(get_async_authentication_service)
+    client.app.dependency_overrides[get_request_scope] = override_get_request_scope
+    client.app.dependency_overrides[get_async_request_scope] = override_get_async_request_scope
+    # the async client checks its connections out of the async engine, which only one of them sees
+    engines = [engine, async_engine.sync_engine]
+    for counted_engine in engines:
+        event.listen(counted_engine, "checkout", count_checkout)
+    try:
+        login_response = client.post("/auth/token/", data={"username": "username", "password": "password"}, headers=[("content-type", "application/x-www-form-urlencoded")])
+    finally:
+        for counted_engine in engines:
+            event.remove(counted_engine, "checkout", count_checkout)
+    assert login_response.status_code == 200
+    assert len(sessions) == 1
+    assert len(checkouts) == 1
+
+
 def test_who_am_i_200(client):
     user_create_response = create_user(client)
     assert user_create_response.status_code == 201
@@ -101,6 +275,23 @@ def test_who_am_i_200(client):
     assert me_response_json["username"] == "username"
 
 
+@pytest.mark.parametrize("verified_token_cache", [0.5], indirect=True)
+def test_who_am_i_with_cached_token_of_user_deleted_elsewhere_401(client, engine):
+    user_create_response = create_user(client)
+    assert user_create_response.status_code == 201
+    login_response = client.post("/auth/token/", data={"username": "username", "password": "password"}, headers=[("content-type", "application/x-www-form-urlencoded")])
+    assert login_response.status_code == 200
+    access_token = login_response.json()["access_token"]
+    me_response = client.get("/auth/me/", headers=[("authorization", f"bearer {access_token}")])
+    assert me_response.status_code == 200
+    # another process deletes the user, this one is never told
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM users WHERE username = 'username'"))
+    time.sleep(0.6)
+    me_response = client.get("/auth/me/", headers=[("authorization", f"bearer {access_token}")])
+    assert me_response.status_code == 401
+
+
 def test_refresh_auth_and_refresh_tokens_200(client):
     user_create_response = create_user(client)
     assert user_create_response.status_code == 201
@@ -110,27 +301,25 @@ def test_refresh_auth_and_refresh_tokens_200(client):
     refresh_response = client.post("/auth/refresh/", headers=[("refresh", refresh_token)])
     assert refresh_response.status_code == 200
 
-"""
-TODO: check what makes tests related to cache fail intermittently
-
 def test_refresh_auth_and_refresh_tokens_repeated_token_401(client):
     user_create_response = create_user(client)
     assert user_create_response.status_code == 201
     login_response = client.post("/auth/token/", data={"username": "username", "password": "password"}, headers=[("content-type", "application/x-www-form-urlencoded")])
     assert login_response.status_code == 200
-    # tokens
-    access_token = login_response.json()["access_token"]
     refresh_token = login_response.json()["refresh_token"]
     # first refresh 200
     refresh_response = client.post("/auth/refresh/", headers=[("refresh", refresh_token)])
     assert refresh_response.status_code == 200
-    # get my info 200
-    me_response = client.get("/auth/me/", headers=[("authorization", f"bearer {access_token}")])
+    rotated_access_token = refresh_response.json()["access_token"]
+    rotated_refresh_token = refresh_response.json()["refresh_token"]
+    # get my info with the rotated token 200
+    me_response = client.get("/auth/me/", headers=[("authorization", f"bearer {rotated_access_token}")])
     assert me_response.status_code == 200
     # refresh leaked token 401
     refresh_response = client.post("/auth/refresh/", headers=[("refresh", refresh_token)])
     assert refresh_response.status_code == 401
-    # get my info revoked token 401
-    me_response = client.get("/auth/me/", headers=[("authorization", f"bearer {access_token}")])
+    # the pair issued for the leaked token is revoked
+    me_response = client.get("/auth/me/", headers=[("authorization", f"bearer {rotated_access_token}")])
     assert me_response.status_code == 401
-"""
\ No newline at end of file
+    refresh_response = client.post("/auth/refresh/", headers=[("refresh", rotated_refresh_token)])
+    assert refresh_response.status_code == 401
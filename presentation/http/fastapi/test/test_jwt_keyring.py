@@ -0,0 +1,116 @@
+import time
+
+import jwt
+import pytest
+
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from fastapi.testclient import TestClient
+
+from infrastructure.security.jwt_keyring import LEGACY_KEY_ID, JwtKeyring, SigningKey
+from presentation.http.fastapi.main import create_app
+from presentation.http.fastapi.routers import async_auth as async_auth_router_module
+from presentation.http.fastapi.routers import auth as auth_router_module
+
+
+SECRET = "secret"
+
+
+@pytest.fixture(scope='module')
+def rsa_key():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return SigningKey("rsa-1", "RS256", private_key.public_key(), private_key)
+
+
+@pytest.fixture(scope='module')
+def ed25519_key():
+    private_key = ed25519.Ed25519PrivateKey.generate()
+    return SigningKey("ed25519-1", "EdDSA", private_key.public_key(), private_key)
+
+
+@pytest.fixture
+def legacy_key():
+    return SigningKey(LEGACY_KEY_ID, "HS256", SECRET, SECRET)
+
+
+@pytest.fixture
+def keyring(legacy_key, rsa_key, ed25519_key):
+    return JwtKeyring([legacy_key, rsa_key, ed25519_key], active_kid=ed25519_key.kid)
+
+
+def payload():
+    return {"sub": "username", "exp": int(time.time()) + 60}
+
+
+@pytest.fixture(params=["sync", "async"])
+def client(request, monkeypatch, keyring):
+    monkeypatch.setattr(auth_router_module, "jwt_keyring", keyring)
+    monkeypatch.setattr(async_auth_router_module, "jwt_keyring", keyring)
+    # the lifespan is not entered, the key set needs neither the database nor redis
+    return TestClient(create_app(request.param))
+
+
+def test_encode_signs_with_the_active_key(keyring, ed25519_key):
+    token = keyring.encode(payload())
+    assert jwt.get_unverified_header(token) == {"alg": "EdDSA", "kid": ed25519_key.kid, "typ": "JWT"}
+    assert jwt.decode(token, ed25519_key.verifying_key, algorithms=["EdDSA"])["sub"] == "username"
+
+
+def test_decode_picks_the_key_named_by_the_kid(keyring, legacy_key, rsa_key):
+    # tokens signed before the rotation stay valid while the retiring key is kept
+    retiring_keyring = JwtKeyring([legacy_key, rsa_key], active_kid=rsa_key.kid)
+    token = retiring_keyring.encode(payload())
+    assert jwt.get_unverified_header(token)["kid"] == rsa_key.kid
+    assert keyring.decode(token)["sub"] == "username"
+
+
+def test_decode_rejects_an_unknown_kid(keyring):
+    other_keyring = JwtKeyring([SigningKey("other", "HS256", SECRET, SECRET)], active_kid="other")
+    with pytest.raises(jwt.InvalidTokenError):
+        keyring.decode(other_keyring.encode(payload()))
+
+
+def test_decode_rejects_an_algorithm_other_than_the_one_of_the_kid(keyring, rsa_key, ed25519_key):
+    hs256_token = jwt.encode(payload(), SECRET, algorithm="HS256", headers={"kid": rsa_key.kid})
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        keyring.decode(hs256_token)
+    eddsa_token = jwt.encode(payload(), ed25519_key.signing_key, algorithm="EdDSA", headers={"kid": rsa_key.kid})
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        keyring.decode(eddsa_token)
+
+
+def test_decode_verifies_tokens_without_kid_with_the_legacy_secret(keyring):
+    token = jwt.encode(payload(), SECRET, algorithm="HS256")
+    assert "kid" not in jwt.get_unverified_header(token)
+    assert keyring.decode(token)["sub"] == "username"
+    with pytest.raises(jwt.InvalidSignatureError):
+        keyring.decode(jwt.encode(payload(), "another secret", algorithm="HS256"))
+
+
+def test_decode_rejects_tokens_without_kid_once_the_legacy_secret_is_gone(rsa_key, ed25519_key):
+    keyring = JwtKeyring([rsa_key, ed25519_key], active_kid=ed25519_key.kid, legacy_kid=None)
+    with pytest.raises(jwt.InvalidTokenError):
+        keyring.decode(jwt.encode(payload(), SECRET, algorithm="HS256"))
+
+
+def test_active_key_must_be_able_to_sign(rsa_key):
+    public_only_key = SigningKey(rsa_key.kid, rsa_key.algorithm, rsa_key.verifying_key)
+    with pytest.raises(Exception):
+        JwtKeyring([public_only_key], active_kid=rsa_key.kid)
+
+
+def test_jwks_200(client, rsa_key, ed25519_key):
+    response = client.get("/auth/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=300"
+    keys = {key["kid"]: key for key in response.json()["keys"]}
+    # the shared secret is never published
+    assert set(keys) == {rsa_key.kid, ed25519_key.kid}
+    assert keys[rsa_key.kid]["kty"] == "RSA"
+    assert keys[rsa_key.kid]["alg"] == "RS256"
+    assert keys[ed25519_key.kid]["kty"] == "OKP"
+    assert keys[ed25519_key.kid]["crv"] == "Ed25519"
+    assert keys[ed25519_key.kid]["alg"] == "EdDSA"
+    assert all(key["use"] == "sig" and "d" not in key for key in keys.values())
+    token = jwt.encode(payload(), rsa_key.signing_key, algorithm="RS256", headers={"kid": rsa_key.kid})
+    public_key = jwt.PyJWK(keys[rsa_key.kid]).key
+    assert jwt.decode(token, public_key, algorithms=["RS256"])["sub"] == "username"
@@ -0,0 +1,43 @@
+import itertools
+
+from types import SimpleNamespace
+
+import pytest
+
+from passlib.context import CryptContext
+
+from infrastructure.security import password_hashing_policy
+from infrastructure.security.password_hashing_policy import BCRYPT_MAX_ROUNDS, BCRYPT_MIN_ROUNDS, crypt_context_config
+
+
+@pytest.fixture
+def bcrypt_takes(monkeypatch):
+    """Makes every calibration hash at the minimum rounds look like it took the given milliseconds."""
+    def set_elapsed_ms(elapsed_ms: float):
+        ticks = itertools.count(step=elapsed_ms / 1000)
+        monkeypatch.setattr(password_hashing_policy, "time", SimpleNamespace(perf_counter=lambda: next(ticks)))
+    return set_elapsed_ms
+
+
+def bcrypt_rounds(config: str) -> tuple:
+    context = CryptContext.from_string(config)
+    return context.default_scheme(), context.handler("bcrypt").default_rounds, context.handler("bcrypt").min_desired_rounds
+
+
+@pytest.mark.parametrize("elapsed_ms, target_ms, rounds", [
+    (50, 50, BCRYPT_MIN_ROUNDS),
+    (50, 400, BCRYPT_MIN_ROUNDS + 3),
+    (50, 550, BCRYPT_MIN_ROUNDS + 3),
+    (50, 5, BCRYPT_MIN_ROUNDS),
+    (50, 10 ** 9, BCRYPT_MAX_ROUNDS),
+])
+def test_auto_bcrypt_rounds_are_calibrated_to_the_target(bcrypt_takes, elapsed_ms, target_ms, rounds):
+    bcrypt_takes(elapsed_ms)
+    config = crypt_context_config(schemes=["bcrypt"], bcrypt_rounds="auto", target_ms=target_ms)
+    # hashes below the calibrated rounds are upgraded on login, costlier ones are kept
+    assert bcrypt_rounds(config) == ("bcrypt", rounds, rounds)
+
+
+def test_fixed_bcrypt_rounds_are_not_calibrated(monkeypatch):
+    monkeypatch.setattr(password_hashing_policy, "calibrate_bcrypt_rounds", pytest.fail)
+    assert bcrypt_rounds(crypt_context_config(schemes=["bcrypt", "argon2"], bcrypt_rounds="11")) == ("bcrypt", 11, 11)
@@ -0,0 +1,128 @@
+import os
+import time
+import uuid
+
+import pytest
+import redis
+
+from types import SimpleNamespace
+
+from infrastructure.cache import revocation_filter as revocation_filter_module
+from infrastructure.cache.redis_cache_service import RedisCacheService
+from infrastructure.cache.revocation_filter import RedisRevocationFilterSynchronizer, RevocationFilter
+
+
+GENERATION_SECONDS = 60
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # the filter reads time through its module, so generations can be rotated without waiting for them
+    now = SimpleNamespace(monotonic=1000.0)
+    monkeypatch.setattr(revocation_filter_module, "time", SimpleNamespace(monotonic=lambda: now.monotonic, time=time.time))
+    return now
+
+
+@pytest.fixture
+def revocation_filter(clock):
+    _revocation_filter = RevocationFilter(capacity=1000, error_rate=0.01, generation_seconds=GENERATION_SECONDS)
+    _revocation_filter.mark_synced(True)
+    return _revocation_filter
+
+
+def test_revoked_token_ids_are_never_missed(revocation_filter):
+    token_ids = [uuid.uuid4().hex for _ in range(1000)]
+    for token_id in token_ids:
+        revocation_filter.add(token_id)
+    assert all(revocation_filter.might_be_revoked(token_id) for token_id in token_ids)
+
+
+def test_false_positives_stay_near_the_error_rate(revocation_filter):
+    for _ in range(1000):
+        revocation_filter.add(uuid.uuid4().hex)
+    false_positives = sum(revocation_filter.might_be_revoked(uuid.uuid4().hex) for _ in range(10000))
+    assert false_positives < 10000 * 0.01 * 3
+
+
+def test_out_of_sync_filter_reports_every_token_id(revocation_filter):
+    revocation_filter.mark_synced(False)
+    assert revocation_filter.might_be_revoked(uuid.uuid4().hex)
+
+
+def test_revocations_outlive_one_generation_rotation(revocation_filter, clock):
+    revocation_filter.add("revoked")
+    clock.monotonic += GENERATION_SECONDS
+    assert revocation_filter.might_be_revoked("revoked")
+    clock.monotonic += GENERATION_SECONDS - 1
+    assert revocation_filter.might_be_revoked("revoked")
+    clock.monotonic += 1
+    assert not revocation_filter.might_be_revoked("revoked")
+
+
+def test_revocations_made_after_a_rotation_go_to_the_new_generation(revocation_filter, clock):
+    revocation_filter.add("early")
+    clock.monotonic += GENERATION_SECONDS
+    revocation_filter.add("late")
+    clock.monotonic += GENERATION_SECONDS
+    assert not revocation_filter.might_be_revoked("early")
+    assert revocation_filter.might_be_revoked("late")
+
+
+def test_idle_filter_drops_every_generation_at_once(revocation_filter, clock):
+    revocation_filter.add("revoked")
+    clock.monotonic += GENERATION_SECONDS * 10
+    assert not revocation_filter.might_be_revoked("revoked")
+    revocation_filter.add("revoked_again")
+    assert revocation_filter.might_be_revoked("revoked_again")
+
+
+def test_every_revocation_is_passed_to_the_listeners(revocation_filter):
+    notified = []
+    revocation_filter.add_listener(notified.append)
+    revocation_filter.add("local")
+    revocation_filter.add("received")
+    assert notified == ["local", "received"]
+
+
+def wait_for(condition, timeout_seconds: float = 5) -> bool:
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_revocations_reach_other_processes_through_redis():
+    key = f"revoked_access_tokens_test_{uuid.uuid4().hex}"
+
+    def client_factory():
+        return redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
+
+    receiving_filter, late_filter = (
+        RevocationFilter(capacity=1000, error_rate=0.01, generation_seconds=GENERATION_SECONDS) for _ in range(2)
+    )
+    synchronizers = [RedisRevocationFilterSynchronizer(receiving_filter, client_factory, key)]
+    try:
+        synchronizers[0].start()
+        assert wait_for(lambda: receiving_filter.synced)
+        assert not receiving_filter.might_be_revoked("revoked")
+
+        # the revoking process announces in the transaction that stores the revocation, it runs no synchronizer and
+        # could die right after without the other processes missing it
+        RedisCacheService(client_factory()).save_many_expirable_values_and_publish(
+            [("revoked_access_token_revoked", "1", 1)], key, ["revoked"], time.time() + GENERATION_SECONDS
+        )
+        # published live to a filter that was already subscribed
+        assert wait_for(lambda: receiving_filter.might_be_revoked("revoked"))
+
+        # and loaded from the snapshot by a filter that subscribes afterwards
+        synchronizers.append(RedisRevocationFilterSynchronizer(late_filter, client_factory, key))
+        synchronizers[-1].start()
+        assert wait_for(lambda: late_filter.synced)
+        assert late_filter.might_be_revoked("revoked")
+        assert not late_filter.might_be_revoked("not_revoked")
+    finally:
+        for synchronizer in synchronizers:
+            synchronizer.stop()
+        client_factory().delete(key, "revoked_access_token_revoked")
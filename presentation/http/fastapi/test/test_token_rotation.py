@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import jwt
+import pytest
+import redis
+import redis.asyncio
+
+from application.authentication.dtos.authentication_dtos import TokenData
+from application.authentication.services.async_authentication_service import AsyncAuthenticationService
+from application.authentication.services.authentication_service import AuthenticationService
+from infrastructure.cache.async_redis_cache_service import AsyncRedisCacheService
+from infrastructure.cache.redis_cache_service import RedisCacheService
+
+
+CONCURRENT_REFRESHES = 8
+
+
+class ProfileRepository:
+    """Knows every user, the rotation and revocation logic under test never reaches a database."""
+
+    def get_profile_by_username(self, username: str):
+        return SimpleNamespace(username=username, email=f"{username}@email.com")
+
+
+def redis_client():
+    return redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
+
+
+@pytest.fixture
+def token_data():
+    username = f"user_{uuid.uuid4().hex}"
+    return TokenData(username=username, email=f"{username}@email.com")
+
+
+@pytest.fixture
+def auth_service():
+    return AuthenticationService(user_repository=ProfileRepository(), cache_service=RedisCacheService(redis_client()))
+
+
+@pytest.fixture
+def legacy_keys(monkeypatch):
+    def set_enabled(enabled: bool):
+        monkeypatch.setattr(AuthenticationService, "LEGACY_TOKEN_KEYS_ENABLED", enabled)
+    return set_enabled
+
+
+def jti(token: str) -> str:
+    return jwt.decode(token, options={"verify_signature": False})["jti"]
+
+
+def legacy_token(token_data: TokenData, expires_in_seconds: int = 60) -> str:
+    """A token as issued before tokens carried a jti and a kid header, only its expiration tells it apart."""
+    payload = token_data.model_dump()
+    payload["exp"] = int(time.time()) + expires_in_seconds
+    return jwt.encode(payload, os.getenv("PASSWORD_HASHING_SECRET_KEY"), algorithm="HS256")
+
+
+def test_reused_refresh_token_revokes_the_pair_issued_for_it(auth_service, token_data):
+    tokens = auth_service.create_token_pair(token_data)
+    rotated_tokens = auth_service.refresh_token_pair(token_data, tokens.refresh_token)
+    assert auth_service.decode_access_token(rotated_tokens.access_token).username == token_data.username
+    with pytest.raises(Exception, match="Token already used."):
+        auth_service.refresh_token_pair(token_data, tokens.refresh_token)
+    with pytest.raises(Exception, match="Revoked token"):
+        auth_service.decode_access_token(rotated_tokens.access_token)
+    with pytest.raises(Exception, match="Revoked token"):
+        auth_service.refresh_token_pair(token_data, rotated_tokens.refresh_token)
+
+
+def test_revocation_state_is_keyed_by_jti(auth_service, token_data):
+    tokens = auth_service.create_token_pair(token_data)
+    rotated_tokens = auth_service.refresh_token_pair(token_data, tokens.refresh_token)
+    with pytest.raises(Exception):
+        auth_service.refresh_token_pair(token_data, tokens.refresh_token)
+    client = redis_client()
+    assert client.hgetall(f"refresh_token_rotation_{jti(tokens.refresh_token)}") == {
+        "access_token_id": jti(rotated_tokens.access_token),
+        "refresh_token_id": jti(rotated_tokens.refresh_token)
+    }
+    assert client.get(f"revoked_access_token_{jti(rotated_tokens.access_token)}") == "1"
+    assert client.get(f"revoked_refresh_token_{jti(rotated_tokens.refresh_token)}") == "1"
+    # no key holds a whole token anymore
+    for token in [tokens.access_token, tokens.refresh_token, rotated_tokens.access_token, rotated_tokens.refresh_token]:
+        assert not client.keys(f"*{token}*")
+    # other processes learn about the revoked access token from the sorted set and the channel
+    assert client.zscore(AuthenticationService.REVOKED_ACCESS_TOKENS_KEY, jti(rotated_tokens.access_token)) is not None
+
+
+def test_concurrent_refreshes_with_one_token_rotate_it_once(auth_service, token_data):
+    tokens = auth_service.create_token_pair(token_data)
+
+    def refresh(_):
+        try:
+            return auth_service.refresh_token_pair(token_data, tokens.refresh_token)
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=CONCURRENT_REFRESHES) as executor:
+        results = list(executor.map(refresh, range(CONCURRENT_REFRESHES)))
+    assert sum(result is not None for result in results) == 1
+
+
+def test_concurrent_async_refreshes_with_one_token_rotate_it_once(token_data):
+    async def refresh_concurrently():
+        client = redis.asyncio.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
+        auth_service = AsyncAuthenticationService(user_repository=ProfileRepository(), cache_service=AsyncRedisCacheService(client))
+        try:
+            tokens = auth_service.create_token_pair(token_data)
+            return await asyncio.gather(
+                *(auth_service.refresh_token_pair(token_data, tokens.refresh_token) for _ in range(CONCURRENT_REFRESHES)),
+                return_exceptions=True
+            )
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(refresh_concurrently())
+    assert sum(not isinstance(result, Exception) for result in results) == 1
+
+
+def test_legacy_revocation_keys_are_honoured_while_enabled(auth_service, token_data, legacy_keys):
+    access_token = legacy_token(token_data)
+    assert auth_service.decode_access_token(access_token).username == token_data.username
+    redis_client().set(f"violated_access_token_{access_token}", "1", ex=60)
+    with pytest.raises(Exception, match="Revoked token"):
+        auth_service.decode_access_token(access_token)
+    legacy_keys(False)
+    assert auth_service.decode_access_token(access_token).username == token_data.username
+
+
+def test_legacy_refresh_tokens_are_rotated_by_digest(auth_service, token_data):
+    refresh_token = legacy_token(token_data)
+    auth_service.refresh_token_pair(token_data, refresh_token)
+    refresh_token_id = hashlib.sha256(refresh_token.encode()).hexdigest()
+    assert redis_client().exists(f"refresh_token_rotation_{refresh_token_id}")
+    with pytest.raises(Exception, match="Token already used."):
+        auth_service.refresh_token_pair(token_data, refresh_token)
+
+
+def test_legacy_rotation_state_revokes_the_pair_issued_for_it(auth_service, token_data):
+    # rotated before the jti rollout, the used refresh token keyed the full pair issued for it
+    refresh_token = legacy_token(token_data)
+    issued_access_token, issued_refresh_token = legacy_token(token_data, 61), legacy_token(token_data, 62)
+    client = redis_client()
+    client.hset(refresh_token, mapping={"access_token": issued_access_token, "refresh_token": issued_refresh_token})
+    client.expire(refresh_token, 60)
+    with pytest.raises(Exception, match="Token already used."):
+        auth_service.refresh_token_pair(token_data, refresh_token)
+    with pytest.raises(Exception, match="Revoked token"):
+        auth_service.decode_access_token(issued_access_token)
@@ -1,16 +1,57 @@
+import asyncio
+import json
+import os
+import re
 import pytest
+import redis
+import redis.asyncio
+import threading
+import time
 
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
 from testcontainers.postgres import PostgresContainer
 
+from application.authentication.services.async_user_service import AsyncUserService
 from application.authentication.services.user_service import UserService
-from infrastructure.persistence.sql_alchemy.database import Base
+from domain.authentication.entities.user import User
+from infrastructure.cache.async_redis_cache_service import AsyncRedisCacheService
+from infrastructure.instrumentation.request_metrics import INSTRUMENTATION_ENABLED
+from infrastructure.cache.async_user_response_cache import AsyncUserResponseCache
+from infrastructure.cache.local_ttl_cache import LocalTTLCache
+from infrastructure.cache.redis_cache_service import RedisCacheService
+from infrastructure.cache.user_response_cache import UserResponseCache
+from infrastructure.persistence.async_cached_user_repository import AsyncCachedUserRepository, AsyncUserCacheInvalidator
+from infrastructure.persistence.cached_user_repository import CachedUserRepository, UserCacheInvalidator, user_cache_key
+from infrastructure.persistence.sql_alchemy import database
+from infrastructure.persistence.sql_alchemy.database import Base, database_engine_manager
 from infrastructure.persistence.sql_alchemy.models.User import UserOrmModel
-from infrastructure.persistence.sql_alchemy.repositories.user_repository import UserSqlAlchemyRepository
-from presentation.http.fastapi.main import app
-from presentation.http.fastapi.routers.user import get_user_service
+from infrastructure.persistence.sql_alchemy.routing_session import ClientWrites, DatabaseRouter, RoutingSession, current_client_writes
+from infrastructure.persistence.sql_alchemy.repositories.async_user_repository import AsyncUserSqlAlchemyRepository
+from infrastructure.persistence.sql_alchemy.repositories.user_repository import (
+    PUBLIC_USER_COLUMNS,
+    USER_COLUMNS,
+    UserSqlAlchemyRepository,
+    login_query
+)
+from infrastructure.security import password_hashing_executor as password_hashing_executor_module
+from infrastructure.security.password_hashing_executor import PasswordHashingExecutor
+from infrastructure.security.password_hashing_policy import crypt_context_config
+from presentation.dependencies import (
+    get_async_user_response_cache,
+    get_async_user_service,
+    get_async_user_service_scope,
+    get_user_response_cache,
+    get_user_service,
+    get_user_service_scope
+)
+from presentation.http.fastapi.main import create_app
+from presentation.http.fastapi.middlewares.read_your_writes_middleware import ReadYourWritesMiddleware
 
 
 @pytest.fixture(scope='session')
@@ -21,6 +62,12 @@ def engine():
             yield _engine
 
 
+@pytest.fixture(scope='session')
+def async_engine(engine):
+    # every test client runs its own event loop, asyncpg connections can not be pooled across them
+    return create_async_engine(engine.url.set(drivername="postgresql+asyncpg"), poolclass=NullPool)
+
+
 @pytest.fixture
 def session_(engine):
     Base.metadata.create_all(engine)
@@ -30,18 +77,105 @@ def session_(engine):
     Base.metadata.drop_all(engine)
 
 
+@pytest.fixture(params=["sync", "async"])
+def api_mode(request):
+    return request.param
+
+
 @pytest.fixture
-def client(session_):
+def client(api_mode, session_, async_engine):
+    app = create_app(api_mode)
 
     def override_get_user_service():
         user_repository = UserSqlAlchemyRepository(session_)
         return UserService(user_repository=user_repository)
 
+    @contextmanager
+    def override_user_service_scope():
+        yield override_get_user_service()
+
+    async_session = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def override_async_user_service_scope():
+        async with async_session() as db:
+            yield AsyncUserService(user_repository=AsyncUserSqlAlchemyRepository(db))
+
+    async def override_get_async_user_service():
+        async with override_async_user_service_scope() as user_service:
+            yield user_service
+
+    app.dependency_overrides[get_user_service] = override_get_user_service
+    app.dependency_overrides[get_user_service_scope] = lambda: override_user_service_scope
+    app.dependency_overrides[get_async_user_service] = override_get_async_user_service
+    app.dependency_overrides[get_async_user_service_scope] = lambda: override_async_user_service_scope
     with TestClient(app) as client:
-        app.dependency_overrides[get_user_service] = override_get_user_service
         yield client
 
-    app.dependency_overrides.clear()
+
+class CountingUserResponseCache(UserResponseCache):
+
+    def __init__(self, cache_service, invalidations: list):
+        super().__init__(cache_service)
+        self._invalidations = invalidations
+
+    def invalidate(self, users=None) -> None:
+        self._invalidations.append([user.username for user in users])
+        super().invalidate(users)
+
+
+class AsyncCountingUserResponseCache(AsyncUserResponseCache):
+
+    def __init__(self, cache_service, invalidations: list):
+        super().__init__(cache_service)
+        self._invalidations = invalidations
+
+    async def invalidate(self, users=None) -> None:
+        self._invalidations.append([user.username for user in users])
+        await super().invalidate(users)
+
+
+@pytest.fixture
+def invalidations():
+    return []
+
+
+@pytest.fixture
+def cached_client(api_mode, session_, async_engine, invalidations):
+    """A client whose user responses are cached in redis and whose user writes invalidate them."""
+    app = create_app(api_mode)
+    redis_client = redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
+
+    def override_get_user_response_cache():
+        return CountingUserResponseCache(RedisCacheService(redis_client), invalidations)
+
+    def override_get_user_service():
+        change_listeners = [override_get_user_response_cache().invalidate]
+        return UserService(user_repository=UserSqlAlchemyRepository(session_, change_listeners=change_listeners))
+
+    async_session = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_user_response_cache():
+        async_redis_client = redis.asyncio.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True)
+        try:
+            yield AsyncCountingUserResponseCache(AsyncRedisCacheService(async_redis_client), invalidations)
+        finally:
+            await async_redis_client.aclose()
+
+    async def override_get_async_user_service():
+        async for response_cache in override_get_async_user_response_cache():
+            async with async_session() as db:
+                yield AsyncUserService(user_repository=AsyncUserSqlAlchemyRepository(db, change_listeners=[response_cache.invalidate]))
+
+    app.dependency_overrides[get_user_response_cache] = override_get_user_response_cache
+    app.dependency_overrides[get_user_service] = override_get_user_service
+    app.dependency_overrides[get_async_user_response_cache] = override_get_async_user_response_cache
+    app.dependency_overrides[get_async_user_service] = override_get_async_user_service
+    with TestClient(app) as client:
+        # entries of earlier tests are keyed by ids that the recreated tables hand out again
+        override_get_user_response_cache().invalidate([])
+        invalidations.clear()
+        yield client
 
 
 @pytest.fixture
@@ -73,6 +207,19 @@ def test_get_user_404(seed_data, client):
     assert response.status_code == 404
 
 
+def test_get_user_304(seed_data, client):
+    response = client.get("/users/1")
+    etag = response.headers["etag"]
+    not_modified_response = client.get("/users/1", headers={"If-None-Match": etag})
+    assert not_modified_response.status_code == 304
+    assert not_modified_response.headers["etag"] == etag
+
+    client.put("/users/1", json={"username": "renamed1", "email": "email1@email.com", "password": "password1"})
+    modified_response = client.get("/users/1", headers={"If-None-Match": etag})
+    assert modified_response.status_code == 200
+    assert modified_response.headers["etag"] != etag
+
+
 def test_list_users_200(seed_data, client):
     response = client.get("/users")
     assert response.status_code == 200
@@ -80,6 +227,151 @@ def test_list_users_200(seed_data, client):
     assert len(json_response) == 5
 
 
+def test_list_users_is_served_from_the_response_cache(seed_data, cached_client, session_):
+    response = cached_client.get("/users")
+    assert response.status_code == 200
+    # a write behind the repository's back notifies no listener, the cached listing is still served
+    session_.execute(text("UPDATE users SET username = 'unseen1' WHERE id = 1"))
+    session_.commit()
+    cached_response = cached_client.get("/users")
+    assert cached_response.status_code == 200
+    assert cached_response.content == response.content
+    assert cached_response.headers["etag"] == response.headers["etag"]
+    assert cached_client.get("/users", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+
+@pytest.mark.parametrize("method, url, payload, written_usernames", [
+    ("post", "/users/bulk", {"users": [
+        {"username": "username6", "email": "email6@email.com", "password": "password6"},
+        {"username": "username7", "email": "email7@email.com", "password": "password7"},
+        {"username": "username8", "email": "email8@email.com", "password": "password8"}
+    ]}, ["username6", "username7", "username8"]),
+    ("put", "/users/1", {"username": "renamed1"}, ["username1", "renamed1"]),
+    ("delete", "/users/1", None, ["username1"])
+])
+def test_user_writes_invalidate_cached_listings_once(seed_data, cached_client, invalidations, method, url, payload, written_usernames):
+    response = cached_client.get("/users")
+    assert cached_client.get("/users").headers["etag"] == response.headers["etag"]
+    cached_client.request(method, url, json=payload)
+    # one generation per write, however many users it wrote
+    assert invalidations == [written_usernames]
+    assert cached_client.get("/users").json() != response.json()
+
+
+@pytest.fixture(params=["local", "shared"])
+def cache_tiers(request):
+    return request.param
+
+
+@pytest.fixture
+def cached_repositories(cache_tiers, seed_data, session_):
+    """Builds a cached user repository per process, all of them sharing the redis tier when there is one."""
+    shared_cache = RedisCacheService(redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), decode_responses=True))
+    # entries of earlier tests are keyed by the same usernames
+    shared_cache.remove_many_from_cache([user_cache_key(f"username{index}") for index in range(1, 6)] + [user_cache_key("renamed1"), user_cache_key("unknown")])
+
+    def cached_repository():
+        local_cache = LocalTTLCache(max_size=100, ttl_seconds=60)
+        tier = shared_cache if cache_tiers == "shared" else None
+        user_repository = UserSqlAlchemyRepository(session_, change_listeners=[UserCacheInvalidator(local_cache, tier)])
+        return CachedUserRepository(user_repository, local_cache, tier), local_cache
+
+    return cached_repository
+
+
+def profiles_of(user_repository, *usernames):
+    profiles = [user_repository.get_profile_by_username(username) for username in usernames]
+    return [(profile.id, profile.username, profile.email, profile.version) if profile else None for profile in profiles]
+
+
+def test_cached_profiles_are_served_without_the_database(cached_repositories, session_):
+    user_repository, local_cache = cached_repositories()
+    assert user_repository.get_profile_by_username("username1").email == "email1@email.com"
+    assert user_repository.get_profile_by_username("unknown") is None
+    session_.execute(text("UPDATE users SET email = 'unseen1@email.com' WHERE id = 1"))
+    session_.execute(text("INSERT INTO users (username, email, password) VALUES ('unknown', 'unknown@email.com', 'password')"))
+    session_.commit()
+    assert user_repository.get_profile_by_username("username1").email == "email1@email.com"
+    assert user_repository.get_profile_by_username("unknown") is None
+    assert local_cache.hits == 2
+
+
+def test_cached_profiles_are_shared_only_through_the_shared_tier(cached_repositories, cache_tiers, session_):
+    user_repository, _ = cached_repositories()
+    user_repository.get_profile_by_username("username1")
+    session_.execute(text("UPDATE users SET email = 'unseen1@email.com' WHERE id = 1"))
+    session_.commit()
+    other_process_repository, _ = cached_repositories()
+    expected_email = "email1@email.com" if cache_tiers == "shared" else "unseen1@email.com"
+    assert other_process_repository.get_profile_by_username("username1").email == expected_email
+
+
+@pytest.mark.parametrize("write", [
+    lambda user_repository: user_repository.update(1, username="renamed1", email="renamed1@email.com"),
+    lambda user_repository: user_repository.save_many([User(None, "renamed1", "renamed1@email.com", "password")]),
+    lambda user_repository: user_repository.delete(1)
+])
+def test_writes_invalidate_cached_profiles(cached_repositories, cache_tiers, session_, write):
+    user_repository, _ = cached_repositories()
+    other_process_repository, _ = cached_repositories()
+    profiles_before = profiles_of(user_repository, "username1", "renamed1")
+    write(user_repository)
+    profiles_after = profiles_of(user_repository, "username1", "renamed1")
+    assert profiles_after != profiles_before
+    assert profiles_after == profiles_of(UserSqlAlchemyRepository(session_), "username1", "renamed1")
+    if cache_tiers == "shared":
+        # processes that did not write read the shared tier, which the write cleared
+        assert profiles_of(other_process_repository, "username1", "renamed1") == profiles_after
+
+
+def test_async_writes_invalidate_cached_profiles(seed_data, async_engine):
+    async def read_write_read():
+        local_cache = LocalTTLCache(max_size=100, ttl_seconds=60)
+        async_session = async_sessionmaker(async_engine, expire_on_commit=False)
+        async with async_session() as db:
+            user_repository = AsyncCachedUserRepository(
+                AsyncUserSqlAlchemyRepository(db, change_listeners=[AsyncUserCacheInvalidator(local_cache)]), local_cache
+            )
+            profile_before = await user_repository.get_profile_by_username("username1")
+            await user_repository.update(1, email="renamed1@email.com")
+            return profile_before, await user_repository.get_profile_by_username("username1")
+
+    profile_before, profile_after = asyncio.run(read_write_read())
+    assert profile_before.email == "email1@email.com"
+    assert profile_after.email == "renamed1@email.com"
+
+
+def test_list_users_page_200(seed_data, client):
+    first_page = client.get("/users/page", params={"limit": 3})
+    assert first_page.status_code == 200
+    first_page_json = first_page.json()
+    assert [u["id"] for u in first_page_json["items"]] == [1, 2, 3]
+    assert first_page_json["next_cursor"] is not None
+    second_page = client.get("/users/page", params={"limit": 3, "cursor": first_page_json["next_cursor"]})
+    second_page_json = second_page.json()
+    assert [u["id"] for u in second_page_json["items"]] == [4, 5]
+    assert second_page_json["next_cursor"] is None
+
+
+def test_list_users_page_after_id_200(seed_data, client):
+    response = client.get("/users/page", params={"after_id": 4})
+    assert response.status_code == 200
+    assert [u["id"] for u in response.json()["items"]] == [5]
+
+
+def test_list_users_page_invalid_cursor_400(seed_data, client):
+    response = client.get("/users/page", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_export_users_200(seed_data, client):
+    response = client.get("/users/export", params={"batch_size": 2})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    users = [json.loads(line) for line in response.text.splitlines()]
+    assert [u["username"] for u in users] == [f"username{i}" for i in range(1, 6)]
+
+
 def test_create_user_201(seed_data, client: TestClient):
     payload = {
         "username": "username6",
@@ -109,6 +401,24 @@ def test_create_user_400(seed_data, client):
     assert json_response == {"detail": ["Duplicated username and or email."]}
 
 
+def test_create_users_bulk_207(seed_data, client):
+    payload = {
+        "users": [
+            {"username": "username6", "email": "email6@email.com", "password": "password6"},
+            {"username": "username1", "email": "email7@email.com", "password": "password7"},
+            {"username": "username8", "email": "email6@email.com", "password": "password8"}
+        ]
+    }
+    response = client.post("/users/bulk", json=payload)
+    assert response.status_code == 207
+    json_response = response.json()
+    assert json_response["created"] == [{"id": 6, "username": "username6", "email": "email6@email.com"}]
+    assert json_response["errors"] == [
+        {"index": 1, "username": "username1", "detail": "Duplicated username."},
+        {"index": 2, "username": "username8", "detail": "Duplicated username and or email within the batch."}
+    ]
+
+
 def test_update_user_200(seed_data, client):
     payload = {
         "username": "updated_username6",
@@ -151,3 +461,224 @@ def test_update_user_404(seed_data, client):
 def test_delete_user(seed_data, client):
     response = client.delete("/users/1")
     assert response.status_code == 204
+
+
+@pytest.fixture
+def saturated_password_hasher(monkeypatch):
+    """A hashing pool whose workers and queue are all taken by hashes that do not finish until the test is over."""
+    release = threading.Event()
+
+    def blocked_hash_password(password: str):
+        release.wait()
+        return "hash", time.monotonic(), 0.0
+
+    # thread workers look the worker function up when it is submitted
+    monkeypatch.setattr(password_hashing_executor_module, "_hash_password", blocked_hash_password)
+    password_hasher = PasswordHashingExecutor(max_workers=1, max_queue_size=1, use_processes=False, crypt_context_config=crypt_context_config(bcrypt_rounds="4"))
+    blocked_hashes = [threading.Thread(target=password_hasher.hash, args=("password",)) for _ in range(2)]
+    for blocked_hash in blocked_hashes:
+        blocked_hash.start()
+    deadline = time.monotonic() + 5
+    while password_hasher.pending < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield password_hasher
+    release.set()
+    for blocked_hash in blocked_hashes:
+        blocked_hash.join()
+    password_hasher.shutdown()
+
+
+def test_create_user_503_when_the_hashing_queue_is_full(api_mode, session_, async_engine, saturated_password_hasher):
+    app = create_app(api_mode)
+    async_session = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_user_service():
+        async with async_session() as db:
+            yield AsyncUserService(user_repository=AsyncUserSqlAlchemyRepository(db), password_hasher=saturated_password_hasher)
+
+    app.dependency_overrides[get_user_service] = lambda: UserService(UserSqlAlchemyRepository(session_), password_hasher=saturated_password_hasher)
+    app.dependency_overrides[get_async_user_service] = override_get_async_user_service
+    with TestClient(app) as client:
+        response = client.post("/users", json={"username": "username6", "email": "email6@email.com", "password": "password6"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.json() == {"detail": ["Too many password hashing requests, try again later."]}
+    assert saturated_password_hasher.metrics.rejected == 1
+
+
+@pytest.mark.parametrize("method, url, payload", [
+    ("post", "/users", {"username": "username6", "email": "email6@email.com", "password": "password6"}),
+    ("put", "/users/1", {"username": "updated_username1"}),
+    ("put", "/users/404", {"username": "updated_username404"}),
+    ("delete", "/users/1", None),
+    ("delete", "/users/404", None)
+])
+def test_user_writes_take_one_query(seed_data, client, engine, async_engine, method, url, payload):
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # the async client runs its statements on the async engine, which only one of them sees
+    engines = [engine, async_engine.sync_engine]
+    for counted_engine in engines:
+        event.listen(counted_engine, "before_cursor_execute", count_statement)
+    try:
+        client.request(method, url, json=payload)
+    finally:
+        for counted_engine in engines:
+            event.remove(counted_engine, "before_cursor_execute", count_statement)
+    assert len(statements) == 1, statements
+
+
+@pytest.mark.parametrize("query, index", [
+    (login_query("USERNAME3"), "ix_users_lower_username"),
+    (login_query("Email3@Email.com"), "ix_users_lower_email"),
+    (select(*USER_COLUMNS).where(UserOrmModel.username == "username3"), "users_username_key"),
+    (select(*PUBLIC_USER_COLUMNS).where(UserOrmModel.id > 2).order_by(UserOrmModel.id).limit(2), "users_pkey")
+])
+def test_user_lookups_use_indexes(seed_data, session_, query, index):
+    # a handful of rows always favours a sequential scan, disabling it shows whether an index can serve the query at all
+    session_.execute(text("SET LOCAL enable_seqscan = off"))
+    compiled_query = query.compile(session_.bind, compile_kwargs={"literal_binds": True})
+    plan = "\n".join(row[0] for row in session_.execute(text(f"EXPLAIN {compiled_query}")))
+    assert "Seq Scan" not in plan, plan
+    assert index in plan, plan
+
+
+@contextmanager
+def routed_sessions(engine):
+    """Yields a session factory routed between engine and a replica standing in for it, and the engines each ran on."""
+    replica_engine = create_engine(engine.url)
+    router = DatabaseRouter(engine, [replica_engine], read_your_writes_seconds=60)
+    executed_on = []
+
+    def on_primary(conn, cursor, statement, parameters, context, executemany):
+        executed_on.append("primary")
+
+    def on_replica(conn, cursor, statement, parameters, context, executemany):
+        if "pg_is_in_recovery" not in statement:
+            executed_on.append("replica")
+
+    event.listen(engine, "before_cursor_execute", on_primary)
+    event.listen(replica_engine, "before_cursor_execute", on_replica)
+    try:
+        yield lambda: RoutingSession(router=router), executed_on
+    finally:
+        event.remove(engine, "before_cursor_execute", on_primary)
+        replica_engine.dispose()
+
+
+def read_as(client_writes, session_factory):
+    token = current_client_writes.set(client_writes)
+    try:
+        with session_factory() as session:
+            UserSqlAlchemyRepository(session).get_by_id(1)
+    finally:
+        current_client_writes.reset(token)
+
+
+def test_reads_are_routed_to_replicas(seed_data, engine):
+    with routed_sessions(engine) as (session_factory, executed_on):
+        with session_factory() as session:
+            user_repository = UserSqlAlchemyRepository(session)
+            assert user_repository.get_by_id(1).username == "username1"
+            user_repository.update(1, username="routed_username1")
+            # the session wrote, so it keeps reading from the primary
+            assert user_repository.get_by_id(1).username == "routed_username1"
+    assert executed_on == ["replica", "primary", "primary"]
+
+
+def test_reads_after_a_write_stay_on_the_primary_only_for_the_client_that_wrote(seed_data, engine):
+    writer, other_client = ClientWrites(), ClientWrites()
+    with routed_sessions(engine) as (session_factory, executed_on):
+        token = current_client_writes.set(writer)
+        try:
+            with session_factory() as session:
+                UserSqlAlchemyRepository(session).update(1, username="routed_username1")
+        finally:
+            current_client_writes.reset(token)
+        read_as(writer, session_factory)
+        read_as(other_client, session_factory)
+        read_as(None, session_factory)
+        # a later request of the writer, carrying the time of its write
+        read_as(ClientWrites(writer.wrote_at), session_factory)
+    assert executed_on == ["primary", "primary", "replica", "replica", "primary"]
+
+
+def test_only_writes_pin_a_session_to_the_primary(seed_data, engine):
+    client_writes = ClientWrites()
+    with routed_sessions(engine) as (session_factory, executed_on):
+        token = current_client_writes.set(client_writes)
+        try:
+            with session_factory() as session:
+                session.connection()
+                UserSqlAlchemyRepository(session).get_by_id(1)
+        finally:
+            current_client_writes.reset(token)
+    assert executed_on == ["replica"]
+    assert client_writes.wrote_at is None
+
+
+def test_read_your_writes_cookie_is_set_by_writes_and_honoured_by_later_requests():
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, read_your_writes_seconds=2)
+
+    @app.post("/write")
+    def write():
+        DatabaseRouter.mark_write()
+
+    @app.get("/read")
+    def read():
+        return {"wrote_at": current_client_writes.get().wrote_at}
+
+    with TestClient(app) as client:
+        assert client.get("/read").json() == {"wrote_at": None}
+        assert "set-cookie" not in client.get("/read").headers
+        write_response = client.post("/write")
+        assert "Max-Age=2" in write_response.headers["set-cookie"]
+        wrote_at = float(write_response.cookies[ReadYourWritesMiddleware.COOKIE_NAME])
+        assert client.get("/read").json() == {"wrote_at": wrote_at}
+        client.cookies.set(ReadYourWritesMiddleware.COOKIE_NAME, "not a timestamp")
+        assert client.get("/read").json() == {"wrote_at": None}
+
+
+def test_replica_snapshot_does_not_check_the_replica(async_engine):
+    # checking an async replica outside of a session's greenlet would fail and mark it unusable
+    router = DatabaseRouter(async_engine.sync_engine, [async_engine.sync_engine])
+    for _ in range(2):
+        assert router.snapshot() == [{"host": async_engine.url.host, "lag_seconds": None, "error": None, "usable": False}]
+
+
+def test_lifespan_opens_only_the_engines_of_the_api_mode(api_mode):
+    with TestClient(create_app(api_mode)):
+        assert (database_engine_manager.engine is not None) == (api_mode == "sync")
+        assert (database_engine_manager.async_engine is not None) == (api_mode == "async")
+    assert database_engine_manager.engine is None and database_engine_manager.async_engine is None
+
+
+@pytest.mark.skipif(not INSTRUMENTATION_ENABLED, reason="instrumentation is disabled")
+def test_requests_report_server_timing_and_pool_metrics(seed_data, api_mode, engine, monkeypatch):
+    # the engines opened by the lifespan connect to the test database, so the app runs without overrides
+    create_database_engine, create_async_database_engine = database.create_database_engine, database.create_async_database_engine
+    monkeypatch.setattr(database, "create_database_engine", lambda metrics=None: create_database_engine(engine.url, metrics))
+    monkeypatch.setattr(
+        database,
+        "create_async_database_engine",
+        lambda metrics=None: create_async_database_engine(engine.url.set(drivername="postgresql+asyncpg"), metrics)
+    )
+    with TestClient(create_app(api_mode)) as client:
+        response = client.get("/users/1")
+        assert response.status_code == 200
+        server_timing = response.headers["server-timing"]
+        assert re.fullmatch(r'db;desc="1 queries";dur=[\d.]+, cache;desc="\d+ calls";dur=[\d.]+, total;dur=[\d.]+', server_timing), server_timing
+
+        metrics = client.get("/metrics").text
+        assert 'http_requests_total{method="GET",route="/users/{id}",status="200"}' in metrics
+        assert 'http_request_db_queries_bucket{method="GET",route="/users/{id}",le="1"}' in metrics
+
+        pool_metrics = client.get("/metrics/database-pool").json()
+        assert set(pool_metrics) == {api_mode}
+        assert pool_metrics[api_mode]["checkouts_total"] >= 1
+        assert pool_metrics[api_mode]["checkout_timeouts_total"] == 0
+        assert pool_metrics[api_mode]["checked_out"] == 0
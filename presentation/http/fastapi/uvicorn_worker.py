@@ -0,0 +1,10 @@
+from uvicorn.workers import UvicornWorker
+
+
+class ProductionUvicornWorker(UvicornWorker):
+    """Gunicorn worker serving the app with uvloop and httptools, picked explicitly instead of whatever imports first.
+
+    lifespan is on rather than auto, so a worker whose startup (engines, redis pools) fails exits instead of serving.
+    """
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
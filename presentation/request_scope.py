@@ -0,0 +1,36 @@
+from sqlalchemy.orm import Session
+from typing import Callable
+
+from infrastructure.cache.base_cache_service import BaseCacheService
+from infrastructure.persistence.sql_alchemy.database import SqlAlchemySession
+
+
+class RequestScope:
+    """Database session and cache client shared by every service of one request.
+
+    Both are made on first use, so a request that never reaches the database or the cache does not pay for them, and
+    the session checks a connection out of the pool only when its first statement runs.
+    """
+
+    def __init__(self, cache_service_factory: Callable[[], BaseCacheService], session_factory: Callable[[], Session] = SqlAlchemySession):
+        self._cache_service_factory = cache_service_factory
+        self._session_factory = session_factory
+        self._cache_service: BaseCacheService | None = None
+        self._session: Session | None = None
+
+    @property
+    def session(self) -> Session:
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    @property
+    def cache_service(self) -> BaseCacheService:
+        if self._cache_service is None:
+            self._cache_service = self._cache_service_factory()
+        return self._cache_service
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None